@@ -0,0 +1,16 @@
+"""Benchmarks for roll-cli.
+
+These are not part of the package and are run through nox:
+
+    nox --session benchmarks
+
+Results are stored as JSON keyed by the commit that they were measured
+at (see benchmarks.results), and every run is compared against a stored
+baseline so that performance regressions fail the session. Runs only
+store their results when given --store, at a clean commit.
+
+The baselines are per machine: the committed ones were recorded on the
+maintainer's machine, so on any other machine record a baseline first
+with `nox --session benchmarks -- --store` on the commit to compare
+against.
+"""
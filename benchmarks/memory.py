@@ -0,0 +1,129 @@
+"""Memory used by roll(), in bytes per die or per term.
+
+Each expression is rolled once to warm up the parser's cache of compiled
+expressions, and then once more under tracemalloc, recording:
+    peak: The most memory allocated at once while rolling (and rendering
+        the result, for the verbose benchmarks)
+    retained: Memory still allocated once the result has been thrown
+        away, which should stay at zero
+
+Both are divided by the number of dice or terms in the expression so
+that pools of different sizes can be compared with each other.
+
+Usage:
+    python -m benchmarks.memory [--tolerance 0.2] [--baseline COMMIT]
+"""
+from __future__ import annotations
+
+import gc
+import tracemalloc
+
+import click
+
+from roll_cli import roll
+
+from .results import DEFAULT_TOLERANCE
+from .results import record_and_compare
+from .results import RESULTS_DIR
+
+# Sizes of the pools of dice rolled, from 10 up to a million.
+POOL_SIZES: tuple[int, ...] = (10, 100, 1_000, 10_000, 100_000, 1_000_000)
+
+# Values below this many bytes per unit are too small to compare.
+NOISE_FLOOR: float = 1.0
+
+RESULTS_FILE = RESULTS_DIR / "memory.json"
+
+
+def _benchmarks() -> dict[str, tuple[str, bool, int]]:
+    """Return each benchmark's expression, verbosity, and number of units."""
+    benchmarks: dict[str, tuple[str, bool, int]] = {
+        f"pool_{size}": (f"{size}d6", False, size) for size in POOL_SIZES
+    }
+
+    benchmarks["keep_drop_chain"] = ("10000d6K9000k8000X1000x1000", False, 10_000)
+    benchmarks["math_chain"] = (" + ".join(["1 * 2"] * 5_000), False, 10_000)
+    benchmarks["dice_chain"] = (" + ".join(["2d6"] * 1_000), False, 1_000)
+    benchmarks["verbose_pool"] = ("10000d6", True, 10_000)
+    benchmarks["verbose_keep_drop"] = ("10000d6K9000x1000", True, 10_000)
+    benchmarks["verbose_dice_chain"] = (" + ".join(["2d6"] * 1_000), True, 1_000)
+
+    return benchmarks
+
+
+BENCHMARKS: dict[str, tuple[str, bool, int]] = _benchmarks()
+
+
+def measure(expression: str, verbose: bool = False) -> tuple[int, int]:
+    """Return the peak and retained bytes allocated to roll the expression.
+
+    Verbose results are rendered as text as well, as the roll command
+    would, since that is where the history gets expensive.
+    """
+    roll(expression, verbose)
+    gc.collect()
+    tracemalloc.start()
+
+    try:
+        before: int = tracemalloc.get_traced_memory()[0]
+        result = roll(expression, verbose)
+
+        if verbose:
+            str(result)
+
+        peak: int = tracemalloc.get_traced_memory()[1]
+
+        del result
+        gc.collect()
+        retained: int = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+    return peak - before, max(retained - before, 0)
+
+
+def run() -> dict[str, float]:
+    """Run every benchmark, returning the bytes used per die or term."""
+    results: dict[str, float] = {}
+
+    for name, (expression, verbose, units) in BENCHMARKS.items():
+        peak, retained = measure(expression, verbose)
+        results[f"{name}.peak"] = peak / units
+        results[f"{name}.retained"] = retained / units
+
+    return results
+
+
+@click.command()
+@click.option(
+    "--tolerance",
+    type=click.FloatRange(min=0),
+    default=DEFAULT_TOLERANCE,
+    show_default=True,
+    help="Fraction that memory use may grow by before failing",
+)
+@click.option("--baseline", "baseline_commit", help="Commit to compare against")
+@click.option(
+    "--store/--no-store",
+    default=False,
+    help="Store the results as a baseline for this commit",
+)
+def main(tolerance: float, baseline_commit: str | None, store: bool) -> None:
+    """Measure the memory used per die or term by each benchmark."""
+    passed: bool = record_and_compare(
+        RESULTS_FILE,
+        run(),
+        "bytes/unit",
+        tolerance,
+        baseline_commit,
+        store,
+        higher_is_better=False,
+        noise_floor=NOISE_FLOOR,
+    )
+
+    if not passed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""Time the parser on pathological inputs to catch performance cliffs.
+
+Every family of expressions is generated at a range of sizes and the
+time taken by each is measured, so that the growth can be estimated as
+the exponent k in time ~ size^k. Anything growing faster than linear (by
+more than a little noise) is flagged, which is how exponential
+backtracking or accidentally quadratic work shows up long before any
+single input is slow enough for someone to notice.
+
+Targets:
+    evaluate: DiceParser.evaluate(), which is what roll() uses
+    grammar: DiceParser.parse(), the pyparsing grammar
+
+Usage:
+    python -m benchmarks.pathological [--target grammar] [--max-exponent 1.3]
+"""
+from __future__ import annotations
+
+from math import log
+from time import perf_counter
+from typing import Callable
+from typing import Iterable
+
+import click
+
+from roll_cli.parser import DiceParser
+from roll_cli.parser.types import RollOption
+
+# Sizes that every family of expressions is generated at.
+DEFAULT_SIZES: tuple[int, ...] = (500, 1_000, 2_000, 4_000, 8_000)
+
+# Growth exponents above this are flagged as super-linear.
+DEFAULT_MAX_EXPONENT: float = 1.3
+
+# Once a single input takes this long, larger sizes are skipped.
+MAX_SECONDS: float = 2.0
+
+# Timings shorter than this are too noisy to estimate growth from.
+MIN_SECONDS: float = 0.001
+
+
+def deep_parens(size: int) -> str:
+    """Return 1 nested inside of size pairs of parentheses."""
+    return "(" * size + "1" + ")" * size
+
+
+def keep_chain(size: int) -> str:
+    """Return a pool of dice followed by size alternating keeps."""
+    return "4d6" + "K3k3" * (size // 2)
+
+
+def unary_minus_chain(size: int) -> str:
+    """Return 1 negated size times, as in `- - - 1`."""
+    return "- " * size + "1"
+
+
+def dice_chain(size: int) -> str:
+    """Return size alternating dice operators, as in `1d2d1d2`."""
+    return "d".join(["1", "2"] * (size // 2))
+
+
+def comparison_chain(size: int) -> str:
+    """Return size chained comparisons, as in `1 < 2 > 0 <= 1`."""
+    operators: tuple[str, ...] = ("<", ">", "<=", ">=", "=")
+    terms: list[str] = ["1"]
+
+    for index in range(size):
+        terms.append(f"{operators[index % len(operators)]} {index % 3}")
+
+    return " ".join(terms)
+
+
+def sum_chain(size: int) -> str:
+    """Return size dice added together, the shape of ordinary long input."""
+    return " + ".join(["1d6"] * size)
+
+
+FAMILIES: dict[str, Callable[[int], str]] = {
+    "deep_parens": deep_parens,
+    "keep_chain": keep_chain,
+    "unary_minus_chain": unary_minus_chain,
+    "dice_chain": dice_chain,
+    "comparison_chain": comparison_chain,
+    "sum_chain": sum_chain,
+}
+
+
+def _evaluate(expression: str) -> object:
+    # A new parser every time, so that the parse is not cached.
+    return DiceParser().evaluate(expression, RollOption.Normal)
+
+
+def _parse_with_grammar(expression: str) -> object:
+    return DiceParser().parse(expression)
+
+
+TARGETS: dict[str, Callable[[str], object]] = {
+    "evaluate": _evaluate,
+    "grammar": _parse_with_grammar,
+}
+
+
+def time_call(target: Callable[[str], object], expression: str, repeat: int) -> float:
+    """Return the best time of calling the target with the expression."""
+    best: float = float("inf")
+
+    for _ in range(repeat):
+        started: float = perf_counter()
+        target(expression)
+        best = min(best, perf_counter() - started)
+
+    return best
+
+
+def growth_exponent(timings: list[tuple[int, float]]) -> float | None:
+    """Estimate k in time ~ size^k from the timings of a family.
+
+    Timings that are too short to be reliable are left out, and None is
+    given back if fewer than two are left.
+    """
+    usable: list[tuple[int, float]] = [
+        (size, seconds) for size, seconds in timings if seconds >= MIN_SECONDS
+    ]
+
+    if len(usable) < 2 or usable[0][0] == usable[-1][0]:
+        return None
+
+    (first_size, first_time), (last_size, last_time) = usable[0], usable[-1]
+    return log(last_time / first_time) / log(last_size / first_size)
+
+
+class FamilyResult:
+    """Timings of a single family of expressions.
+
+    family: Name of the family
+    timings: Size of each input along with how long it took
+    error: Description of the error that stopped the family, if any
+    """
+
+    def __init__(self: FamilyResult, family: str) -> None:
+        """Initialize a FamilyResult with no timings."""
+        self.family: str = family
+        self.timings: list[tuple[int, float]] = []
+        self.error: str | None = None
+
+    @property
+    def exponent(self: FamilyResult) -> float | None:
+        """Return the estimated growth exponent of the family."""
+        return growth_exponent(self.timings)
+
+    def super_linear(self: FamilyResult, max_exponent: float) -> bool:
+        """Return whether the family grew faster than the exponent allows."""
+        exponent: float | None = self.exponent
+        return exponent is not None and exponent > max_exponent
+
+
+def run_family(
+    family: str,
+    target: Callable[[str], object],
+    sizes: Iterable[int] = DEFAULT_SIZES,
+    repeat: int = 3,
+) -> FamilyResult:
+    """Time the target on the family at every size.
+
+    Sizes are skipped once an input takes longer than MAX_SECONDS, and
+    the family stops at the first input that raises.
+    """
+    result: FamilyResult = FamilyResult(family)
+
+    for size in sizes:
+        expression: str = FAMILIES[family](size)
+
+        try:
+            seconds: float = time_call(target, expression, repeat)
+        except (Exception, RecursionError) as err:
+            result.error = f"size {size}: {type(err).__name__}: {err}"[:120]
+            break
+
+        result.timings.append((size, seconds))
+
+        if seconds > MAX_SECONDS:
+            break
+
+    return result
+
+
+def report(results: list[FamilyResult], max_exponent: float) -> str:
+    """Return a table of the timings and growth of every family."""
+    lines: list[str] = []
+
+    for result in results:
+        exponent: float | None = result.exponent
+        growth: str = "n/a" if exponent is None else f"{exponent:.2f}"
+        flag: str = "  SUPER-LINEAR" if result.super_linear(max_exponent) else ""
+
+        lines.append(f"{result.family} (exponent {growth}){flag}")
+
+        for size, seconds in result.timings:
+            lines.append(f"    {size:>8} {seconds * 1000:>12.3f} ms")
+
+        if result.error is not None:
+            lines.append(f"    stopped at {result.error}")
+
+    return "\n".join(lines)
+
+
+@click.command()
+@click.option(
+    "--target",
+    type=click.Choice(sorted(TARGETS)),
+    default="evaluate",
+    show_default=True,
+)
+@click.option(
+    "--max-exponent",
+    type=click.FloatRange(min=1),
+    default=DEFAULT_MAX_EXPONENT,
+    show_default=True,
+    help="Growth exponent above which a family fails",
+)
+@click.option(
+    "--size",
+    "sizes",
+    type=click.IntRange(min=1),
+    multiple=True,
+    help="Size to generate inputs at (repeatable)",
+)
+def main(target: str, max_exponent: float, sizes: tuple[int, ...]) -> None:
+    """Time the parser on pathological inputs, failing on super-linear growth."""
+    results: list[FamilyResult] = [
+        run_family(family, TARGETS[target], sizes or DEFAULT_SIZES)
+        for family in FAMILIES
+    ]
+
+    print(report(results, max_exponent))
+
+    if any(result.super_linear(max_exponent) for result in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
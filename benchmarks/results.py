@@ -0,0 +1,216 @@
+"""Store benchmark results keyed by commit and compare them to a baseline.
+
+Results files hold a JSON object with an entry per commit, in the order
+that they were recorded:
+
+    {
+        "1a2b3c4...": {
+            "python": "3.10.4",
+            "recorded": "2022-06-01T12:00:00+00:00",
+            "results": {"dice": 123456.7, ...}
+        }
+    }
+
+Commits with uncommitted changes in the working tree get "-dirty" added
+to their key so that they are never mistaken for the commit itself.
+Changes to the results files themselves don't count, since they are
+committed along with the code to give every checkout a baseline, and a
+run with nothing to compare against fails.
+
+Results are only stored when asked to, and never for a dirty tree, so
+that every baseline matches a commit that can be checked out. They are
+absolute numbers for the machine that recorded them, so comparing them
+on another machine means little until it has recorded its own.
+"""
+from __future__ import annotations
+
+import json
+import platform
+import subprocess  # noqa: S404
+from datetime import datetime
+from datetime import timezone
+from pathlib import Path
+from typing import Any
+
+# Directory that the results files are kept in.
+RESULTS_DIR: Path = Path(__file__).parent / "results"
+
+# Default fraction that a benchmark may get worse by before it fails.
+DEFAULT_TOLERANCE: float = 0.2
+
+
+def _git(*args: str) -> str:
+    """Run git and return its output, or an empty string if it fails."""
+    try:
+        return subprocess.run(  # noqa: S603, S607
+            ["git", *args],
+            capture_output=True,
+            check=True,
+            cwd=Path(__file__).parent,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def current_commit() -> str:
+    """Return the key for the commit that the working tree is at."""
+    commit: str = _git("rev-parse", "HEAD") or "unknown"
+
+    if _git(
+        "status",
+        "--porcelain",
+        "--untracked-files=no",
+        "--",
+        ":(top)",
+        ":(top,exclude)benchmarks/results",
+    ):
+        commit += "-dirty"
+
+    return commit
+
+
+def load(path: Path) -> dict[str, Any]:
+    """Load every stored result, or nothing if there is no file yet."""
+    if not path.exists():
+        return {}
+
+    stored: dict[str, Any] = json.loads(path.read_text())
+    return stored
+
+
+def save(path: Path, commit: str, results: dict[str, float]) -> None:
+    """Store the results for the commit, replacing any earlier ones."""
+    stored: dict[str, Any] = load(path)
+
+    # Re-inserting the commit moves it to the end, making it the latest.
+    stored.pop(commit, None)
+    stored[commit] = {
+        "python": platform.python_version(),
+        "recorded": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "results": results,
+    }
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(stored, indent=2) + "\n")
+
+
+def baseline(
+    stored: dict[str, Any], commit: str, baseline_commit: str | None = None
+) -> tuple[str, dict[str, float]] | None:
+    """Return the results to compare the commit against, if there are any.
+
+    The baseline is the given commit if there is one, otherwise the
+    latest results stored for any other commit.
+    """
+    if baseline_commit is not None:
+        matches: list[str] = [key for key in stored if key.startswith(baseline_commit)]
+
+        if not matches:
+            raise KeyError(f"No stored results for commit {baseline_commit}")
+
+        return matches[-1], stored[matches[-1]]["results"]
+
+    for key in reversed(list(stored)):
+        if key != commit:
+            return key, stored[key]["results"]
+
+    return None
+
+
+def regressions(
+    results: dict[str, float],
+    baseline_results: dict[str, float],
+    tolerance: float = DEFAULT_TOLERANCE,
+    higher_is_better: bool = True,
+    noise_floor: float = 0.0,
+) -> dict[str, float]:
+    """Return the benchmarks that got worse by more than the tolerance.
+
+    Benchmarks that are below the noise floor both before and after are
+    never counted, since tiny values swing by large fractions.
+
+    Returns:
+        The change of each regressed benchmark as a fraction of its
+        baseline, where positive is always worse.
+    """
+    worse: dict[str, float] = {}
+
+    for name, value in results.items():
+        previous: float | None = baseline_results.get(name)
+
+        if not previous or max(previous, value) < noise_floor:
+            continue
+
+        change: float = (previous - value) / previous
+
+        if not higher_is_better:
+            change = -change
+
+        if change > tolerance:
+            worse[name] = change
+
+    return worse
+
+
+def report(
+    results: dict[str, float],
+    baseline_results: dict[str, float] | None,
+    unit: str,
+) -> str:
+    """Return a table of the results next to their baseline."""
+    lines: list[str] = [f"{'benchmark':<28} {unit:>16} {'baseline':>16} {'change':>8}"]
+
+    for name, value in results.items():
+        previous: float | None = (baseline_results or {}).get(name)
+        change: str = f"{(value - previous) / previous:+.1%}" if previous else ""
+        before: str = f"{previous:,.1f}" if previous else ""
+
+        lines.append(f"{name:<28} {value:>16,.1f} {before:>16} {change:>8}")
+
+    return "\n".join(lines)
+
+
+def record_and_compare(
+    path: Path,
+    results: dict[str, float],
+    unit: str,
+    tolerance: float = DEFAULT_TOLERANCE,
+    baseline_commit: str | None = None,
+    store: bool = False,
+    higher_is_better: bool = True,
+    noise_floor: float = 0.0,
+) -> bool:
+    """Print the results against their baseline, storing them if asked to.
+
+    Returns:
+        Whether there was a baseline and every benchmark stayed within
+        the tolerance of it.
+    """
+    commit: str = current_commit()
+    stored: dict[str, Any] = load(path)
+    previous: tuple[str, dict[str, float]] | None = baseline(
+        stored, commit, baseline_commit
+    )
+
+    print(f"commit: {commit}")
+    print(f"baseline: {previous[0] if previous else 'none'}")
+    print(report(results, previous[1] if previous else None, unit))
+
+    if store and commit.endswith("-dirty"):
+        print("NOT STORED: commit the changes first to store a baseline")
+    elif store:
+        save(path, commit, results)
+
+    if previous is None:
+        print(f"NO BASELINE: commit results to {path} to compare against")
+        return False
+
+    worse: dict[str, float] = regressions(
+        results, previous[1], tolerance, higher_is_better, noise_floor
+    )
+
+    for name, change in worse.items():
+        print(f"REGRESSION: {name} is {change:.1%} worse (tolerance {tolerance:.0%})")
+
+    return not worse
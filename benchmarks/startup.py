@@ -0,0 +1,236 @@
+"""Time how long the roll command takes to start, failing over budget.
+
+Every command is run over and over in a fresh interpreter, recording the
+median and 95th percentile of its wall time, and the median is checked
+against a budget. The commands are run once more with `-X importtime`
+to show where the import time of roll_cli, click and pyparsing goes:
+    roll_1d20: python -m roll_cli 1d20
+    help: roll --help (python -m roll_cli --help if roll isn't installed)
+
+Results are stored and compared against a baseline like the other
+suites, in milliseconds.
+
+Usage:
+    python -m benchmarks.startup [--budget 150] [--runs 20] [--tolerance 0.2]
+"""
+from __future__ import annotations
+
+import shutil
+import subprocess  # noqa: S404
+import sys
+from math import ceil
+from statistics import median
+from time import perf_counter
+
+import click
+
+from .results import DEFAULT_TOLERANCE
+from .results import record_and_compare
+from .results import RESULTS_DIR
+
+
+def _roll_command() -> list[str]:
+    """Return the installed roll script, or running the package instead."""
+    script: str | None = shutil.which("roll")
+    return [script] if script is not None else [sys.executable, "-m", "roll_cli"]
+
+
+COMMANDS: dict[str, list[str]] = {
+    "roll_1d20": [sys.executable, "-m", "roll_cli", "1d20"],
+    "help": [*_roll_command(), "--help"],
+}
+
+# Packages whose imports are shown in the import time tree.
+PACKAGES: tuple[str, ...] = ("roll_cli", "click", "pyparsing")
+
+# Default budget for the median startup time of every command, in ms.
+DEFAULT_BUDGET: float = 150.0
+
+# Differences below this many milliseconds are too small to compare.
+NOISE_FLOOR: float = 5.0
+
+RESULTS_FILE = RESULTS_DIR / "startup.json"
+
+
+def time_command(command: list[str], runs: int) -> list[float]:
+    """Run the command the given number of times, returning each wall time."""
+    timings: list[float] = []
+
+    for _ in range(runs):
+        started: float = perf_counter()
+        subprocess.run(  # noqa: S603
+            command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        timings.append(perf_counter() - started)
+
+    return timings
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """Return the nearest rank percentile of the values."""
+    ordered: list[float] = sorted(values)
+    index: int = max(ceil(fraction * len(ordered)) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+class ImportTime:
+    """A single module from the output of `python -X importtime`.
+
+    module: Name of the module
+    depth: How deeply nested the import is beneath the first import
+    self_us: Microseconds spent importing the module itself
+    cumulative_us: Microseconds spent including the module's own imports
+    """
+
+    def __init__(
+        self: ImportTime, module: str, depth: int, self_us: int, cumulative_us: int
+    ) -> None:
+        """Initialize an ImportTime object."""
+        self.module: str = module
+        self.depth: int = depth
+        self.self_us: int = self_us
+        self.cumulative_us: int = cumulative_us
+
+
+def parse_importtime(output: str) -> list[ImportTime]:
+    """Return every import in the stderr of `python -X importtime`."""
+    imports: list[ImportTime] = []
+
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+
+        fields: list[str] = line[len("import time:") :].split("|")
+
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+
+        name: str = fields[2].rstrip()
+        module: str = name.lstrip()
+        depth: int = (len(name) - len(module) - 1) // 2
+
+        imports.append(ImportTime(module, depth, int(fields[0]), int(fields[1])))
+
+    return imports
+
+
+def import_times(command: list[str]) -> list[ImportTime]:
+    """Return the imports of the command, when run with -X importtime."""
+    if command[0] == sys.executable:
+        command = [sys.executable, "-X", "importtime", *command[1:]]
+    else:
+        command = [sys.executable, "-X", "importtime", "-m", "roll_cli", *command[1:]]
+
+    completed: subprocess.CompletedProcess[str] = subprocess.run(  # noqa: S603
+        command, capture_output=True, text=True, check=True
+    )
+    return parse_importtime(completed.stderr)
+
+
+def import_tree(imports: list[ImportTime], packages: tuple[str, ...]) -> str:
+    """Return the imports belonging to the packages as an indented tree.
+
+    Packages that were never imported are listed as such, which is as
+    important to know as how long the others took.
+    """
+    lines: list[str] = [f"{'cumulative (ms)':>15} {'self (ms)':>10}  module"]
+    imported: set[str] = set()
+
+    for entry in imports:
+        package: str = entry.module.split(".")[0]
+
+        if package not in packages:
+            continue
+
+        imported.add(package)
+        lines.append(
+            f"{entry.cumulative_us / 1000:>15.1f} {entry.self_us / 1000:>10.1f}"
+            f"  {'  ' * entry.depth}{entry.module}"
+        )
+
+    for package in packages:
+        if package not in imported:
+            lines.append(f"{'':>15} {'':>10}  {package} (not imported)")
+
+    return "\n".join(lines)
+
+
+def run(runs: int) -> dict[str, float]:
+    """Time every command, returning the median and p95 of each in ms."""
+    results: dict[str, float] = {}
+
+    for name, command in COMMANDS.items():
+        timings: list[float] = time_command(command, runs)
+        results[f"{name}.median"] = median(timings) * 1000
+        results[f"{name}.p95"] = percentile(timings, 0.95) * 1000
+
+    return results
+
+
+def over_budget(results: dict[str, float], budget: float) -> list[str]:
+    """Return the commands whose median startup time is over the budget."""
+    return [name for name in COMMANDS if results.get(f"{name}.median", 0.0) > budget]
+
+
+@click.command()
+@click.option(
+    "--budget",
+    type=click.FloatRange(min=0),
+    default=DEFAULT_BUDGET,
+    show_default=True,
+    help="Most milliseconds that the median startup may take",
+)
+@click.option(
+    "--runs",
+    type=click.IntRange(min=1),
+    default=20,
+    show_default=True,
+    help="Number of times to run each command",
+)
+@click.option(
+    "--tolerance",
+    type=click.FloatRange(min=0),
+    default=DEFAULT_TOLERANCE,
+    show_default=True,
+    help="Fraction that startup may slow down by before failing",
+)
+@click.option("--baseline", "baseline_commit", help="Commit to compare against")
+@click.option(
+    "--store/--no-store",
+    default=False,
+    help="Store the results as a baseline for this commit",
+)
+def main(
+    budget: float,
+    runs: int,
+    tolerance: float,
+    baseline_commit: str | None,
+    store: bool,
+) -> None:
+    """Time the startup of the roll command, failing when over budget."""
+    results: dict[str, float] = run(runs)
+    passed: bool = record_and_compare(
+        RESULTS_FILE,
+        results,
+        "ms",
+        tolerance,
+        baseline_commit,
+        store,
+        higher_is_better=False,
+        noise_floor=NOISE_FLOOR,
+    )
+
+    for name, command in COMMANDS.items():
+        print(f"\nimport time of {name}:")
+        print(import_tree(import_times(command), PACKAGES))
+
+    for name in over_budget(results, budget):
+        print(f"OVER BUDGET: {name} took {results[name + '.median']:.1f} ms")
+        passed = False
+
+    if not passed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
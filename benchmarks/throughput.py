@@ -0,0 +1,99 @@
+"""Throughput of each feature of the grammar, in rolls per second.
+
+Every benchmark rolls a single expression over and over through roll(),
+the same way that library users and batch mode do, and reports the best
+throughput out of several repeats to keep noise from other processes
+out of the numbers.
+
+Usage:
+    python -m benchmarks.throughput [--tolerance 0.2] [--baseline COMMIT]
+"""
+from __future__ import annotations
+
+from timeit import Timer
+
+import click
+
+from roll_cli import roll
+
+from .results import DEFAULT_TOLERANCE
+from .results import record_and_compare
+from .results import RESULTS_DIR
+
+# Name of each benchmark along with its expression and whether it is verbose.
+BENCHMARKS: dict[str, tuple[str, bool]] = {
+    "plain_math": ("1 + 2 * 3 - 4 / 5 // 6 % 7 ^ 2", False),
+    "dice": ("3d6 + 2d8", False),
+    "percent_dice": ("2d% + d%", False),
+    "keep": ("4d6K3", False),
+    "keep_drop_chain": ("8d6K6k4X1", False),
+    "nested_dice": ("(1d4)d(1d6)d6", False),
+    "factorial_sqrt": ("5! + sqrt(144) + 3!!", False),
+    "comparisons": ("1d20 + 5 >= 15", False),
+    "large_pool": ("1000d6", False),
+    "verbose": ("4d6K3 + 2d8 + 5", True),
+    "non_verbose": ("4d6K3 + 2d8 + 5", False),
+}
+
+RESULTS_FILE = RESULTS_DIR / "throughput.json"
+
+
+def measure(
+    expression: str, verbose: bool = False, number: int = 2000, repeat: int = 5
+) -> float:
+    """Return the best throughput of rolling the expression, in rolls/s."""
+    timer: Timer = Timer(lambda: roll(expression, verbose))
+
+    # Warm up the parser's cache so that only rolling is measured.
+    timer.timeit(1)
+
+    return number / min(timer.repeat(repeat=repeat, number=number))
+
+
+def run(number: int = 2000, repeat: int = 5) -> dict[str, float]:
+    """Run every benchmark, returning the throughput of each."""
+    return {
+        name: measure(expression, verbose, number, repeat)
+        for name, (expression, verbose) in BENCHMARKS.items()
+    }
+
+
+@click.command()
+@click.option(
+    "--tolerance",
+    type=click.FloatRange(min=0),
+    default=DEFAULT_TOLERANCE,
+    show_default=True,
+    help="Fraction that throughput may drop by before failing",
+)
+@click.option("--baseline", "baseline_commit", help="Commit to compare against")
+@click.option("--number", type=click.IntRange(min=1), default=2000, show_default=True)
+@click.option("--repeat", type=click.IntRange(min=1), default=5, show_default=True)
+@click.option(
+    "--store/--no-store",
+    default=False,
+    help="Store the results as a baseline for this commit",
+)
+def main(
+    tolerance: float,
+    baseline_commit: str | None,
+    number: int,
+    repeat: int,
+    store: bool,
+) -> None:
+    """Measure the throughput of every grammar feature."""
+    passed: bool = record_and_compare(
+        RESULTS_FILE,
+        run(number, repeat),
+        "rolls/s",
+        tolerance,
+        baseline_commit,
+        store,
+    )
+
+    if not passed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
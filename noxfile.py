@@ -144,6 +144,40 @@ def tests(session: Session) -> None:
             session.notify("coverage", posargs=[])
 
 
+@session(python="3.10")
+def benchmarks(session: Session) -> None:
+    """Run the benchmarks, failing on regressions against the baseline.
+
+    The baseline is the latest results committed to benchmarks/results
+    for another commit, and a suite without one fails too. Baselines are
+    only meaningful on the machine that recorded them, so record one with
+    `nox --session benchmarks -- --store` at a clean commit first.
+
+    Every suite is run unless the first argument names one of them, for
+    example `nox --session benchmarks -- memory --tolerance 0.1`. Running
+    every suite passes the arguments to those with baselines, and also
+    runs the tests marked as benchmarks, which time the wall clock and so
+    are left out of the tests session.
+    """
+    suites = ["throughput", "memory", "pathological", "startup"]
+    args = session.posargs
+
+    if args and args[0] in suites:
+        suites, args = [args[0]], args[1:]
+
+    session.install(".")
+
+    for suite in suites:
+        if suite == "pathological" and len(suites) > 1:
+            session.run("python", "-m", "benchmarks.pathological")
+        else:
+            session.run("python", "-m", f"benchmarks.{suite}", *args)
+
+    if len(suites) > 1:
+        session.install("pytest", "pygments")
+        session.run("pytest", "-m", "benchmark")
+
+
 @session
 def coverage(session: Session) -> None:
     """Produce the coverage report."""
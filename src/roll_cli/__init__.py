@@ -1,6 +1,31 @@
-"""Roll."""
+"""Roll.
+
+Importing the package is kept cheap since the roll command is started
+once per expression: the pyparsing grammar is only imported and built
+the first time something actually needs it, and the async API (which
+pulls in asyncio) is only imported when it is first used.
+"""
+from typing import Any
 from typing import Tuple
 
+from .roll import estimate_cost as estimate_cost
 from .roll import roll as roll
+from .roll import roll_repeated as roll_repeated
+
+__all__: Tuple[str, ...] = (
+    "estimate_cost",
+    "roll",
+    "roll_async",
+    "roll_many_async",
+    "roll_repeated",
+)
+
+
+def __getattr__(name: str) -> Any:
+    """Import the async API the first time it is asked for."""
+    if name in ("roll_async", "roll_many_async"):
+        from . import aio
+
+        return getattr(aio, name)
 
-__all__: Tuple[str, ...] = ("roll",)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
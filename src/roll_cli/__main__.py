@@ -10,7 +10,12 @@ d% -> 42
 <Nothing> -> 14 (Rolls a d20)
 etc.
 """
+import os
+import sys
 from typing import List
+from typing import Optional
+from typing import TextIO
+from typing import TYPE_CHECKING
 from typing import Union
 
 import click
@@ -19,6 +24,9 @@ from . import roll
 from roll_cli.parser.types import EvaluationResults
 from roll_cli.parser.types import RollOption
 
+if TYPE_CHECKING:
+    from .formats import ResultWriter
+
 
 @click.command()
 @click.argument("expression", nargs=-1, type=str)
@@ -43,10 +51,99 @@ from roll_cli.parser.types import RollOption
     is_flag=True,
     help="Print the individual die roll values",
 )
+@click.option(
+    "--batch",
+    "batch",
+    type=click.File("r"),
+    is_flag=False,
+    flag_value="-",
+    default=None,
+    metavar="[FILE|-]",
+    help="Roll one expression per non-blank line of FILE (or stdin)",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    "jobs",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of worker processes to use with --batch",
+)
+@click.option(
+    "-n",
+    "--count",
+    "count",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Roll the expression this many times",
+)
+@click.option(
+    "--sum",
+    "total",
+    is_flag=True,
+    help="Print the sum of all of the rolls from --count",
+)
+@click.option(
+    "-f",
+    "--format",
+    "output_format",
+    type=click.Choice(["text", "json", "jsonl", "csv", "bin"]),
+    default="text",
+    help="Format to write the results in",
+)
+@click.option(
+    "--serve",
+    "serve",
+    is_flag=True,
+    help="Run a daemon that rolls for clients over a Unix socket",
+)
+@click.option(
+    "--client",
+    "client",
+    is_flag=True,
+    help="Have the daemon roll instead of rolling here",
+)
+@click.option(
+    "--socket",
+    "socket_path",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Socket path for --serve and --client",
+)
+@click.option(
+    "--repl",
+    "repl",
+    is_flag=True,
+    help="Roll expressions interactively with a warm parser",
+)
+@click.option(
+    "--profile",
+    "profile",
+    is_flag=True,
+    help="Print how long each phase of rolling took to stderr",
+)
+@click.option(
+    "--profile-dump",
+    "profile_dump",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Also write cProfile stats to this file (implies --profile)",
+)
 def main(
     expression: List[str],
     roll_option: RollOption = RollOption.Normal,
     verbose: bool = False,
+    batch: Optional[TextIO] = None,
+    jobs: int = 1,
+    count: int = 1,
+    total: bool = False,
+    output_format: str = "text",
+    serve: bool = False,
+    client: bool = False,
+    socket_path: Optional[str] = None,
+    repl: bool = False,
+    profile: bool = False,
+    profile_dump: Optional[str] = None,
 ) -> None:
     """CLI dice roller.
 
@@ -69,9 +166,89 @@ def main(
         d8 + 3d6 + 5        - Rolls 1d8, 3d6, and adds everything together
 
         (1d4)d6             - Rolls 1d4 d6 die
+
+        6#(4d6K3)           - Rolls 4d6K3 six times at once, -v shows each
+
+    Batch mode:
+        roll --batch FILE   - Rolls every non-blank line of FILE, one result each
+
+        roll --batch        - Rolls every line read from stdin
+
+        roll -j 4 --batch   - Rolls the lines with 4 worker processes
+
+    Repeated rolls:
+        roll -n 6 4d6K3     - Rolls 4d6K3 six times, one result per line
+
+        roll -n 6 --sum 4d6 - Rolls 4d6 six times and adds them all up
+
+    Output formats:
+        roll -f jsonl -v 4d6 - Writes the total, rolls, and history as JSON
+
+        Formats are text, json, jsonl, csv, and bin.
+
+    Daemon:
+        roll --serve        - Keeps a roller running in the background
+
+        roll --client 1d20  - Has the daemon roll 1d20
+
+        With ROLL_CLI_DAEMON=1 set, roll uses the daemon when it is running.
+
+    Interactive:
+        roll --repl         - Rolls every expression typed in, Enter rerolls
+                              the last one, and :help lists the commands
+
+    Profiling:
+        roll --profile 4d6K3 - Rolls 4d6K3 and breaks down where the time went
+
+        roll --profile-dump out.prof 4d6K3 - Also dumps cProfile stats
     """
+    if serve:
+        from .daemon import default_socket_path
+        from .daemon import serve as serve_forever
+
+        try:
+            serve_forever(socket_path or default_socket_path())
+        except OSError as err:
+            raise click.ClickException(
+                f"Unable to start the roll daemon: {err}"
+            ) from err
+
+        return
+
+    if repl:
+        _main_repl(expression, roll_option, verbose)
+        return
+
+    _check_options(
+        batch is not None,
+        jobs,
+        count,
+        total,
+        verbose,
+        output_format,
+        profile or profile_dump is not None,
+        client,
+        socket_path is not None,
+    )
+
+    if batch is not None:
+        _main_batch(batch, expression, roll_option, verbose, jobs, output_format)
+        return
+
     command_input = " ".join(expression)
 
+    if count > 1 or total or output_format != "text":
+        _main_repeated(command_input, count, total, roll_option, verbose, output_format)
+        return
+
+    if profile or profile_dump:
+        _main_profile(command_input, roll_option, verbose, profile_dump)
+        return
+
+    if client or _daemon_wanted():
+        _main_client(command_input, roll_option, verbose, client, socket_path)
+        return
+
     result: Union[int, float, EvaluationResults] = roll(
         command_input,
         verbose,
@@ -79,3 +256,173 @@ def main(
     )
 
     click.echo(result)
+
+
+def _check_options(
+    batch: bool,
+    jobs: int,
+    count: int,
+    total: bool,
+    verbose: bool,
+    output_format: str,
+    profile: bool,
+    client: bool,
+    socket: bool,
+) -> None:
+    """Raise a UsageError for options that would otherwise be ignored."""
+    if jobs != 1 and not batch:
+        raise click.UsageError("--jobs can only be used with --batch.")
+
+    if batch and (count > 1 or total):
+        raise click.UsageError("--count and --sum cannot be used with --batch.")
+
+    if total and verbose:
+        raise click.UsageError("--sum only gives the total, so it cannot be verbose.")
+
+    if profile and (count > 1 or total or output_format != "text"):
+        raise click.UsageError(
+            "--profile cannot be used with --count, --sum, or --format."
+        )
+
+    # The daemon only rolls single expressions, so an explicit --client
+    # with any of these would quietly roll here instead.
+    if client and (batch or count > 1 or total or output_format != "text" or profile):
+        raise click.UsageError(
+            "--client cannot be used with --batch, --count, --sum, --format, "
+            "or --profile."
+        )
+
+    if socket and not (client or _daemon_wanted()):
+        raise click.UsageError("--socket can only be used with --serve or --client.")
+
+
+def _daemon_wanted() -> bool:
+    """Return whether rolls should go through the daemon when it is running.
+
+    Using the daemon is opt-in, by setting ROLL_CLI_DAEMON to anything
+    other than an empty string or 0.
+    """
+    return os.environ.get("ROLL_CLI_DAEMON", "") not in ("", "0")
+
+
+def _main_client(
+    command_input: str,
+    roll_option: RollOption,
+    verbose: bool,
+    required: bool,
+    socket_path: Optional[str],
+) -> None:
+    """Have the daemon roll the expression.
+
+    If the daemon cannot be reached and it was not explicitly asked for,
+    the expression is rolled here instead.
+    """
+    from .daemon import default_socket_path
+    from .daemon import RollClient
+
+    try:
+        with RollClient(socket_path or default_socket_path()) as daemon:
+            output: str = daemon.roll(command_input, verbose, roll_option)
+    except OSError as err:
+        if required:
+            raise click.ClickException(
+                f"Unable to reach the roll daemon: {err}"
+            ) from err
+
+        click.echo(roll(command_input, verbose, roll_option))
+        return
+    except ValueError as err:
+        raise click.ClickException(str(err)) from err
+
+    click.echo(output)
+
+
+def _main_repl(expression: List[str], roll_option: RollOption, verbose: bool) -> None:
+    """Roll expressions typed in interactively until the input ends."""
+    from .repl import run
+
+    if expression:
+        raise click.UsageError("Expressions cannot be given along with --repl.")
+
+    run(verbose, roll_option, write=click.echo)
+
+
+def _main_profile(
+    command_input: str,
+    roll_option: RollOption,
+    verbose: bool,
+    profile_dump: Optional[str],
+) -> None:
+    """Roll the expression here, printing where the time went to stderr."""
+    from .profiling import profile_roll
+
+    output, profiler = profile_roll(command_input, verbose, roll_option, profile_dump)
+
+    click.echo(output)
+    click.echo(profiler.report(), err=True)
+
+
+def _writer(output_format: str, verbose: bool) -> "ResultWriter":
+    """Return a writer for the format that writes to stdout."""
+    from .formats import WRITERS
+
+    return WRITERS[output_format](sys.stdout.buffer, verbose)
+
+
+def _main_repeated(
+    command_input: str,
+    count: int,
+    total: bool,
+    roll_option: RollOption,
+    verbose: bool,
+    output_format: str,
+) -> None:
+    """Roll the expression count times, writing every roll or their sum."""
+    from .roll import roll_repeated
+
+    writer: ResultWriter = _writer(output_format, verbose)
+    writer.start()
+
+    if total:
+        results: List[Union[int, float, EvaluationResults]] = roll_repeated(
+            command_input, count, False, roll_option
+        )
+        # Repeats count as the sum of their groups.
+        writer.write(
+            command_input,
+            sum(
+                result.total if isinstance(result, EvaluationResults) else result
+                for result in results
+            ),
+        )
+    else:
+        for result in roll_repeated(command_input, count, verbose, roll_option):
+            writer.write(command_input, result)
+
+    writer.finish()
+
+
+def _main_batch(
+    batch: TextIO,
+    expression: List[str],
+    roll_option: RollOption,
+    verbose: bool,
+    jobs: int,
+    output_format: str,
+) -> None:
+    """Roll every line of the batch input, exiting with 1 if any failed."""
+    from .batch import write_batch
+
+    if expression:
+        raise click.UsageError("Expressions cannot be given along with --batch.")
+
+    errors: int = write_batch(
+        batch, _writer(output_format, verbose), verbose, roll_option, jobs
+    )
+
+    if errors:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main(prog_name="roll")  # pragma: no cover
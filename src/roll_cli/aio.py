@@ -0,0 +1,90 @@
+"""Async versions of roll() for use from inside of an event loop.
+
+Calling roll() from a coroutine blocks the whole event loop until it is
+done, which is no problem for `1d20` but stalls everything else for an
+expression like `10000d100K50`. roll_async() checks the static cost of
+the expression first: small expressions are still rolled right away,
+since handing them off would cost more than rolling them, while heavy
+ones are rolled in an executor so that the loop can keep on serving.
+"""
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import Executor
+from concurrent.futures import ProcessPoolExecutor
+from contextvars import copy_context
+from functools import partial
+from typing import Iterable
+
+from .parser.budget import EvaluationBudget
+from .parser.cost import CostEstimate
+from .parser.cost import CostLimits
+from .parser.types import EvaluationResults
+from .parser.types import RollOption
+from .roll import estimate_cost
+from .roll import roll
+
+# Expressions estimated to draw more dice than this are rolled in the executor.
+OFFLOAD_DICE: float = 10_000
+
+# Expressions estimated to build numbers with more bits than this are too.
+OFFLOAD_BITS: float = 1 << 16
+
+
+def is_heavy(estimate: CostEstimate) -> bool:
+    """Return whether an expression should be rolled off of the event loop."""
+    return estimate.dice > OFFLOAD_DICE or estimate.max_bits > OFFLOAD_BITS
+
+
+async def roll_async(
+    expression: str = "",
+    verbose: bool = False,
+    roll_option: RollOption = RollOption.Normal,
+    limits: CostLimits | None = None,
+    budget: EvaluationBudget | None = None,
+    approximate_above: float | None = None,
+    executor: Executor | None = None,
+) -> int | float | EvaluationResults:
+    """Roll the expression without blocking the event loop for long.
+
+    Heavy expressions are rolled in the executor, which may be a thread
+    or a process pool (None uses the loop's default thread pool). Threads
+    roll in a copy of the current context, so they see the same hooks.
+    With a process pool, the budget is charged in the
+    worker process, so its counters are not updated here, and metrics
+    and hooks are those of the worker.
+
+    See roll() for the rest of the arguments.
+    """
+    call = partial(
+        roll, expression, verbose, roll_option, limits, budget, approximate_above
+    )
+
+    if not is_heavy(estimate_cost(expression)):
+        return call()
+
+    # Unlike tasks, executor threads do not get a copy of the context.
+    if not isinstance(executor, ProcessPoolExecutor):
+        call = partial(copy_context().run, call)
+
+    return await asyncio.get_running_loop().run_in_executor(executor, call)
+
+
+async def roll_many_async(
+    expressions: Iterable[str],
+    verbose: bool = False,
+    roll_option: RollOption = RollOption.Normal,
+    executor: Executor | None = None,
+) -> list[int | float | EvaluationResults]:
+    """Roll every expression concurrently, giving back results in order.
+
+    The first error raised by any of the expressions is raised here.
+    """
+    return list(
+        await asyncio.gather(
+            *(
+                roll_async(expression, verbose, roll_option, executor=executor)
+                for expression in expressions
+            )
+        )
+    )
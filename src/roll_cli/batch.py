@@ -0,0 +1,194 @@
+"""Roll many expressions in a single process.
+
+Starting the interpreter costs far more than rolling `1d20`, so rolling
+a file full of expressions one `roll` call at a time spends nearly all
+of its time starting up. Batch mode instead reads one expression per
+line and evaluates every one of them with the same warm parser.
+
+Blank lines are skipped and produce no output at all. Every other input
+line gets exactly one output line, so results line up with the
+non-blank lines of the input, not with the input as a whole. Lines that
+fail are reported in place as "error: <message>" and the rest of the
+batch keeps going.
+
+For batches too large for a single core, the lines can be split into
+chunks and spread over a pool of worker processes, which are forked
+from the already warm parent where possible (see prefork). Chunks are
+numbered as they are read so that their results can be written back
+out in input order, and only a fixed number of chunks are ever read
+ahead of the output, so memory stays bounded no matter how large the
+input is.
+"""
+from __future__ import annotations
+
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import Future
+from concurrent.futures import wait
+from itertools import islice
+from typing import Any
+from typing import Iterable
+from typing import Iterator
+
+from .formats import ResultWriter
+from .parser.budget import BudgetExceededError
+from .parser.types import EvaluationResults
+from .parser.types import RollOption
+from .prefork import fork_pool
+from .roll import roll
+
+# Number of lines handed to a worker process at a time.
+CHUNK_SIZE: int = 1000
+
+# Number of chunks per worker that may be read ahead of the output.
+CHUNKS_PER_JOB: int = 4
+
+# Errors that a bad expression can raise while being rolled. Anything
+# else is a bug (or something like a MemoryError) and stops the batch.
+ROLL_ERRORS: tuple[type[Exception], ...] = (
+    SyntaxError,
+    ValueError,
+    TypeError,
+    ArithmeticError,
+    BudgetExceededError,
+)
+
+
+def roll_line(
+    line: str,
+    verbose: bool = False,
+    roll_option: RollOption = RollOption.Normal,
+) -> tuple[bool, int | float | EvaluationResults | str]:
+    """Roll a single line of a batch.
+
+    Returns:
+        Whether the line was rolled successfully, along with either the
+        result or the error message.
+    """
+    try:
+        return True, roll(line.strip(), verbose, roll_option)
+    except ROLL_ERRORS as err:
+        return False, str(err)
+
+
+def _expressions(lines: Iterable[str]) -> Iterator[str]:
+    """Return the stripped lines, skipping the blank ones.
+
+    A blank line would otherwise be rolled as the default of 1d20.
+    """
+    for line in lines:
+        expression: str = line.strip()
+
+        if expression:
+            yield expression
+
+
+def roll_lines(
+    lines: Iterable[str],
+    verbose: bool = False,
+    roll_option: RollOption = RollOption.Normal,
+) -> Iterator[tuple[str, bool, int | float | EvaluationResults | str]]:
+    """Lazily roll every line that is not blank, one result for each.
+
+    Each result is given along with the (stripped) expression it is for.
+    """
+    for expression in _expressions(lines):
+        yield (expression, *roll_line(expression, verbose, roll_option))
+
+
+def _roll_chunk(
+    chunk: list[str], verbose: bool, roll_option: RollOption
+) -> list[tuple[bool, int | float | EvaluationResults | str]]:
+    """Roll a chunk of lines inside of a worker process."""
+    return [roll_line(line, verbose, roll_option) for line in chunk]
+
+
+def roll_lines_parallel(
+    lines: Iterable[str],
+    jobs: int,
+    verbose: bool = False,
+    roll_option: RollOption = RollOption.Normal,
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[tuple[str, bool, int | float | EvaluationResults | str]]:
+    """Roll every line that is not blank using a pool of worker processes.
+
+    Results come back in the same order as the lines, one for every line
+    that is not blank, each along with the (stripped) expression it is for.
+    """
+    line_iterator: Iterator[str] = _expressions(lines)
+    window: int = jobs * CHUNKS_PER_JOB
+
+    # Chunks that are still being rolled and chunks that are finished but
+    # waiting on an earlier chunk, both keyed by their sequence number.
+    running: dict[Future[list[tuple[bool, Any]]], tuple[int, list[str]]] = {}
+    finished: dict[int, list[tuple[str, bool, Any]]] = {}
+    next_chunk: int = 0
+    next_output: int = 0
+    exhausted: bool = False
+
+    with fork_pool(jobs) as pool:
+        while True:
+            # Backpressure: only read more input while there is room.
+            while not exhausted and len(running) + len(finished) < window:
+                chunk: list[str] = list(islice(line_iterator, chunk_size))
+
+                if not chunk:
+                    exhausted = True
+                    break
+
+                future = pool.submit(_roll_chunk, chunk, verbose, roll_option)
+                running[future] = (next_chunk, chunk)
+                next_chunk += 1
+
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                sequence, lines_rolled = running.pop(future)
+                finished[sequence] = [
+                    (line, *result)
+                    for line, result in zip(lines_rolled, future.result())
+                ]
+
+            while next_output in finished:
+                yield from finished.pop(next_output)
+                next_output += 1
+
+
+def write_batch(
+    lines: Iterable[str],
+    writer: ResultWriter,
+    verbose: bool = False,
+    roll_option: RollOption = RollOption.Normal,
+    jobs: int = 1,
+) -> int:
+    """Roll every line and write one result per non-blank line with the writer.
+
+    Results are written to the writer's stream as they come in and only
+    flushed at the end (or whenever the stream's buffer fills up)
+    instead of after every line like click.echo does. With more than
+    one job, the lines are rolled by a pool of that many worker
+    processes.
+
+    Returns:
+        The number of lines that could not be rolled.
+    """
+    errors: int = 0
+    results: Iterator[tuple[str, bool, int | float | EvaluationResults | str]] = (
+        roll_lines(lines, verbose, roll_option)
+        if jobs == 1
+        else roll_lines_parallel(lines, jobs, verbose, roll_option)
+    )
+
+    writer.start()
+
+    for expression, succeeded, result in results:
+        if succeeded and not isinstance(result, str):
+            writer.write(expression, result)
+        else:
+            errors += 1
+            writer.write_error(expression, str(result))
+
+    writer.finish()
+    return errors
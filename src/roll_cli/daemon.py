@@ -0,0 +1,256 @@
+"""Keep a warm roller running in the background.
+
+Even with the grammar deferred, every `roll` call still has to start an
+interpreter and import the package, which takes far longer than the
+roll itself. `roll --serve` instead starts a daemon that listens on a
+Unix domain socket, and `roll --client` (or plain `roll`, when the
+ROLL_CLI_DAEMON environment variable is set) just sends the expression
+over and prints the reply, so a roll only costs a socket round trip on
+top of the client's startup.
+
+The socket is only ever created in the user's runtime directory (or at
+a path given with --socket), and clients refuse to talk to a socket
+that is not owned by them or that anyone else can open.
+
+Protocol:
+    Both sides send one JSON object per line. Requests look like
+    {"expression": "4d6K3", "verbose": false, "roll_option": "Normal"}
+    and replies are either {"output": "14"} or {"error": "..."}.
+    Any number of requests can be sent over a single connection.
+
+    Sending {"metrics": true} instead gets back the parser's metrics in
+    the Prometheus text format as the output.
+"""
+from __future__ import annotations
+
+import errno
+import json
+import os
+import signal
+import socket
+import socketserver
+import stat
+from typing import Any
+
+from .parser.metrics import active_metrics
+from .parser.metrics import enable_metrics
+from .parser.metrics import MetricsRegistry
+from .parser.types import RollOption
+from .roll import roll
+
+# How long the client waits on the daemon before giving up on it.
+CLIENT_TIMEOUT: float = 5.0
+
+
+def default_socket_path() -> str:
+    """Return the socket path used when one is not given.
+
+    The socket lives in the user's runtime directory, which only they
+    can get into. There is no shared fallback like the temp directory,
+    so without a runtime directory the path has to be given instead.
+    """
+    runtime_dir: str | None = os.environ.get("XDG_RUNTIME_DIR")
+
+    if not runtime_dir:
+        raise FileNotFoundError(
+            errno.ENOENT, "XDG_RUNTIME_DIR is not set, give the path with --socket"
+        )
+
+    return os.path.join(runtime_dir, "roll-cli.sock")
+
+
+def check_socket(path: str) -> None:
+    """Raise a PermissionError unless the path is a socket private to the user.
+
+    Anyone could have created a socket at the path, so before sending it
+    anything we make sure that it belongs to us and nobody else can use it.
+    """
+    info: os.stat_result = os.lstat(path)
+
+    if (
+        not stat.S_ISSOCK(info.st_mode)
+        or info.st_uid != os.getuid()
+        or info.st_mode & 0o077
+    ):
+        raise PermissionError(
+            errno.EPERM, "Not a private socket owned by the current user", path
+        )
+
+
+def _remove_stale_socket(path: str) -> None:
+    """Remove a socket left behind by a daemon that is no longer running.
+
+    Anything that is not a socket, or a socket that something is still
+    listening on, is left where it is and raises an error instead.
+    """
+    try:
+        info: os.stat_result = os.lstat(path)
+    except FileNotFoundError:
+        return
+
+    if not stat.S_ISSOCK(info.st_mode):
+        raise FileExistsError(
+            errno.EEXIST, "Not a socket, refusing to replace it", path
+        )
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(path)
+        except ConnectionRefusedError:
+            os.unlink(path)
+            return
+
+    raise OSError(errno.EADDRINUSE, "Something is already listening", path)
+
+
+def handle_request(request: Any) -> dict[str, str]:
+    """Roll a single request and return the reply for it."""
+    if not isinstance(request, dict):
+        return {"error": "Invalid request: requests must be JSON objects."}
+
+    if request.get("metrics"):
+        metrics: MetricsRegistry | None = active_metrics()
+
+        if metrics is None:
+            return {"error": "Metrics are not enabled."}
+
+        return {"output": metrics.to_prometheus()}
+
+    try:
+        result = roll(
+            str(request.get("expression", "")),
+            bool(request.get("verbose", False)),
+            RollOption[request.get("roll_option") or "Normal"],
+        )
+    except Exception as err:
+        return {"error": str(err)}
+
+    return {"output": str(result)}
+
+
+class _RollHandler(socketserver.StreamRequestHandler):
+    """Answer every request sent over a single connection."""
+
+    def handle(self: _RollHandler) -> None:
+        for line in self.rfile:
+            try:
+                reply: dict[str, str] = handle_request(json.loads(line))
+            except ValueError as err:
+                reply = {"error": f"Invalid request: {err}"}
+
+            self.wfile.write(json.dumps(reply).encode() + b"\n")
+            self.wfile.flush()
+
+
+class RollServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix domain socket server that rolls with the shared parser."""
+
+    daemon_threads = True
+
+    def __init__(self: RollServer, path: str) -> None:
+        """Start listening on the socket path, replacing a stale socket."""
+        _remove_stale_socket(path)
+        super().__init__(path, _RollHandler, bind_and_activate=False)
+
+        # Only the user that started the daemon gets to use it. The umask
+        # makes sure the socket is private from the moment it is created.
+        umask: int = os.umask(0o177)
+
+        try:
+            self.server_bind()
+        except OSError:
+            self.socket.close()
+            raise
+        finally:
+            os.umask(umask)
+
+        self.path: str = path
+        self.server_activate()
+
+    def server_close(self: RollServer) -> None:
+        """Stop listening and remove the socket file."""
+        super().server_close()
+
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+def _stop(signum: int, frame: Any) -> None:
+    """Stop serving when the daemon is asked to terminate."""
+    raise SystemExit(0)
+
+
+def serve(path: str) -> None:
+    """Roll requests sent to the socket path until interrupted.
+
+    The socket file is removed once the daemon is stopped, whether with
+    Ctrl-C or a SIGTERM. Metrics are collected for as long as it runs.
+    """
+    signal.signal(signal.SIGTERM, _stop)
+    enable_metrics()
+
+    with RollServer(path) as server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+class RollClient:
+    """Connection to a running daemon."""
+
+    def __init__(self: RollClient, path: str, timeout: float = CLIENT_TIMEOUT) -> None:
+        """Connect to the daemon listening on the socket path.
+
+        A PermissionError is raised if the socket is not private to the
+        current user, see check_socket().
+        """
+        check_socket(path)
+        self._socket: socket.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.settimeout(timeout)
+        self._socket.connect(path)
+        self._file = self._socket.makefile("rwb")
+
+    def roll(
+        self: RollClient,
+        expression: str,
+        verbose: bool = False,
+        roll_option: RollOption = RollOption.Normal,
+    ) -> str:
+        """Have the daemon roll the expression and return its output.
+
+        Errors from the daemon are raised as a ValueError, and problems
+        talking to it are raised as an OSError.
+        """
+        request: dict[str, Any] = {
+            "expression": expression,
+            "verbose": verbose,
+            "roll_option": roll_option.name if roll_option else None,
+        }
+
+        self._file.write(json.dumps(request).encode() + b"\n")
+        self._file.flush()
+        line: bytes = self._file.readline()
+
+        if not line:
+            raise ConnectionError("The roll daemon closed the connection.")
+
+        reply: dict[str, str] = json.loads(line)
+
+        if "error" in reply:
+            raise ValueError(reply["error"])
+
+        return reply["output"]
+
+    def close(self: RollClient) -> None:
+        """Close the connection."""
+        self._file.close()
+        self._socket.close()
+
+    def __enter__(self: RollClient) -> RollClient:
+        """Return the client for use in a with statement."""
+        return self
+
+    def __exit__(self: RollClient, *args: object) -> None:
+        """Close the connection at the end of a with statement."""
+        self.close()
@@ -0,0 +1,358 @@
+"""Machine readable output formats for roll results.
+
+The plain text output is made for people: the verbose history is a list
+of preformatted strings and the whole thing has to be parsed back apart
+with regexes to get at the individual rolls. These writers instead
+serialize each result as a record with the expression, its total, and
+(when verbose) every group of dice rolled along with the history. The
+records of repeats like `6#(4d6K3)` also list the total of every group.
+
+Every writer writes bytes straight to a binary stream, such as
+`sys.stdout.buffer`, so that large outputs go out through the stream's
+buffer instead of being built up into one big string first.
+
+Formats:
+    text: The same output as the roll command has always given.
+    json: A single JSON array with one object per result.
+    jsonl: One JSON object per line (JSON Lines).
+    csv: A header row followed by one row per result.
+    bin: Little-endian binary records, see BinaryWriter.
+"""
+from __future__ import annotations
+
+import csv
+import json
+import struct
+from abc import ABC
+from abc import abstractmethod
+from array import array
+from io import TextIOWrapper
+from math import inf
+from math import isfinite
+from typing import Any
+from typing import BinaryIO
+from typing import Iterator
+
+from .parser.types import EvaluationResults
+from .parser.types import RepeatResults
+
+
+def _json_number(value: int | float) -> int | float | str:
+    """Return the value as something that JSON can hold.
+
+    JSON has no infinity or NaN, so those (and LogNumbers, which are too
+    large for a float) are given as strings like "inf" or "1e+1000".
+    """
+    if isinstance(value, float) and not isfinite(value):
+        return str(value)
+
+    return value
+
+
+def _double(value: int | float) -> float:
+    """Return the value as a float, using infinity if it is too large."""
+    try:
+        return float(value)
+    except OverflowError:
+        return -inf if value < 0 else inf
+
+
+def result_record(
+    expression: str, result: int | float | EvaluationResults, verbose: bool = False
+) -> dict[str, Any]:
+    """Return the fields of a single result as a dictionary.
+
+    The rolls and history are only included for verbose results.
+    """
+    if not isinstance(result, EvaluationResults):
+        return {"expression": expression, "total": _json_number(result)}
+
+    record: dict[str, Any] = {
+        "expression": expression,
+        "total": _json_number(result.total),
+    }
+
+    if verbose:
+        record["rolls"] = [
+            {"dice": roll.dice, "rolls": roll.rolls} for roll in result.rolls
+        ]
+        record["history"] = result.history
+
+    if isinstance(result, RepeatResults):
+        record["groups"] = [_json_number(total) for total in result.totals()]
+
+    return record
+
+
+class ResultWriter(ABC):
+    """Write results for expressions to a binary stream.
+
+    Writers are used by calling start(), then write() or write_error()
+    once for every expression, and then finish().
+
+    stream: Binary stream to write to
+    verbose: Whether the results were rolled verbosely
+    """
+
+    def __init__(self: ResultWriter, stream: BinaryIO, verbose: bool = False) -> None:
+        """Initialize a writer for the given binary stream."""
+        self.stream: BinaryIO = stream
+        self.verbose: bool = verbose
+
+    def start(self: ResultWriter) -> None:
+        """Write anything that comes before the first result."""
+
+    @abstractmethod
+    def write(
+        self: ResultWriter,
+        expression: str,
+        result: int | float | EvaluationResults,
+    ) -> None:
+        """Write the result of a single expression."""
+
+    @abstractmethod
+    def write_error(self: ResultWriter, expression: str, message: str) -> None:
+        """Write the error from an expression that could not be rolled."""
+
+    def finish(self: ResultWriter) -> None:
+        """Write anything that comes after the last result and flush."""
+        self.stream.flush()
+
+
+class TextWriter(ResultWriter):
+    """Write results the same way the roll command always has."""
+
+    def write(
+        self: TextWriter,
+        expression: str,
+        result: int | float | EvaluationResults,
+    ) -> None:
+        """Write the result of a single expression."""
+        self.stream.write(f"{result}\n".encode())
+
+    def write_error(self: TextWriter, expression: str, message: str) -> None:
+        """Write the error from an expression that could not be rolled."""
+        self.stream.write(f"error: {message}\n".encode())
+
+
+class JsonLinesWriter(ResultWriter):
+    """Write each result as a JSON object on its own line."""
+
+    def write(
+        self: JsonLinesWriter,
+        expression: str,
+        result: int | float | EvaluationResults,
+    ) -> None:
+        """Write the result of a single expression."""
+        self._write_record(result_record(expression, result, self.verbose))
+
+    def write_error(self: JsonLinesWriter, expression: str, message: str) -> None:
+        """Write the error from an expression that could not be rolled."""
+        self._write_record({"expression": expression, "error": message})
+
+    def _write_record(self: JsonLinesWriter, record: dict[str, Any]) -> None:
+        self.stream.write(
+            json.dumps(record, separators=(",", ":"), allow_nan=False).encode()
+        )
+        self.stream.write(b"\n")
+
+
+class JsonWriter(JsonLinesWriter):
+    """Write all of the results as a single JSON array."""
+
+    def __init__(self: JsonWriter, stream: BinaryIO, verbose: bool = False) -> None:
+        """Initialize a writer for the given binary stream."""
+        super().__init__(stream, verbose)
+        self._separator: bytes = b""
+
+    def start(self: JsonWriter) -> None:
+        """Open the array."""
+        self.stream.write(b"[")
+
+    def _write_record(self: JsonWriter, record: dict[str, Any]) -> None:
+        # Records are written out as they come instead of being collected
+        # into a list, so the separators have to be written by hand.
+        self.stream.write(self._separator)
+        self.stream.write(
+            json.dumps(record, separators=(",", ":"), allow_nan=False).encode()
+        )
+        self._separator = b",\n"
+
+    def finish(self: JsonWriter) -> None:
+        """Close the array and flush."""
+        self.stream.write(b"]\n")
+        super().finish()
+
+
+class CsvWriter(ResultWriter):
+    """Write a row for each result.
+
+    Columns:
+        expression: The expression that was rolled
+        total: The total of the expression
+        dice: The dice strings that were rolled, separated by spaces
+        rolls: The values of each group of dice, separated by semicolons
+        error: The error message if the expression could not be rolled
+    """
+
+    FIELDS: tuple[str, ...] = ("expression", "total", "dice", "rolls", "error")
+
+    def __init__(self: CsvWriter, stream: BinaryIO, verbose: bool = False) -> None:
+        """Initialize a writer for the given binary stream."""
+        super().__init__(stream, verbose)
+        self._text: TextIOWrapper = TextIOWrapper(
+            stream, encoding="utf-8", newline="", write_through=True
+        )
+        self._writer = csv.writer(self._text)
+
+    def start(self: CsvWriter) -> None:
+        """Write the header row."""
+        self._writer.writerow(self.FIELDS)
+
+    def write(
+        self: CsvWriter,
+        expression: str,
+        result: int | float | EvaluationResults,
+    ) -> None:
+        """Write the result of a single expression."""
+        if not isinstance(result, EvaluationResults):
+            self._writer.writerow((expression, _json_number(result), "", "", ""))
+            return
+
+        self._writer.writerow(
+            (
+                expression,
+                _json_number(result.total),
+                " ".join(roll.dice for roll in result.rolls),
+                ";".join(" ".join(map(str, roll.rolls)) for roll in result.rolls),
+                "",
+            )
+        )
+
+    def write_error(self: CsvWriter, expression: str, message: str) -> None:
+        """Write the error from an expression that could not be rolled."""
+        self._writer.writerow((expression, "", "", "", message))
+
+    def finish(self: CsvWriter) -> None:
+        """Flush and give the stream back without closing it."""
+        self._text.flush()
+        self._text.detach()
+        super().finish()
+
+
+_BIN_TOTAL: struct.Struct = struct.Struct("<dI")
+_BIN_GROUP: struct.Struct = struct.Struct("<HI")
+_BIN_STRING: struct.Struct = struct.Struct("<I")
+
+
+class BinaryWriter(ResultWriter):
+    """Write results as compact little-endian binary records.
+
+    Every record starts with a status byte. Successful results (status 0)
+    are followed by:
+        expression: uint32 length followed by that many UTF-8 bytes
+        total: float64, infinity for anything too large for a float
+        groups: uint32 number of groups of dice, then for each group
+            dice: uint16 length followed by that many UTF-8 bytes
+            rolls: uint32 count followed by that many float64 values
+
+    Errors (status 1) are followed by the expression and then the
+    message, both as a uint32 length and that many UTF-8 bytes.
+
+    Roll values are written straight from an array, so even very large
+    pools of dice are written without being turned into text.
+    """
+
+    def _write_string(self: BinaryWriter, text: str) -> None:
+        data: bytes = text.encode()
+        self.stream.write(_BIN_STRING.pack(len(data)))
+        self.stream.write(data)
+
+    def write(
+        self: BinaryWriter,
+        expression: str,
+        result: int | float | EvaluationResults,
+    ) -> None:
+        """Write the result of a single expression."""
+        total: int | float = (
+            result.total if isinstance(result, EvaluationResults) else result
+        )
+        rolls = result.rolls if isinstance(result, EvaluationResults) else []
+
+        self.stream.write(b"\x00")
+        self._write_string(expression)
+        self.stream.write(_BIN_TOTAL.pack(_double(total), len(rolls)))
+
+        for roll in rolls:
+            dice: bytes = roll.dice.encode()
+            self.stream.write(_BIN_GROUP.pack(len(dice), len(roll.rolls)))
+            self.stream.write(dice)
+
+            try:
+                values: array[float] = array("d", roll.rolls)
+            except OverflowError:
+                values = array("d", map(_double, roll.rolls))
+
+            self.stream.write(values.tobytes())
+
+    def write_error(self: BinaryWriter, expression: str, message: str) -> None:
+        """Write the error from an expression that could not be rolled."""
+        self.stream.write(b"\x01")
+        self._write_string(expression)
+        self._write_string(message)
+
+
+def _read_exactly(stream: BinaryIO, size: int) -> bytes:
+    """Read exactly size bytes, raising EOFError if the stream ends first."""
+    data: bytes = stream.read(size)
+
+    if len(data) != size:
+        raise EOFError("Binary results ended in the middle of a record.")
+
+    return data
+
+
+def _read_string(stream: BinaryIO) -> str:
+    """Read a length prefixed UTF-8 string."""
+    (size,) = _BIN_STRING.unpack(_read_exactly(stream, _BIN_STRING.size))
+    return _read_exactly(stream, size).decode()
+
+
+def read_binary(stream: BinaryIO) -> Iterator[dict[str, Any]]:
+    """Read back the records written by a BinaryWriter.
+
+    Records are given back as dictionaries in the same shape that the
+    JSON formats use, with every number as a float.
+    """
+    while True:
+        status: bytes = stream.read(1)
+
+        if not status:
+            return
+
+        expression: str = _read_string(stream)
+
+        if status == b"\x01":
+            yield {"expression": expression, "error": _read_string(stream)}
+            continue
+
+        total, count = _BIN_TOTAL.unpack(_read_exactly(stream, _BIN_TOTAL.size))
+        rolls: list[dict[str, Any]] = []
+
+        for _ in range(count):
+            size, length = _BIN_GROUP.unpack(_read_exactly(stream, _BIN_GROUP.size))
+            dice: str = _read_exactly(stream, size).decode()
+            values: array[float] = array("d")
+            values.frombytes(_read_exactly(stream, length * values.itemsize))
+            rolls.append({"dice": dice, "rolls": values.tolist()})
+
+        yield {"expression": expression, "total": total, "rolls": rolls}
+
+
+WRITERS: dict[str, type[ResultWriter]] = {
+    "text": TextWriter,
+    "json": JsonWriter,
+    "jsonl": JsonLinesWriter,
+    "csv": CsvWriter,
+    "bin": BinaryWriter,
+}
@@ -3,9 +3,44 @@
 DiceParser:
 
     Acts as the interpreter for the incoming dice rolling string.
+
+CostEstimate, CostLimits, ExpressionTooCostlyError:
+
+    Estimate what an expression will cost before evaluating it and
+    reject expressions that are too costly.
+
+EvaluationBudget, BudgetExceededError:
+
+    Stop an evaluation part of the way through once it goes over budget.
+
+MetricsRegistry, enable_metrics, disable_metrics:
+
+    Count what the parser does and how long it takes.
+
+hooks:
+
+    Register callbacks for parse, roll, and operator events.
 """
 from typing import Tuple
 
+from .budget import BudgetExceededError as BudgetExceededError
+from .budget import EvaluationBudget as EvaluationBudget
+from .cost import CostEstimate as CostEstimate
+from .cost import CostLimits as CostLimits
+from .cost import ExpressionTooCostlyError as ExpressionTooCostlyError
 from .diceparser import DiceParser as DiceParser
+from .metrics import disable_metrics as disable_metrics
+from .metrics import enable_metrics as enable_metrics
+from .metrics import MetricsRegistry as MetricsRegistry
 
-__all__: Tuple[str, ...] = ("DiceParser",)
+__all__: Tuple[str, ...] = (
+    "BudgetExceededError",
+    "CostEstimate",
+    "CostLimits",
+    "DiceParser",
+    "disable_metrics",
+    "enable_metrics",
+    "EvaluationBudget",
+    "ExpressionTooCostlyError",
+    "MetricsRegistry",
+)
@@ -0,0 +1,144 @@
+"""Cooperative evaluation budgets.
+
+The cost model can only guess at how much work an expression will be
+before it is evaluated. Something like `(100d100)d(100d100)` depends on
+what the inner dice roll, so a service that needs hard limits per request
+also needs to be able to stop an evaluation part of the way through.
+
+An EvaluationBudget is made active for the duration of an evaluation and
+is checked by the operations that can get expensive: rolling dice,
+keeping/dropping dice, factorials, and exponents. Once any of its limits
+is crossed, a BudgetExceededError is raised that carries how far along
+the evaluation got.
+
+The active budget is kept in a context variable so that every thread (and
+every asyncio task) evaluating expressions has its own.
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Iterator
+
+_ACTIVE_BUDGET: ContextVar[EvaluationBudget | None] = ContextVar(
+    "roll_cli_active_budget", default=None
+)
+
+
+class BudgetExceededError(RuntimeError):
+    """Raised when an evaluation goes over its budget.
+
+    reason: Which limit was crossed
+    dice_drawn: The number of dice drawn before stopping
+    elapsed: The number of seconds spent evaluating before stopping
+    partial_rolls: The rolls of the dice roll that was interrupted, if any
+    """
+
+    def __init__(
+        self: BudgetExceededError,
+        reason: str,
+        dice_drawn: int,
+        elapsed: float,
+        partial_rolls: list[int | float] | None = None,
+    ) -> None:
+        """Initialize the error with the progress made so far."""
+        super().__init__(
+            f"Evaluation budget exceeded ({reason}) after drawing "
+            f"{dice_drawn} dice in {elapsed:.6f} seconds"
+        )
+        self.reason: str = reason
+        self.dice_drawn: int = dice_drawn
+        self.elapsed: float = elapsed
+        self.partial_rolls: list[int | float] = partial_rolls or []
+
+
+class EvaluationBudget:
+    """Limits for a single evaluation, checked while it is running.
+
+    max_seconds: Wall time that the evaluation is allowed to take
+    max_dice: Number of dice that are allowed to be drawn
+    max_bits: Bit length that intermediate values are allowed to reach
+
+    Any of the limits may be None to disable that check.
+    """
+
+    def __init__(
+        self: EvaluationBudget,
+        max_seconds: float | None = None,
+        max_dice: int | None = None,
+        max_bits: float | None = None,
+    ) -> None:
+        """Initialize an EvaluationBudget object."""
+        self.max_seconds: float | None = max_seconds
+        self.max_dice: int | None = max_dice
+        self.max_bits: float | None = max_bits
+
+        self.dice_drawn: int = 0
+        self._started: float = perf_counter()
+
+    @property
+    def elapsed(self: EvaluationBudget) -> float:
+        """Return the number of seconds since the budget was started."""
+        return perf_counter() - self._started
+
+    def start(self: EvaluationBudget) -> None:
+        """Reset the progress made against the budget."""
+        self.dice_drawn = 0
+        self._started = perf_counter()
+
+    def _exceeded(
+        self: EvaluationBudget,
+        reason: str,
+        partial_rolls: list[int | float] | None = None,
+    ) -> BudgetExceededError:
+        return BudgetExceededError(reason, self.dice_drawn, self.elapsed, partial_rolls)
+
+    def check_time(
+        self: EvaluationBudget, partial_rolls: list[int | float] | None = None
+    ) -> None:
+        """Raise if the evaluation has run out of time."""
+        if self.max_seconds is not None and self.elapsed > self.max_seconds:
+            raise self._exceeded("time", partial_rolls)
+
+    def charge_dice(
+        self: EvaluationBudget,
+        num_dice: int,
+        partial_rolls: list[int | float] | None = None,
+    ) -> None:
+        """Account for dice that are about to be drawn.
+
+        This is called before the dice are drawn so that we never do the
+        work for dice that we are not allowed to draw.
+        """
+        if self.max_dice is not None and self.dice_drawn + num_dice > self.max_dice:
+            raise self._exceeded("dice", partial_rolls)
+
+        self.check_time(partial_rolls)
+        self.dice_drawn += num_dice
+
+    def check_bits(self: EvaluationBudget, bits: float) -> None:
+        """Raise if a value of the given bit length is not allowed."""
+        if self.max_bits is not None and bits > self.max_bits:
+            raise self._exceeded("bits")
+
+        self.check_time()
+
+
+def active_budget() -> EvaluationBudget | None:
+    """Return the budget for the evaluation currently running, if any."""
+    return _ACTIVE_BUDGET.get()
+
+
+@contextmanager
+def use_budget(budget: EvaluationBudget | None) -> Iterator[None]:
+    """Make the given budget the active one for the duration of the block."""
+    if budget is not None:
+        budget.start()
+
+    token = _ACTIVE_BUDGET.set(budget)
+
+    try:
+        yield
+    finally:
+        _ACTIVE_BUDGET.reset(token)
@@ -0,0 +1,302 @@
+"""Static cost model for dice expressions.
+
+Before we evaluate anything, we can walk over the parsed (but not yet
+evaluated) expression and work out roughly how much work it is going to
+be. This matters because a single innocent-looking expression such as
+`1000000000d6` or `10^10^10` is enough to freeze the whole process while
+we build a list of a billion rolls or a number with billions of digits.
+
+The estimates are upper bounds for the usual integer expressions:
+    dice: The number of individual dice that will be drawn.
+    max_bits: The size (in bits) of the largest intermediate value.
+    memory: The approximate number of bytes the evaluation will allocate.
+
+All magnitudes are tracked as base 2 logarithms so that the estimate
+itself never has to build the huge numbers that it is warning us about.
+
+A repeat like `6#(4d6K3)` costs as much as its body does for every group.
+"""
+from __future__ import annotations
+
+from math import ceil
+from math import inf
+from math import lgamma
+from math import log
+from math import log2
+from typing import Any
+from typing import Mapping
+
+from .stackparser import is_leaf
+from .stackparser import is_placeholder
+from .stackparser import is_prefix
+from .stackparser import is_repeat
+from .stackparser import iter_postorder
+from .stackparser import placeholder_value
+from .stackparser import node_operator
+
+# Rough number of bytes needed to hold a single rolled die: one list slot
+# plus the integer object itself along with its share of the history.
+BYTES_PER_DIE: int = 40
+
+
+class CostEstimate:
+    """Estimated cost of evaluating a single expression.
+
+    dice: Upper bound on the number of dice that will be drawn
+    max_bits: Upper bound on the bit length of any intermediate value
+    memory: Approximate number of bytes that evaluation will allocate
+    """
+
+    def __init__(
+        self: CostEstimate,
+        dice: float = 0,
+        max_bits: float = 0,
+        memory: float = 0,
+    ) -> None:
+        """Initialize a CostEstimate object."""
+        self.dice: float = dice
+        self.max_bits: float = max_bits
+        self.memory: float = memory
+
+    def __repr__(self: CostEstimate) -> str:
+        """Return a string representation of the estimate."""
+        return (
+            f"CostEstimate(dice={self.dice}, max_bits={self.max_bits}, "
+            f"memory={self.memory})"
+        )
+
+
+class CostLimits:
+    """Admission limits for expressions, checked against a CostEstimate.
+
+    Any of the limits may be set to None to disable that check.
+
+    When approximate is set, expressions that only go over the limit on
+    bits are downgraded to the log-domain numeric mode instead of being
+    rejected, since approximated values never get built.
+    """
+
+    def __init__(
+        self: CostLimits,
+        max_dice: float | None = 1_000_000,
+        max_bits: float | None = 1 << 20,
+        max_memory: float | None = 256 * 1024 * 1024,
+        approximate: bool = False,
+    ) -> None:
+        """Initialize a CostLimits object."""
+        self.max_dice: float | None = max_dice
+        self.max_bits: float | None = max_bits
+        self.max_memory: float | None = max_memory
+        self.approximate: bool = approximate
+
+    def violations(self: CostLimits, estimate: CostEstimate) -> list[str]:
+        """Return a description of every limit the estimate goes over."""
+        checks: list[tuple[str, float, float | None]] = [
+            ("dice", estimate.dice, self.max_dice),
+            ("bits", estimate.max_bits, self.max_bits),
+            ("memory", estimate.memory, self.max_memory),
+        ]
+
+        return [
+            f"{name}: {value} > {limit}"
+            for name, value, limit in checks
+            if limit is not None and value > limit
+        ]
+
+    def check(self: CostLimits, expression: str, estimate: CostEstimate) -> bool:
+        """Raise an error if the estimate is over any of the limits.
+
+        Returns whether the expression has to be downgraded to the
+        log-domain numeric mode in order to be admitted.
+        """
+        downgrade: bool = (
+            self.approximate
+            and self.max_bits is not None
+            and estimate.max_bits > self.max_bits
+        )
+
+        if downgrade:
+            # Approximated values take up next to no memory.
+            estimate = CostEstimate(
+                estimate.dice, self.max_bits or 0, estimate.dice * BYTES_PER_DIE
+            )
+
+        violations: list[str] = self.violations(estimate)
+
+        if violations:
+            raise ExpressionTooCostlyError(expression, estimate, violations)
+
+        return downgrade
+
+
+class ExpressionTooCostlyError(ValueError):
+    """Raised when an expression is estimated to be too costly to evaluate."""
+
+    def __init__(
+        self: ExpressionTooCostlyError,
+        expression: str,
+        estimate: CostEstimate,
+        violations: list[str],
+    ) -> None:
+        """Initialize the error with the estimate that caused it."""
+        super().__init__(
+            f"Expression is too costly to evaluate ({', '.join(violations)}): "
+            + expression
+        )
+        self.expression: str = expression
+        self.estimate: CostEstimate = estimate
+        self.violations: list[str] = violations
+
+
+def _exp2(bits: float) -> float:
+    """Return 2 ** bits without overflowing."""
+    return inf if bits > 1023 else 2.0**bits
+
+
+def _literal_bits(value: int | float) -> float:
+    """Return the number of bits needed for the magnitude of a literal."""
+    magnitude: float = abs(value)
+
+    return log2(magnitude) if magnitude > 1 else 0
+
+
+def _factorial_bits(bits: float) -> float:
+    """Return the number of bits in n! where n has the given bit length."""
+    n: float = _exp2(bits)
+
+    return inf if n == inf else lgamma(n + 2) / log(2)
+
+
+class _CostWalker:
+    """Walk a parse tree and total up what it will cost to evaluate."""
+
+    def __init__(
+        self: _CostWalker, bindings: Mapping[str, int | float] | None = None
+    ) -> None:
+        self.bindings: Mapping[str, int | float] | None = bindings
+        self.dice: float = 0
+        self.max_bits: float = 0
+
+    def _roll(self: _CostWalker, count_bits: float, sides_bits: float) -> float:
+        count: float = _exp2(count_bits)
+
+        # Going through logarithms leaves us slightly off of whole numbers,
+        # and any fractional die still ends up being rolled.
+        self.dice += count if count == inf else ceil(round(count, 6))
+        return self._track(count_bits + sides_bits)
+
+    def _track(self: _CostWalker, bits: float) -> float:
+        self.max_bits = max(self.max_bits, bits)
+        return bits
+
+    def walk(self: _CostWalker, tree: Any) -> float:
+        """Return the estimated bit length of the value the tree produces."""
+        values: list[float] = []
+
+        for node in iter_postorder(tree):
+            if is_leaf(node):
+                values.append(self._walk_leaf(node))
+                continue
+
+            operator: str = node_operator(node)
+
+            if len(node) == 3:
+                right: float = values.pop()
+                values.append(self._walk_binary(operator, values.pop(), right))
+            elif is_prefix(node):
+                values.append(self._walk_prefix(operator, values.pop()))
+            else:
+                values.append(self._walk_postfix(operator, values.pop()))
+
+        return values[-1]
+
+    def _walk_leaf(self: _CostWalker, node: int | float | str) -> float:
+        if is_placeholder(node):
+            node = placeholder_value(str(node), self.bindings)
+
+        if isinstance(node, str):
+            # The only strings left as leaves are atoms.
+            return self._roll(0, log2(100)) if node == "d%" else 2
+
+        return self._track(_literal_bits(node))
+
+    def _walk_prefix(self: _CostWalker, operator: str, bits: float) -> float:
+        if operator == "sqrt":
+            return bits / 2
+
+        if operator == "d":
+            return self._roll(0, bits)
+
+        return bits
+
+    def _walk_postfix(self: _CostWalker, operator: str, bits: float) -> float:
+        if operator == "!":
+            return self._track(_factorial_bits(bits))
+
+        if operator == "d%":
+            return self._roll(bits, log2(100))
+
+        # Keeping and dropping can only ever lower the total.
+        return bits
+
+    def _walk_binary(
+        self: _CostWalker, operator: str, left: float, right: float
+    ) -> float:
+        if operator == "d":
+            return self._roll(left, right)
+
+        if operator in ("^", "**"):
+            return self._track(_exp2(right) * left)
+
+        if operator in ("+", "-"):
+            return self._track(max(left, right) + 1)
+
+        if operator == "*":
+            return self._track(left + right)
+
+        if operator == "%":
+            return right
+
+        if operator in ("<", ">", "=", "<=", ">="):
+            return 0
+
+        # Keep, drop, and both types of division.
+        return left
+
+
+def estimate_tree_cost(
+    tree: Any, bindings: Mapping[str, int | float] | None = None
+) -> CostEstimate:
+    """Estimate the cost of evaluating a parse tree from the stack parser.
+
+    Placeholders in the tree are estimated with the values bound to them.
+    """
+    if is_repeat(tree):
+        return _estimate_repeat_cost(tree, bindings)
+
+    walker: _CostWalker = _CostWalker(bindings)
+    walker.walk(tree)
+
+    return CostEstimate(
+        dice=walker.dice,
+        max_bits=walker.max_bits,
+        memory=walker.dice * BYTES_PER_DIE + walker.max_bits / 8,
+    )
+
+
+def _estimate_repeat_cost(
+    tree: list[Any], bindings: Mapping[str, int | float] | None
+) -> CostEstimate:
+    """Estimate the cost of a repeat, which is its body for every group."""
+    count: int | float = (
+        placeholder_value(tree[0], bindings) if is_placeholder(tree[0]) else tree[0]
+    )
+    groups: float = max(ceil(count), 0)
+    body: CostEstimate = estimate_tree_cost(tree[2], bindings)
+
+    return CostEstimate(
+        dice=body.dice * groups,
+        max_bits=body.max_bits,
+        # Every group takes up at least a slot of its own.
+        memory=(body.memory + BYTES_PER_DIE) * groups,
+    )
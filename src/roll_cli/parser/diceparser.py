@@ -26,20 +26,23 @@ from __future__ import annotations
 
 from math import e
 from math import pi
+from threading import Lock
+from time import perf_counter
 from typing import Any
 from typing import Callable
-
-from pyparsing import CaselessKeyword
-from pyparsing import CaselessLiteral
-from pyparsing import infixNotation
-from pyparsing import Literal
-from pyparsing import oneOf
-from pyparsing import opAssoc
-from pyparsing import ParserElement
-from pyparsing import ParseResults
-from pyparsing import pyparsing_common
-from pyparsing.exceptions import ParseException
-
+from typing import Mapping
+from typing import TYPE_CHECKING
+from typing import TypeVar
+
+from . import hooks
+from .budget import active_budget
+from .budget import EvaluationBudget
+from .budget import use_budget
+from .cost import CostEstimate
+from .cost import CostLimits
+from .cost import estimate_tree_cost
+from .metrics import active_metrics
+from .metrics import MetricsRegistry
 from .operations import add
 from .operations import expo
 from .operations import factorial
@@ -47,17 +50,43 @@ from .operations import floor_div
 from .operations import mod
 from .operations import mult
 from .operations import roll_dice
+from .operations import roll_dice_groups
 from .operations import sqrt
 from .operations import sub
 from .operations import true_div
+from .program import split_statements
+from .stackparser import build_tree
+from .stackparser import check_bindings
+from .stackparser import is_leaf
+from .stackparser import is_placeholder
+from .stackparser import is_prefix
+from .stackparser import is_repeat
+from .stackparser import iter_postorder
+from .stackparser import node_operands
+from .stackparser import node_operator
+from .stackparser import placeholder_value
+from .tokenizer import ExpressionSyntaxError
+from .tokenizer import Token
+from .tokenizer import tokenize
 from .types import EvaluationResults
+from .types import ProgramResults
+from .types import RepeatResults
 from .types import RollOption
 from .types import RollResults
+from .types.lognumber import use_log_domain
 
-ParserElement.enablePackrat()
+if TYPE_CHECKING:
+    from pyparsing import ParserElement
+    from pyparsing import ParseResults
 
 ROLL_TYPE: RollOption
 
+# Number of compiled dice strings that each parser keeps around.
+COMPILE_CACHE_SIZE: int = 1024
+
+T = TypeVar("T")
+R = TypeVar("R")
+
 
 class DiceParser:
     """Parser for evaluating dice strings."""
@@ -84,32 +113,81 @@ class DiceParser:
     }
 
     def __init__(self: DiceParser) -> None:
-        """Initialize a parser to handle dice strings."""
-        self._parser = self._create_parser()
+        """Initialize a parser to handle dice strings.
+
+        The pyparsing grammar is only needed by parse() and takes a while
+        to build, so it is not created until the first time it is used.
+        """
+        self._parser: ParserElement | None = None
+        self._compiled: dict[str, list[tuple[Any, int]]] = {}
+        self._programs: dict[
+            str, list[tuple[str | None, str, int, list[tuple[Any, int]]]]
+        ] = {}
+
+        # Seconds spent compiling strings for estimate_cost(), which are
+        # recorded by the evaluation that follows instead.
+        self._unrecorded_parses: dict[str, float] = {}
+
+        # The daemon shares one parser between its threads.
+        self._cache_lock: Lock = Lock()
+
+    def _grammar(self: DiceParser) -> ParserElement:
+        """Return the pyparsing grammar, creating it the first time."""
+        if self._parser is None:
+            self._parser = self._create_parser()
+
+        return self._parser
 
     @staticmethod
     def _create_parser() -> ParserElement:
         """Create an instance of a dice roll string parser."""
-        atom = (
-            CaselessLiteral("d%").setParseAction(
-                lambda: DiceParser._handle_roll(1, 100)
-            )
-            | pyparsing_common.number
-            | CaselessKeyword("pi").setParseAction(lambda: pi)
-            | CaselessKeyword("e").setParseAction(lambda: e)
-        )
+        from pyparsing import CaselessKeyword
+        from pyparsing import CaselessLiteral
+        from pyparsing import infixNotation
+        from pyparsing import Literal
+        from pyparsing import oneOf
+        from pyparsing import opAssoc
+        from pyparsing import ParserElement
+        from pyparsing import pyparsing_common
+
+        ParserElement.enablePackrat()
+
+        percent_die = CaselessLiteral("d%")
+        pi_keyword = CaselessKeyword("pi")
+        e_keyword = CaselessKeyword("e")
+
+        percent_die.setParseAction(lambda: DiceParser._handle_roll(1, 100))
+        pi_keyword.setParseAction(lambda: pi)
+        e_keyword.setParseAction(lambda: e)
+
+        atom = percent_die | pyparsing_common.number | pi_keyword | e_keyword
 
         expression = infixNotation(
             atom,
             [
                 # Unary minus
-                (Literal("-"), 1, opAssoc.RIGHT, DiceParser._handle_unary_minus),
+                (
+                    Literal("-"),
+                    1,
+                    opAssoc.RIGHT,
+                    DiceParser._handle_unary_minus,
+                ),
                 # Square root
-                (CaselessLiteral("sqrt"), 1, opAssoc.RIGHT, DiceParser._handle_sqrt),
+                (
+                    CaselessLiteral("sqrt"),
+                    1,
+                    opAssoc.RIGHT,
+                    DiceParser._handle_sqrt,
+                ),
                 # Exponents
                 (oneOf("^ **"), 2, opAssoc.RIGHT, DiceParser._handle_expo),
                 # Unary minus (#2)
-                (Literal("-"), 1, opAssoc.RIGHT, DiceParser._handle_unary_minus),
+                (
+                    Literal("-"),
+                    1,
+                    opAssoc.RIGHT,
+                    DiceParser._handle_unary_minus,
+                ),
                 # Factorial
                 (Literal("!"), 1, opAssoc.LEFT, DiceParser._handle_factorial),
                 # Dice notations
@@ -117,7 +195,7 @@ class DiceParser:
                     CaselessLiteral("d%"),
                     1,
                     opAssoc.LEFT,
-                    lambda toks: DiceParser._handle_roll(toks[0][0], 100),
+                    DiceParser._handle_percent_roll,
                 ),
                 (
                     CaselessLiteral("d"),
@@ -148,13 +226,21 @@ class DiceParser:
                     DiceParser._handle_standard_operation,
                 ),
                 # Addition and subtraction
-                (oneOf("+ -"), 2, opAssoc.LEFT, DiceParser._handle_standard_operation),
+                (
+                    oneOf("+ -"),
+                    2,
+                    opAssoc.LEFT,
+                    DiceParser._handle_standard_operation,
+                ),
                 # Comparisons
-                (oneOf("< > = <= >="), 2, opAssoc.RIGHT, DiceParser._handle_comparison),
-                # TODO: Use this to make a pretty exception message
-                # where we point out and explain the issue.
+                (
+                    oneOf("< > = <= >="),
+                    2,
+                    opAssoc.RIGHT,
+                    DiceParser._handle_comparison,
+                ),
             ],
-        ).setFailAction(lambda s, loc, expr, err: print(err))
+        )
 
         return expression
 
@@ -185,7 +271,14 @@ class DiceParser:
     def _handle_factorial(
         toks: list[list[int | float | EvaluationResults]],
     ) -> int | float | EvaluationResults:
-        return factorial(toks[0][0])
+        # The grammar groups 3!! as [3, "!", "!"], so every factorial is
+        # taken in turn, the same as the nested trees of the stack parser.
+        result: int | float | EvaluationResults = toks[0][0]
+
+        for _ in toks[0][1:]:
+            result = factorial(result)
+
+        return result
 
     @staticmethod
     def _handle_comparison(
@@ -233,6 +326,18 @@ class DiceParser:
         roll_option: RollOption = ROLL_TYPE
         return roll_dice(sides, num, roll_option)
 
+    @staticmethod
+    def _handle_percent_roll(
+        toks: list[list[int | float | EvaluationResults]],
+    ) -> int | float | EvaluationResults:
+        # Like factorials, 1d%d% is grouped as [1, "d%", "d%"].
+        result: int | float | EvaluationResults = toks[0][0]
+
+        for _ in toks[0][1:]:
+            result = DiceParser._handle_roll(result, 100)
+
+        return result
+
     @staticmethod
     def _handle_keep(
         toks: list[list[int | float | EvaluationResults | str]],
@@ -246,6 +351,8 @@ class DiceParser:
         # As we perform operations, this value will be continuously
         # updated and used as the left-hand side.
         result: EvaluationResults = tokens[0]
+        budget: EvaluationBudget | None = active_budget()
+        metrics: MetricsRegistry | None = active_metrics()
 
         # If it's the case that we have an implied keep amount, we
         # need to manually add it to the end here.
@@ -264,6 +371,9 @@ class DiceParser:
 
             right: EvaluationResults | float | int | str = tokens[right_index]
 
+            if budget is not None:
+                budget.check_time()
+
             if isinstance(right, EvaluationResults):
                 result += right
                 result.total -= right.total
@@ -272,6 +382,9 @@ class DiceParser:
             last_roll: RollResults = result.rolls[-1]
             lower_total_by: int | float = 0
 
+            if metrics is not None:
+                metrics.increment("keep_operations")
+
             if operation_string == "k":
                 lower_total_by = last_roll.keep_lowest(float(right))
                 result.history.append(f"Keeping lowest: {right}: {last_roll.rolls}")
@@ -279,6 +392,9 @@ class DiceParser:
                 lower_total_by = last_roll.keep_highest(float(right))
                 result.history.append(f"Keeping highest: {right}: {last_roll.rolls}")
 
+            if hooks.enabled():
+                hooks.emit("on_keep", operation_string, right, last_roll)
+
             result.total -= lower_total_by
 
         return result
@@ -300,6 +416,8 @@ class DiceParser:
         # As we perform operations, this value will be continuously
         # updated and used as the left-hand side.
         result: EvaluationResults = tokens[0]
+        budget: EvaluationBudget | None = active_budget()
+        metrics: MetricsRegistry | None = active_metrics()
 
         # If it's the case that we have an implied keep amount, we
         # need to manually add it to the end here.
@@ -318,6 +436,9 @@ class DiceParser:
 
             right: EvaluationResults | float | int | str = tokens[right_index]
 
+            if budget is not None:
+                budget.check_time()
+
             if isinstance(right, EvaluationResults):
                 result += right
                 result.total -= right.total
@@ -326,6 +447,9 @@ class DiceParser:
             last_roll: RollResults = result.rolls[-1]
             lower_total_by: int | float = 0
 
+            if metrics is not None:
+                metrics.increment("drop_operations")
+
             if operation_string == "x":
                 lower_total_by = last_roll.keep_highest(
                     len(last_roll.rolls) - float(right)
@@ -337,6 +461,9 @@ class DiceParser:
                 )
                 result.history.append(f"Dropping highest: {right}: {last_roll.rolls}")
 
+            if hooks.enabled():
+                hooks.emit("on_drop", operation_string, right, last_roll)
+
             result.total -= lower_total_by
 
         return result
@@ -382,25 +509,686 @@ class DiceParser:
     def parse(
         self: DiceParser, dice_string: str, roll_option: RollOption = RollOption.Normal
     ) -> ParseResults:
-        """Parse well-formed dice roll strings."""
+        """Parse well-formed dice roll strings.
+
+        The dice string is validated by the tokenizer first so that
+        malformed input is rejected before pyparsing ever sees it.
+        """
+        from pyparsing.exceptions import ParseException
+
         global ROLL_TYPE
         ROLL_TYPE = roll_option
+        tokenize(dice_string)
+
         try:
-            result: ParseResults = self._parser.parseString(dice_string, parseAll=True)
+            result: ParseResults = self._grammar().parseString(
+                dice_string, parseAll=True
+            )
         except ParseException as err:
             raise SyntaxError("Unable to parse input string: " + dice_string) from err
 
         return result
 
+    def parse_tree(self: DiceParser, dice_string: str) -> Any:
+        """Parse a dice string into its parse tree without evaluating it.
+
+        This uses the stack based parser instead of the grammar, so the
+        depth of nesting is not limited by the Python stack.
+        """
+        if not hooks.enabled():
+            return build_tree(dice_string, tokenize(dice_string))
+
+        started: float = perf_counter()
+        tokens: list[Token] = tokenize(dice_string)
+        hooks.emit("on_tokenize_end", dice_string, perf_counter() - started)
+
+        return build_tree(dice_string, tokens)
+
+    def compile(self: DiceParser, dice_string: str) -> list[tuple[Any, int]]:
+        """Parse a dice string into a form that is quick to evaluate repeatedly.
+
+        The compiled form is the parse tree flattened into the order that
+        its nodes are evaluated in, along with how many operands each
+        node takes, so evaluating it again never has to walk the tree.
+        """
+        return [
+            (node, 0 if is_leaf(node) else len(node_operands(node)))
+            for node in iter_postorder(self.parse_tree(dice_string))
+        ]
+
+    def compile_program(
+        self: DiceParser, source: str
+    ) -> list[tuple[str | None, str, int, list[tuple[Any, int]]]]:
+        """Compile every statement of a program.
+
+        Each statement is given along with its name, its text, and where
+        in the program it starts. See roll_cli.parser.program for what
+        programs look like.
+        """
+        program: list[tuple[str | None, str, int, list[tuple[Any, int]]]] = []
+
+        for name, statement, start in split_statements(source):
+            try:
+                program.append((name, statement, start, self.compile(statement)))
+            except ExpressionSyntaxError as err:
+                # Point at the problem in the program, not just the statement.
+                raise ExpressionSyntaxError(
+                    err.problem, source, start + err.position
+                ) from None
+
+        return program
+
+    def _compile_cached(
+        self: DiceParser, dice_string: str, metrics: MetricsRegistry | None
+    ) -> list[tuple[Any, int]]:
+        """Compile a dice string, reusing the result for repeated strings."""
+        if metrics is not None and self._unrecorded_parses:
+            with self._cache_lock:
+                seconds: float | None = self._unrecorded_parses.pop(dice_string, None)
+
+            if seconds is not None:
+                # Compiled by estimate_cost() for this evaluation, so it is
+                # a miss rather than a hit.
+                metrics.record_parse(seconds)
+                return self._cached(self._compiled, dice_string, self.compile, None)
+
+        return self._cached(self._compiled, dice_string, self.compile, metrics)
+
+    def _cached(
+        self: DiceParser,
+        cache: dict[str, T],
+        dice_string: str,
+        compiler: Callable[[str], T],
+        metrics: MetricsRegistry | None,
+    ) -> T:
+        """Compile with the compiler, reusing the result for repeated strings.
+
+        Only looking in and updating the cache is done under the lock, so
+        two threads may both compile a new string, but only one is kept.
+        """
+        with self._cache_lock:
+            program: T | None = cache.get(dice_string)
+
+        if program is not None:
+            if metrics is not None:
+                metrics.increment("parse_cache_hits")
+
+            return program
+
+        started: float = perf_counter()
+
+        if hooks.enabled():
+            hooks.emit("on_parse_start", dice_string)
+
+        try:
+            program = compiler(dice_string)
+        finally:
+            if hooks.enabled():
+                hooks.emit("on_parse_end", dice_string, perf_counter() - started)
+
+        if metrics is not None:
+            metrics.record_parse(perf_counter() - started)
+
+        with self._cache_lock:
+            if len(cache) >= COMPILE_CACHE_SIZE:
+                # Dictionaries keep their insertion order, so this is the oldest.
+                cache.pop(next(iter(cache)), None)
+
+            cache[dice_string] = program
+
+        return program
+
+    @staticmethod
+    def _run_compiled(
+        program: list[tuple[Any, int]],
+        count: int,
+        roll_option: RollOption,
+        metrics: MetricsRegistry | None,
+        bindings: Mapping[str, int | float] | None = None,
+    ) -> list[Any]:
+        """Evaluate a compiled dice string count times."""
+        if metrics is None:
+            return [
+                DiceParser._evaluate_compiled(program, roll_option, bindings)
+                for _ in range(count)
+            ]
+
+        results: list[Any] = []
+
+        for _ in range(count):
+            started: float = perf_counter()
+            results.append(
+                DiceParser._evaluate_compiled(program, roll_option, bindings)
+            )
+            metrics.record_evaluation(perf_counter() - started)
+
+        return results
+
+    @staticmethod
+    def _evaluate_compiled(
+        program: list[tuple[Any, int]],
+        roll_option: RollOption,
+        bindings: Mapping[str, int | float] | None = None,
+    ) -> int | float | EvaluationResults:
+        """Evaluate a compiled dice string with an explicit value stack."""
+        if is_repeat(program[-1][0]):
+            return DiceParser._evaluate_repeat(program, roll_option, bindings)
+
+        if hooks.enabled():
+            return DiceParser._evaluate_compiled_with_hooks(
+                program, roll_option, bindings
+            )
+
+        values: list[Any] = []
+
+        for node, count in program:
+            if not count:
+                values.append(DiceParser._evaluate_atom(node, roll_option, bindings))
+                continue
+
+            operands: list[Any] = values[-count:]
+            del values[-count:]
+
+            values.append(DiceParser._evaluate_node(node, operands, roll_option))
+
+        result: int | float | EvaluationResults = values[-1]
+        return result
+
+    @staticmethod
+    def _evaluate_compiled_with_hooks(
+        program: list[tuple[Any, int]],
+        roll_option: RollOption,
+        bindings: Mapping[str, int | float] | None = None,
+    ) -> int | float | EvaluationResults:
+        """Evaluate a compiled dice string, emitting every operation."""
+        values: list[Any] = []
+
+        for node, count in program:
+            if not count:
+                values.append(DiceParser._evaluate_atom(node, roll_option, bindings))
+                continue
+
+            operands: list[Any] = values[-count:]
+            del values[-count:]
+
+            started: float = perf_counter()
+            value: Any = DiceParser._evaluate_node(node, operands, roll_option)
+            hooks.emit(
+                "on_operation",
+                node_operator(node),
+                operands,
+                value,
+                perf_counter() - started,
+            )
+            values.append(value)
+
+        result: int | float | EvaluationResults = values[-1]
+        return result
+
+    @staticmethod
+    def _evaluate_repeat(
+        program: list[tuple[Any, int]],
+        roll_option: RollOption,
+        bindings: Mapping[str, int | float] | None = None,
+    ) -> RepeatResults:
+        """Evaluate the body of a repeat like `6#(4d6K3)` for every group.
+
+        Rather than running the body over again for each group, every node
+        is applied to all of the groups before moving on to the next one,
+        so that the dice of all the groups are drawn together. Each value
+        on the stack is kept along with whether it is the same for every
+        group, since only dice with the same count and sides in every
+        group can be drawn together.
+        """
+        groups: int = _repeat_count(
+            DiceParser._evaluate_atom(program[0][0], roll_option, bindings)
+        )
+        body: list[tuple[Any, int]] = program[1:-1]
+
+        if hooks.enabled():
+            # Every group is evaluated on its own so each operation is seen.
+            return RepeatResults(
+                [
+                    DiceParser._evaluate_compiled_with_hooks(
+                        body, roll_option, bindings
+                    )
+                    for _ in range(groups)
+                ]
+            )
+
+        values: list[tuple[list[Any], bool]] = []
+
+        for node, count in body:
+            if not count:
+                values.append(
+                    DiceParser._evaluate_atom_groups(
+                        node, groups, roll_option, bindings
+                    )
+                )
+                continue
+
+            operands: list[tuple[list[Any], bool]] = values[-count:]
+            del values[-count:]
+
+            values.append(
+                DiceParser._evaluate_node_groups(node, operands, groups, roll_option)
+            )
+
+        return RepeatResults(values[-1][0])
+
+    @staticmethod
+    def _evaluate_atom_groups(
+        atom: int | float | str,
+        groups: int,
+        roll_option: RollOption,
+        bindings: Mapping[str, int | float] | None,
+    ) -> tuple[list[Any], bool]:
+        """Evaluate a leaf for every group of a repeat."""
+        if atom == "d%":
+            return roll_dice_groups(1, 100, groups, roll_option), False
+
+        return [DiceParser._evaluate_atom(atom, roll_option, bindings)] * groups, True
+
+    @staticmethod
+    def _evaluate_node_groups(
+        node: list[Any],
+        operands: list[tuple[list[Any], bool]],
+        groups: int,
+        roll_option: RollOption,
+    ) -> tuple[list[Any], bool]:
+        """Apply the operator of a node for every group of a repeat."""
+        if groups and all(shared for _, shared in operands):
+            first: list[Any] = [values[0] for values, _ in operands]
+            dice: tuple[Any, Any] | None = DiceParser._dice_operands(node, first)
+
+            if dice is not None:
+                return roll_dice_groups(dice[0], dice[1], groups, roll_option), False
+
+            value: Any = DiceParser._evaluate_node(node, first, roll_option)
+
+            if not isinstance(value, EvaluationResults):
+                return [value] * groups, True
+
+        return [
+            DiceParser._evaluate_node(
+                node, [values[group] for values, _ in operands], roll_option
+            )
+            for group in range(groups)
+        ], False
+
+    @staticmethod
+    def _evaluate_atom(
+        atom: int | float | str,
+        roll_option: RollOption,
+        bindings: Mapping[str, int | float] | None = None,
+    ) -> int | float | EvaluationResults:
+        """Evaluate a leaf of the parse tree."""
+        if is_placeholder(atom):
+            return placeholder_value(str(atom), bindings)
+
+        if atom == "d%":
+            return roll_dice(1, 100, roll_option)
+
+        if atom == "pi":
+            return pi
+
+        if atom == "e":
+            return e
+
+        if isinstance(atom, str):
+            raise TypeError(f"Invalid atom given in parse tree: {atom}")
+
+        return atom
+
+    @staticmethod
+    def _evaluate_node(
+        node: list[Any], operands: list[Any], roll_option: RollOption
+    ) -> int | float | EvaluationResults:
+        """Apply the operator of a node to its already evaluated operands."""
+        dice: tuple[Any, Any] | None = DiceParser._dice_operands(node, operands)
+
+        if dice is not None:
+            return roll_dice(dice[0], dice[1], roll_option)
+
+        operator: str = node_operator(node)
+
+        # The handlers expect the same token groups that pyparsing gives
+        # them, so we build them a fresh one for every node.
+        if is_prefix(node):
+            group: list[Any] = [operator, operands[0]]
+
+            if operator == "sqrt":
+                return DiceParser._handle_sqrt([group])
+
+            return DiceParser._handle_unary_minus([group])
+
+        handler: Callable[..., Any] = _TREE_HANDLERS.get(
+            operator, DiceParser._handle_standard_operation
+        )
+        result: int | float | EvaluationResults = handler(
+            [[operands[0], operator, *operands[1:]]]
+        )
+        return result
+
+    @staticmethod
+    def _dice_operands(node: list[Any], operands: list[Any]) -> tuple[Any, Any] | None:
+        """Return the number of dice and sides a node rolls, if it is dice."""
+        operator: str = node_operator(node)
+
+        if is_prefix(node):
+            return (1, operands[0]) if operator == "d" else None
+
+        if operator == "d%":
+            return operands[0], 100
+
+        if operator == "d":
+            return operands[0], operands[1]
+
+        return None
+
+    def estimate_cost(
+        self: DiceParser,
+        dice_string: str,
+        bindings: Mapping[str, int | float] | None = None,
+    ) -> CostEstimate:
+        """Estimate how costly the given dice string is to evaluate.
+
+        Placeholders are estimated with the values given for them. The
+        dice string is compiled into the same cache that evaluate() uses,
+        so estimating it before evaluating it only parses it once. The
+        lookup is left out of the metrics, so that estimating and then
+        evaluating counts as a single hit or miss.
+        """
+        with self._cache_lock:
+            cached: bool = dice_string in self._compiled
+
+        started: float = perf_counter()
+        program: list[tuple[Any, int]] = self._compile_cached(dice_string, None)
+
+        if not cached and active_metrics() is not None:
+            with self._cache_lock:
+                if len(self._unrecorded_parses) >= COMPILE_CACHE_SIZE:
+                    self._unrecorded_parses.pop(next(iter(self._unrecorded_parses)))
+
+                self._unrecorded_parses[dice_string] = perf_counter() - started
+
+        # The last node of a compiled dice string is the whole tree.
+        return estimate_tree_cost(program[-1][0], check_bindings(bindings))
+
     def evaluate(
         self: DiceParser,
         dice_string: str,
         roll_option: RollOption = RollOption.Normal,
+        limits: CostLimits | None = None,
+        budget: EvaluationBudget | None = None,
+        approximate_above: float | None = None,
+        bindings: Mapping[str, int | float] | None = None,
     ) -> int | float | EvaluationResults:
-        """Parse and evaluate the given dice string."""
-        parse_result: Any = self.parse(dice_string, roll_option)[0]
+        """Parse and evaluate the given dice string.
+
+        Dice strings can be templates with placeholders like `{bonus}`
+        anywhere that a number can go, which are given their values by
+        the bindings:
+
+            parser.evaluate(
+                "{count}d20K1 + {bonus}", bindings={"count": 2, "bonus": 7}
+            )
+
+        A template is only compiled once, no matter what it is bound to.
+        Bound values have to be numbers, and a TypeError is raised for
+        anything else (booleans included).
+
+        If limits are given, the cost of the dice string is estimated
+        first and an ExpressionTooCostlyError is raised, without rolling
+        anything, when it goes over any of them.
+
+        If a budget is given, it is checked while evaluating and a
+        BudgetExceededError is raised as soon as it runs out.
+
+        If approximate_above is given, factorials and exponents larger
+        than that many bits are carried as approximate LogNumbers.
+        """
+        return self.evaluate_repeated(
+            dice_string, 1, roll_option, limits, budget, approximate_above, bindings
+        )[0]
+
+    def evaluate_repeated(
+        self: DiceParser,
+        dice_string: str,
+        count: int,
+        roll_option: RollOption = RollOption.Normal,
+        limits: CostLimits | None = None,
+        budget: EvaluationBudget | None = None,
+        approximate_above: float | None = None,
+        bindings: Mapping[str, int | float] | None = None,
+    ) -> list[int | float | EvaluationResults]:
+        """Parse the given dice string once and evaluate it count times.
+
+        The limits apply to each evaluation on its own, while the budget
+        is shared by all of them. See evaluate() for the details.
+        """
+        values: Mapping[str, int | float] = check_bindings(bindings)
+
+        return self._observed(
+            dice_string,
+            lambda metrics: self._evaluate_repeated(
+                dice_string,
+                count,
+                roll_option,
+                limits,
+                budget,
+                approximate_above,
+                metrics,
+                values,
+            ),
+        )
+
+    def evaluate_program(
+        self: DiceParser,
+        source: str,
+        roll_option: RollOption = RollOption.Normal,
+        limits: CostLimits | None = None,
+        budget: EvaluationBudget | None = None,
+        approximate_above: float | None = None,
+        bindings: Mapping[str, int | float] | None = None,
+    ) -> ProgramResults:
+        """Evaluate every statement of a program in order, in a single pass.
+
+        The whole program is compiled once, and the totals of named
+        statements are bound to the placeholders of the statements after
+        them:
+
+            parser.evaluate_program(
+                "hit: 1d20 + {bonus}; {hit} >= 15", bindings={"bonus": 7}
+            )
+
+        The limits apply to each statement on its own, and are reported
+        against the statement that went over them, while the budget is
+        shared by all of them. Statements cannot be named the same as any
+        of the bindings. See evaluate() for the details.
+        """
+        values: Mapping[str, int | float] = check_bindings(bindings)
+
+        return self._observed(
+            source,
+            lambda metrics: self._evaluate_program(
+                source,
+                roll_option,
+                limits,
+                budget,
+                approximate_above,
+                metrics,
+                values,
+            ),
+        )
+
+    @staticmethod
+    def _observed(
+        dice_string: str, evaluate: Callable[[MetricsRegistry | None], R]
+    ) -> R:
+        """Run an evaluation, recording its metrics and emitting its hooks."""
+        metrics: MetricsRegistry | None = active_metrics()
+        started: float = perf_counter()
+
+        try:
+            results: R = evaluate(metrics)
+        except Exception as err:
+            if metrics is not None:
+                metrics.record_error(err)
+
+            if hooks.enabled():
+                hooks.emit(
+                    "on_evaluate_end", dice_string, None, err, perf_counter() - started
+                )
+
+            raise
+
+        if hooks.enabled():
+            hooks.emit(
+                "on_evaluate_end", dice_string, results, None, perf_counter() - started
+            )
+
+        return results
+
+    def _evaluate_repeated(
+        self: DiceParser,
+        dice_string: str,
+        count: int,
+        roll_option: RollOption,
+        limits: CostLimits | None,
+        budget: EvaluationBudget | None,
+        approximate_above: float | None,
+        metrics: MetricsRegistry | None,
+        bindings: Mapping[str, int | float],
+    ) -> list[int | float | EvaluationResults]:
+        program: list[tuple[Any, int]] = self._compile_cached(dice_string, metrics)
+        approximate_above = DiceParser._admit(
+            dice_string, program, limits, approximate_above, bindings
+        )
+
+        try:
+            with use_budget(budget), use_log_domain(approximate_above):
+                results: list[Any] = self._run_compiled(
+                    program, count, roll_option, metrics, bindings
+                )
+        except IndexError as err:
+            # pyparsing treats an IndexError in a parse action as a failed
+            # parse, so keep reporting these the same way.
+            raise SyntaxError("Unable to parse input string: " + dice_string) from err
+
+        if results and not isinstance(results[0], (int, float, EvaluationResults)):
+            raise TypeError(f"Invalid return type given in result: {results[0]}")
+
+        return results
+
+    def _evaluate_program(
+        self: DiceParser,
+        source: str,
+        roll_option: RollOption,
+        limits: CostLimits | None,
+        budget: EvaluationBudget | None,
+        approximate_above: float | None,
+        metrics: MetricsRegistry | None,
+        bindings: Mapping[str, int | float],
+    ) -> ProgramResults:
+        program: list[
+            tuple[str | None, str, int, list[tuple[Any, int]]]
+        ] = self._cached(self._programs, source, self.compile_program, metrics)
+        values: dict[str, int | float] = dict(bindings)
+        results: list[int | float | EvaluationResults] = []
+
+        for name, _, start, _ in program:
+            if name is not None and name in bindings:
+                # The label ends right where the statement starts.
+                raise ExpressionSyntaxError(
+                    f"'{name}' is already defined by a binding",
+                    source,
+                    source.rindex(name, 0, start),
+                )
+
+        try:
+            with use_budget(budget):
+                for name, text, _, statement in program:
+                    threshold: float | None = DiceParser._admit(
+                        text.strip(), statement, limits, approximate_above, values
+                    )
+
+                    with use_log_domain(threshold):
+                        result: Any = DiceParser._run_compiled(
+                            statement, 1, roll_option, metrics, values
+                        )[0]
+
+                    results.append(result)
+
+                    if name is not None:
+                        values[name] = _bindable(result)
+        except IndexError as err:
+            raise SyntaxError("Unable to parse input string: " + source) from err
+
+        return ProgramResults([name for name, *_ in program], results)
+
+    @staticmethod
+    def _admit(
+        dice_string: str,
+        program: list[tuple[Any, int]],
+        limits: CostLimits | None,
+        approximate_above: float | None,
+        bindings: Mapping[str, int | float],
+    ) -> float | None:
+        """Check a compiled dice string against the limits, if any.
+
+        Returns:
+            The threshold for approximating large values, which is only
+            ever tightened by the limits.
+        """
+        if limits is None:
+            return approximate_above
+
+        downgrade: bool = limits.check(
+            dice_string, estimate_tree_cost(program[-1][0], bindings)
+        )
+
+        if downgrade and (
+            approximate_above is None or approximate_above > (limits.max_bits or 0)
+        ):
+            return limits.max_bits
+
+        return approximate_above
+
+
+def _bindable(result: int | float | EvaluationResults) -> int | float:
+    """Return the total of a result as a value for placeholders."""
+    total: int | float = (
+        result.total if isinstance(result, EvaluationResults) else result
+    )
+
+    # Comparisons give booleans, which placeholders only take as numbers.
+    return int(total) if isinstance(total, bool) else total
+
+
+def _repeat_count(count: int | float | EvaluationResults) -> int:
+    """Return the number of groups of a repeat, checking that it is one."""
+    if isinstance(count, float) and count.is_integer():
+        count = int(count)
+
+    if not isinstance(count, int) or count < 0:
+        raise ValueError("The number of repeats must be a whole number of 0 or more.")
+
+    return count
 
-        if not isinstance(parse_result, (int, float, EvaluationResults)):
-            raise TypeError(f"Invalid return type given in result: {parse_result}")
 
-        return parse_result
+# Handlers for the operators of the parse tree that are not dice rolls.
+_TREE_HANDLERS: dict[str, Callable[..., Any]] = {
+    "^": DiceParser._handle_expo,
+    "**": DiceParser._handle_expo,
+    "!": DiceParser._handle_factorial,
+    "k": DiceParser._handle_keep,
+    "K": DiceParser._handle_keep,
+    "x": DiceParser._handle_drop,
+    "X": DiceParser._handle_drop,
+    "<": DiceParser._handle_comparison,
+    ">": DiceParser._handle_comparison,
+    "=": DiceParser._handle_comparison,
+    "<=": DiceParser._handle_comparison,
+    ">=": DiceParser._handle_comparison,
+}
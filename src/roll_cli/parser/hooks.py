@@ -0,0 +1,115 @@
+"""Callbacks for following along with what the parser does.
+
+Callbacks are registered for an event and are called with the details
+of that event every time it happens:
+
+    on_parse_start(dice_string)
+    on_tokenize_end(dice_string, seconds)
+    on_parse_end(dice_string, seconds)
+    on_dice_rolled(roll_results)
+    on_keep(operator, amount, roll_results)
+    on_drop(operator, amount, roll_results)
+    on_operation(operator, operands, result, seconds)
+    on_evaluate_end(dice_string, results, error, seconds)
+
+Parsing only happens the first time a dice string is seen, since the
+compiled form is cached after that. Tokenizing, which is what checks
+that a dice string is well formed, is part of parsing, so its seconds
+are included in those of on_parse_end too. on_evaluate_end is called once per
+evaluate() (with every result from evaluate_repeated() and every
+statement's result from evaluate_program()), and with the error instead
+of the results when it fails.
+
+The parser only checks enabled(), which is True while any callback is
+registered, so hooks cost nothing beyond that while none are in use.
+Callbacks are called in the thread doing the evaluation, and anything
+that they raise is raised from the evaluation.
+
+Like the active budget, callbacks are kept in a context variable. They
+are registered for the current thread or asyncio task, and are seen by
+the tasks it starts afterwards along with the worker threads of
+roll_async(), which run in a copy of its context.
+"""
+from __future__ import annotations
+
+from contextvars import ContextVar
+from typing import Any
+from typing import Callable
+
+EVENTS: tuple[str, ...] = (
+    "on_parse_start",
+    "on_tokenize_end",
+    "on_parse_end",
+    "on_dice_rolled",
+    "on_keep",
+    "on_drop",
+    "on_operation",
+    "on_evaluate_end",
+)
+
+# The callbacks of every event, or None when there are none at all.
+_CALLBACKS: ContextVar[dict[str, tuple[Callable[..., Any], ...]] | None] = ContextVar(
+    "roll_cli_hooks", default=None
+)
+
+
+def _check_event(event: str) -> None:
+    """Raise a ValueError for events that do not exist."""
+    if event not in EVENTS:
+        raise ValueError(f"Unknown hook event: {event}")
+
+
+def _set_callbacks(callbacks: dict[str, tuple[Callable[..., Any], ...]]) -> None:
+    """Make the callbacks current, going back to None once there are none."""
+    _CALLBACKS.set(callbacks if any(callbacks.values()) else None)
+
+
+def _copy_callbacks() -> dict[str, tuple[Callable[..., Any], ...]]:
+    """Return a copy of the current callbacks that is safe to change."""
+    return dict(_CALLBACKS.get() or dict.fromkeys(EVENTS, ()))
+
+
+def enabled() -> bool:
+    """Return whether any callbacks are registered."""
+    return _CALLBACKS.get() is not None
+
+
+def register(event: str, callback: Callable[..., Any]) -> Callable[..., Any]:
+    """Call the callback every time the event happens and return it."""
+    _check_event(event)
+
+    # The callbacks are replaced instead of changed, so that a copy of the
+    # context made earlier (or an emit() in the middle of its loop) keeps
+    # the callbacks it had.
+    callbacks: dict[str, tuple[Callable[..., Any], ...]] = _copy_callbacks()
+    callbacks[event] = (*callbacks[event], callback)
+    _set_callbacks(callbacks)
+
+    return callback
+
+
+def unregister(event: str, callback: Callable[..., Any]) -> None:
+    """Stop calling the callback for the event."""
+    _check_event(event)
+
+    callbacks: dict[str, tuple[Callable[..., Any], ...]] = _copy_callbacks()
+    remaining: list[Callable[..., Any]] = list(callbacks[event])
+    remaining.remove(callback)
+    callbacks[event] = tuple(remaining)
+    _set_callbacks(callbacks)
+
+
+def clear() -> None:
+    """Unregister every callback for every event."""
+    _CALLBACKS.set(None)
+
+
+def emit(event: str, *args: Any) -> None:
+    """Call every callback registered for the event."""
+    callbacks: dict[str, tuple[Callable[..., Any], ...]] | None = _CALLBACKS.get()
+
+    if callbacks is None:
+        return
+
+    for callback in callbacks[event]:
+        callback(*args)
@@ -0,0 +1,222 @@
+"""Counters and latency histograms for the parser.
+
+Metrics are collected into a MetricsRegistry, which is made active for
+the whole process with enable_metrics(). While no registry is active,
+the parser and the operations only ever check a single module level
+variable, so leaving metrics disabled costs next to nothing.
+
+Metrics:
+    evaluations: Number of expressions evaluated successfully
+    parse_cache_hits: Number of evaluations that reused a compiled program
+    parse_cache_misses: Number of evaluations that had to parse
+    dice_drawn: Number of dice rolled
+    keep_operations: Number of keep operations (k and K)
+    drop_operations: Number of drop operations (x and X)
+    errors: Number of failed evaluations, by the type of the error
+    parse_seconds: Histogram of the time spent parsing an expression
+    evaluate_seconds: Histogram of the time spent evaluating an expression
+
+Unlike the active budget, the active registry is shared by every thread,
+so rolls made on any thread are counted, and the registry's lock keeps
+the counts right. Worker processes each count their own metrics.
+"""
+from __future__ import annotations
+
+from bisect import bisect_left
+from math import inf
+from threading import Lock
+from typing import Any
+
+# Upper bounds of the latency histogram buckets, in seconds.
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.000_01,
+    0.000_05,
+    0.000_1,
+    0.000_5,
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.5,
+    1.0,
+    5.0,
+    inf,
+)
+
+_COUNTERS: tuple[tuple[str, str], ...] = (
+    ("evaluations", "Expressions evaluated successfully."),
+    ("parse_cache_hits", "Evaluations that reused a compiled expression."),
+    ("parse_cache_misses", "Evaluations that had to parse the expression."),
+    ("dice_drawn", "Dice rolled."),
+    ("keep_operations", "Keep operations applied."),
+    ("drop_operations", "Drop operations applied."),
+)
+
+
+class Histogram:
+    """Distribution of observed values over fixed buckets.
+
+    buckets: Upper bounds of the buckets, ending with infinity
+    """
+
+    def __init__(self: Histogram, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        """Initialize an empty Histogram object."""
+        self.buckets: tuple[float, ...] = buckets
+        self.counts: list[int] = [0] * len(buckets)
+        self.count: int = 0
+        self.sum: float = 0.0
+
+    def observe(self: Histogram, value: float) -> None:
+        """Add a single observation."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative_counts(self: Histogram) -> list[int]:
+        """Return the number of observations at or below each bucket."""
+        total: int = 0
+        counts: list[int] = []
+
+        for count in self.counts:
+            total += count
+            counts.append(total)
+
+        return counts
+
+
+class MetricsRegistry:
+    """Every metric collected for the parser."""
+
+    def __init__(
+        self: MetricsRegistry, buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> None:
+        """Initialize a MetricsRegistry with every metric at zero."""
+        self._lock: Lock = Lock()
+        self._buckets: tuple[float, ...] = buckets
+        self.reset()
+
+    def reset(self: MetricsRegistry) -> None:
+        """Set every metric back to zero."""
+        with self._lock:
+            self.counters: dict[str, int] = {name: 0 for name, _ in _COUNTERS}
+            self.errors: dict[str, int] = {}
+            self.parse_seconds: Histogram = Histogram(self._buckets)
+            self.evaluate_seconds: Histogram = Histogram(self._buckets)
+
+    def increment(self: MetricsRegistry, counter: str, amount: int = 1) -> None:
+        """Add the amount to one of the counters."""
+        with self._lock:
+            self.counters[counter] += amount
+
+    def record_parse(self: MetricsRegistry, seconds: float) -> None:
+        """Record an expression that had to be parsed."""
+        with self._lock:
+            self.counters["parse_cache_misses"] += 1
+            self.parse_seconds.observe(seconds)
+
+    def record_evaluation(self: MetricsRegistry, seconds: float) -> None:
+        """Record a successful evaluation of an expression."""
+        with self._lock:
+            self.counters["evaluations"] += 1
+            self.evaluate_seconds.observe(seconds)
+
+    def record_error(self: MetricsRegistry, error: BaseException) -> None:
+        """Record a failed evaluation."""
+        name: str = type(error).__name__
+
+        with self._lock:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    def as_dict(self: MetricsRegistry) -> dict[str, Any]:
+        """Return every metric as a dictionary."""
+        with self._lock:
+            metrics: dict[str, Any] = dict(self.counters)
+            metrics["errors"] = dict(self.errors)
+
+            for name, histogram in self._histograms():
+                metrics[name] = {
+                    "buckets": dict(
+                        zip(
+                            map(_bucket_label, histogram.buckets),
+                            histogram.cumulative_counts(),
+                        )
+                    ),
+                    "count": histogram.count,
+                    "sum": histogram.sum,
+                }
+
+        return metrics
+
+    def to_prometheus(self: MetricsRegistry, prefix: str = "roll_cli") -> str:
+        """Return every metric in the Prometheus text exposition format."""
+        lines: list[str] = []
+
+        with self._lock:
+            for name, description in _COUNTERS:
+                lines.append(f"# HELP {prefix}_{name}_total {description}")
+                lines.append(f"# TYPE {prefix}_{name}_total counter")
+                lines.append(f"{prefix}_{name}_total {self.counters[name]}")
+
+            lines.append(f"# HELP {prefix}_errors_total Failed evaluations by type.")
+            lines.append(f"# TYPE {prefix}_errors_total counter")
+
+            for error, count in sorted(self.errors.items()):
+                lines.append(f'{prefix}_errors_total{{type="{error}"}} {count}')
+
+            for name, histogram in self._histograms():
+                lines.extend(_prometheus_histogram(prefix, name, histogram))
+
+        return "\n".join(lines) + "\n"
+
+    def _histograms(self: MetricsRegistry) -> tuple[tuple[str, Histogram], ...]:
+        return (
+            ("parse_seconds", self.parse_seconds),
+            ("evaluate_seconds", self.evaluate_seconds),
+        )
+
+
+def _bucket_label(bound: float) -> str:
+    """Return the upper bound of a bucket the way Prometheus writes it."""
+    return "+Inf" if bound == inf else repr(bound)
+
+
+def _prometheus_histogram(prefix: str, name: str, histogram: Histogram) -> list[str]:
+    """Return the lines for a single histogram in the Prometheus format."""
+    phase: str = name.split("_")[0]
+    name = f"{prefix}_{name}"
+    lines: list[str] = [
+        f"# HELP {name} Seconds spent in the {phase} phase.",
+        f"# TYPE {name} histogram",
+    ]
+
+    for bound, count in zip(histogram.buckets, histogram.cumulative_counts()):
+        lines.append(f'{name}_bucket{{le="{_bucket_label(bound)}"}} {count}')
+
+    lines.append(f"{name}_sum {histogram.sum}")
+    lines.append(f"{name}_count {histogram.count}")
+
+    return lines
+
+
+_ACTIVE_METRICS: MetricsRegistry | None = None
+
+
+def active_metrics() -> MetricsRegistry | None:
+    """Return the registry that metrics are being collected into, if any."""
+    return _ACTIVE_METRICS
+
+
+def enable_metrics(registry: MetricsRegistry | None = None) -> MetricsRegistry:
+    """Start collecting metrics into the registry (or a new one)."""
+    global _ACTIVE_METRICS
+
+    _ACTIVE_METRICS = registry if registry is not None else MetricsRegistry()
+    return _ACTIVE_METRICS
+
+
+def disable_metrics() -> None:
+    """Stop collecting metrics."""
+    global _ACTIVE_METRICS
+
+    _ACTIVE_METRICS = None
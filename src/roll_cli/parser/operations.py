@@ -15,16 +15,38 @@ Operations:
     Dice roll "d"
     Keep lowest roll "k"
     Keep highest roll "K"
+
+    Repeat "#" (the same dice for every group, see roll_dice_groups)
 """
 from __future__ import annotations
 
 from math import ceil
 from math import floor
+from random import choices
 from random import randint
+from typing import Sequence
 
+from . import hooks
+from .budget import active_budget
+from .budget import EvaluationBudget
+from .metrics import active_metrics
+from .metrics import MetricsRegistry
 from .types import EvaluationResults
 from .types import RollOption
 from .types import RollResults
+from .types.lognumber import factorial_bits
+from .types.lognumber import log_domain_threshold
+from .types.lognumber import LogNumber
+from .types.lognumber import power_bits
+
+# When there is a budget, dice are drawn in chunks of this size so that
+# the budget gets checked regularly even for enormous pools.
+BUDGET_CHUNK_SIZE: int = 4096
+
+# choices() draws a whole pool with one random() call per die, a few times
+# quicker than randint(), but is biased by about sides / 2**53. Dice with
+# more sides than this are drawn with randint() instead.
+BULK_DRAW_MAX_SIDES: int = 2**32
 
 
 def _to_eval_results(x: int | float | EvaluationResults) -> EvaluationResults:
@@ -73,14 +95,46 @@ def floor_div(
 def mod(
     x: int | float | EvaluationResults, y: int | float | EvaluationResults
 ) -> EvaluationResults:
-    """Divide (modulus) x and y with extended types."""
+    """Divide (modulus) x and y with extended types.
+
+    The remainder of an approximate number depends on exactly the digits
+    that were thrown away, so it cannot be approximated.
+    """
+    if isinstance(_total(x), LogNumber):
+        raise ValueError(
+            f"Cannot take the modulus of {_total(x)}, which is only approximate."
+        )
+
     return _to_eval_results(x) % y
 
 
+def _total(x: int | float | EvaluationResults) -> int | float:
+    """Return the numeric value of x."""
+    return x.total if isinstance(x, EvaluationResults) else x
+
+
+def _check_bits(budget: EvaluationBudget, bits: float) -> None:
+    """Check the size of a value against the budget unless approximated.
+
+    Values that are carried in the log domain never get built, so they
+    do not count against the budget.
+    """
+    threshold: float | None = log_domain_threshold()
+
+    if threshold is None or bits <= threshold:
+        budget.check_bits(bits)
+
+
 def expo(
     x: int | float | EvaluationResults, y: int | float | EvaluationResults
 ) -> EvaluationResults:
     """Exponentiate x by y with extended types."""
+    budget: EvaluationBudget | None = active_budget()
+
+    # Checked before doing the work so we never build the number.
+    if budget is not None:
+        _check_bits(budget, power_bits(_total(x), _total(y)))
+
     return _to_eval_results(x) ** y
 
 
@@ -96,6 +150,18 @@ def factorial(x: int | float | EvaluationResults) -> EvaluationResults:
     if not isinstance(x, EvaluationResults):
         x = _to_eval_results(x)
 
+    # The log of the factorial of an approximate number is itself too big
+    # for a float, so not even the log domain can hold it.
+    if isinstance(x.total, LogNumber):
+        raise ValueError(
+            f"Cannot take the factorial of {x.total}, which is only approximate."
+        )
+
+    budget: EvaluationBudget | None = active_budget()
+
+    if budget is not None:
+        _check_bits(budget, factorial_bits(x.total))
+
     x.factorial()
 
     return x
@@ -111,7 +177,35 @@ def sqrt(x: int | float | EvaluationResults) -> EvaluationResults:
     return x
 
 
-def roll_dice(  # noqa: max-complexity: 13
+def _random_dice(num_dice: int, sides: int) -> list[int | float]:
+    """Draw num_dice random dice with the given number of sides in bulk."""
+    # Because these are not cryptographically secure, we have to noqa them
+    # otherwise we get an S311 warning.
+    if sides > BULK_DRAW_MAX_SIDES:
+        return [randint(1, sides) for _ in range(num_dice)]  # noqa
+
+    faces: Sequence[int | float] = range(1, sides + 1)
+    return choices(faces, k=num_dice)  # noqa
+
+
+def _draw(
+    num_dice: int, sides: int, budget: EvaluationBudget | None
+) -> list[int | float]:
+    """Draw num_dice random dice with the given number of sides."""
+    if budget is None:
+        return _random_dice(num_dice, sides)
+
+    rolls: list[int | float] = []
+
+    for drawn in range(0, num_dice, BUDGET_CHUNK_SIZE):
+        chunk: int = min(BUDGET_CHUNK_SIZE, num_dice - drawn)
+        budget.charge_dice(chunk, rolls)
+        rolls.extend(_random_dice(chunk, sides))
+
+    return rolls
+
+
+def roll_dice(  # noqa: max-complexity: 14
     num_dice: int | float | EvaluationResults,
     sides: int | float | EvaluationResults,
     roll_option: RollOption = RollOption.Normal,
@@ -137,6 +231,14 @@ def roll_dice(  # noqa: max-complexity: 13
 
     result.total = 0
 
+    # An approximate number of dice (or sides) is far more than could
+    # ever be rolled, and we would not know exactly how many to roll.
+    if isinstance(num_dice, LogNumber) or isinstance(sides, LogNumber):
+        raise ValueError(
+            f"Cannot roll {num_dice}d{sides}, the number of dice and sides "
+            "must not be approximate."
+        )
+
     starting_num_dice: int | float = num_dice
     starting_sides: int | float = sides
 
@@ -155,6 +257,10 @@ def roll_dice(  # noqa: max-complexity: 13
     sides = ceil(sides)
 
     rolls: list[int | float] = []
+    budget: EvaluationBudget | None = active_budget()
+
+    if budget is not None and roll_option != RollOption.Normal:
+        budget.charge_dice(ceil(num_dice))
 
     if roll_option == RollOption.Minimum:
         rolls = [1] * ceil(num_dice)
@@ -164,9 +270,7 @@ def roll_dice(  # noqa: max-complexity: 13
         if isinstance(num_dice, float) and (num_dice % 1) != 0:
             rolls.append(sides * (num_dice % 1))
     elif sides != 0:
-        # Because this is not cryptographically secure, we have to noqa it
-        # otherwise we get an S311 warning.
-        rolls = [randint(1, floor(sides)) for _ in range(floor(num_dice))]  # noqa
+        rolls = _draw(floor(num_dice), floor(sides), budget)
 
         # If it's the case that the number of dice is a float, then
         # we take that to mean that it is a dice where the sides should
@@ -176,13 +280,70 @@ def roll_dice(  # noqa: max-complexity: 13
         # last one (or the only one if there's only a decimal portion).
         if isinstance(num_dice, float) and num_dice % 1 != 0:
             sides = ceil(sides * (num_dice % 1))
-            # Not cryptographically secure
-            rolls.append(randint(1, sides))  # noqa
+            rolls.extend(_draw(1, sides, budget))
 
     if result_is_negative:
         for roll_num in range(len(rolls)):
             rolls[roll_num] = -rolls[roll_num]
 
-    result.add_roll(RollResults(f"{starting_num_dice}d{starting_sides}", rolls))
+    metrics: MetricsRegistry | None = active_metrics()
+
+    if metrics is not None:
+        metrics.increment("dice_drawn", len(rolls))
+
+    roll_results: RollResults = RollResults(
+        f"{starting_num_dice}d{starting_sides}", rolls
+    )
+    result.add_roll(roll_results)
+
+    if hooks.enabled():
+        hooks.emit("on_dice_rolled", roll_results)
 
     return result
+
+
+def roll_dice_groups(
+    num_dice: int | float | EvaluationResults,
+    sides: int | float | EvaluationResults,
+    groups: int,
+    roll_option: RollOption = RollOption.Normal,
+) -> list[EvaluationResults]:
+    """Roll the same dice once for every group of a repeat.
+
+    When rolling a whole number of dice normally, the dice of every group
+    are drawn with a single bulk draw and then split up between the
+    groups, so the setup and metrics of a draw are paid once rather than
+    once per group. Any other dice are rolled with roll_dice() for each
+    group in turn.
+    """
+    if not (
+        isinstance(num_dice, int)
+        and isinstance(sides, int)
+        and num_dice >= 0
+        and sides > 0
+        and roll_option == RollOption.Normal
+    ):
+        return [roll_dice(num_dice, sides, roll_option) for _ in range(groups)]
+
+    rolls: list[int | float] = _draw(num_dice * groups, sides, active_budget())
+    metrics: MetricsRegistry | None = active_metrics()
+
+    if metrics is not None:
+        metrics.increment("dice_drawn", len(rolls))
+
+    results: list[EvaluationResults] = []
+
+    for group in range(groups):
+        start: int = group * num_dice
+        roll_results: RollResults = RollResults(
+            f"{num_dice}d{sides}", rolls[start : start + num_dice]
+        )
+        result: EvaluationResults = EvaluationResults()
+        result.add_roll(roll_results)
+
+        if hooks.enabled():
+            hooks.emit("on_dice_rolled", roll_results)
+
+        results.append(result)
+
+    return results
@@ -0,0 +1,69 @@
+"""Split programs of several dice strings into their statements.
+
+A program is a sequence of dice strings separated by semicolons, each of
+which can be given a name with a label. The totals of named statements
+can be used by the statements after them through placeholders:
+
+    nat: 1d20; hit: {nat} + 7 >= 15; damage: (2d6 + 4) * (1 + ({nat} = 20))
+
+Every statement of a program is compiled together and evaluated in order
+by DiceParser.evaluate_program(), which gives back the results of all of
+them at once.
+"""
+from __future__ import annotations
+
+import re
+from typing import Pattern
+
+from .tokenizer import ExpressionSyntaxError
+
+STATEMENT_SEPARATOR: str = ";"
+
+_LABEL_PATTERN: Pattern[str] = re.compile(r"\s*([A-Za-z_]\w*)\s*:")
+
+
+def split_statements(source: str) -> list[tuple[str | None, str, int]]:
+    """Split a program into its statements along with their names.
+
+    Each statement is given along with where in the program it starts.
+    Statements that are left empty, like after a trailing semicolon, are
+    skipped, while unnamed statements are given a name of None.
+    """
+    statements: list[tuple[str | None, str, int]] = []
+    names: set[str] = set()
+    position: int = 0
+
+    for text in source.split(STATEMENT_SEPARATOR):
+        start: int = position
+        end: int = start + len(text)
+        position = end + len(STATEMENT_SEPARATOR)
+
+        name: str | None = None
+        match: re.Match[str] | None = _LABEL_PATTERN.match(text)
+
+        if match is not None:
+            name = match.group(1)
+
+            if name in names:
+                raise ExpressionSyntaxError(
+                    f"'{name}' is already defined", source, start + match.start(1)
+                )
+
+            names.add(name)
+            text = text[match.end() :]
+            start += match.end()
+
+        if not text.strip():
+            if name is not None:
+                raise ExpressionSyntaxError(
+                    f"Expected an expression for '{name}'", source, end
+                )
+
+            continue
+
+        statements.append((name, text, start))
+
+    if not statements:
+        raise ExpressionSyntaxError("Unexpected end of input", source, len(source))
+
+    return statements
@@ -0,0 +1,331 @@
+"""Non-recursive parser for dice strings.
+
+pyparsing's infixNotation recurses through every precedence level for
+every pair of parens, so deeply nested expressions run out of Python
+stack long before they run out of anything else. This parser turns the
+tokens from the tokenizer into the same parse tree shape that the
+grammar produces, using the shunting-yard algorithm with explicit
+operator and operand stacks, so nesting is only limited by memory and
+parsing takes linear time.
+
+The precedence levels mirror the operator table of the pyparsing
+grammar, from the tightest binding (1) to the loosest (15). Like the
+grammar, an operator only accepts operands from the levels that it
+would in the grammar; for example, `-d20` is not allowed since the
+unary minus does not accept a dice roll without parens around it.
+
+The repeat operator (`#`) has no place in the grammar, and binds looser
+than everything else (16) so that `6#4d6K3` repeats all of `4d6K3`.
+
+Tree shape:
+    Leaves are numbers, the atoms "pi", "e", and "d%", or placeholders
+    like "{bonus}" that are given their values when evaluated.
+    Prefix operators are [operator, operand].
+    Postfix operators are [operand, operator].
+    Binary operators are [left, operator, right].
+    Repeats are [count, "#", body], and only ever the root of the tree.
+"""
+from __future__ import annotations
+
+from typing import Any
+from typing import Iterator
+from typing import Mapping
+
+from .tokenizer import CONSTANT
+from .tokenizer import ExpressionSyntaxError
+from .tokenizer import LEFT_PAREN
+from .tokenizer import NUMBER
+from .tokenizer import PLACEHOLDER
+from .tokenizer import PREFIX_OPERATORS
+from .tokenizer import REPEAT_OPERATOR
+from .tokenizer import RIGHT_PAREN
+from .tokenizer import starts_operand
+from .tokenizer import Token
+
+_PREFIX: int = 0
+_POSTFIX: int = 1
+_LEFT: int = 2
+_RIGHT: int = 3
+
+# The unary minus shows up twice in the grammar. Directly inside of an
+# exponent or square root it binds tighter than anything else, while
+# everywhere else it binds looser than exponents.
+_TIGHT_MINUS_LEVEL: int = 1
+_MINUS_LEVEL: int = 4
+
+_PREFIX_LEVELS: dict[str, int] = {"sqrt": 2, "d": 8}
+_POSTFIX_LEVELS: dict[str, int] = {"!": 5, "d%": 6, "k": 10, "K": 10, "x": 12, "X": 12}
+_BINARY_LEVELS: dict[str, tuple[int, int]] = {
+    "^": (3, _RIGHT),
+    "**": (3, _RIGHT),
+    "d": (7, _RIGHT),
+    "k": (9, _LEFT),
+    "K": (9, _LEFT),
+    "x": (11, _LEFT),
+    "X": (11, _LEFT),
+    "*": (13, _LEFT),
+    "/": (13, _LEFT),
+    "%": (13, _LEFT),
+    "//": (13, _LEFT),
+    "+": (14, _LEFT),
+    "-": (14, _LEFT),
+    "<": (15, _RIGHT),
+    ">": (15, _RIGHT),
+    "=": (15, _RIGHT),
+    "<=": (15, _RIGHT),
+    ">=": (15, _RIGHT),
+    REPEAT_OPERATOR: (16, _LEFT),
+}
+
+# Tokens after which a unary minus is the tightly binding one.
+_TIGHT_MINUS_AFTER: frozenset[str] = frozenset(["^", "**", "sqrt"])
+
+
+class _Operator:
+    """An operator waiting on the operator stack to be applied."""
+
+    __slots__ = ("token", "level", "kind")
+
+    def __init__(self: _Operator, token: Token, level: int, kind: int) -> None:
+        self.token: Token = token
+        self.level: int = level
+        self.kind: int = kind
+
+
+class _TreeBuilder:
+    """Shunting-yard state for building a single parse tree."""
+
+    def __init__(self: _TreeBuilder, expression: str) -> None:
+        self.expression: str = expression
+        # Operands are kept along with the precedence level they came from.
+        self.operands: list[tuple[Any, int]] = []
+        self.operators: list[_Operator | None] = []
+
+    def error(self: _TreeBuilder, token: Token) -> ExpressionSyntaxError:
+        """Return the error for an operator with an operand it cannot take."""
+        return ExpressionSyntaxError(
+            f"Operator '{token.text}' is not allowed here",
+            self.expression,
+            token.position,
+        )
+
+    def operand(self: _TreeBuilder, token: Token, level: int) -> Any:
+        """Pop an operand, checking that it is allowed at the given level."""
+        node, node_level = self.operands.pop()
+
+        if node_level > level:
+            raise self.error(token)
+
+        return node
+
+    def reduce(self: _TreeBuilder) -> None:
+        """Apply the operator on the top of the stack to its operands."""
+        operator: _Operator | None = self.operators.pop()
+
+        if operator is None:
+            return
+
+        token: Token = operator.token
+        level: int = operator.level
+
+        if operator.kind == _PREFIX:
+            self.operands.append(([token.text, self.operand(token, level)], level))
+            return
+
+        right_level: int = level if operator.kind == _RIGHT else level - 1
+        left_level: int = level if operator.kind == _LEFT else level - 1
+
+        right: Any = self.operand(token, right_level)
+        left: Any = self.operand(token, left_level)
+        self.operands.append(([left, token.text, right], level))
+
+    def reduce_tighter(self: _TreeBuilder, level: int, kind: int) -> None:
+        """Apply every stacked operator that binds tighter than the level."""
+        while self.operators and self.operators[-1] is not None:
+            stacked: _Operator = self.operators[-1]
+
+            if stacked.level < level or (stacked.level == level and kind != _RIGHT):
+                self.reduce()
+            else:
+                break
+
+    def postfix(self: _TreeBuilder, token: Token) -> None:
+        """Apply a postfix operator to the operand before it."""
+        level: int = _POSTFIX_LEVELS[token.text]
+        self.reduce_tighter(level, _POSTFIX)
+        self.operands.append(([self.operand(token, level), token.text], level))
+
+    def binary(self: _TreeBuilder, token: Token) -> None:
+        """Stack a binary operator once everything tighter has been applied."""
+        level, kind = _BINARY_LEVELS[token.text]
+        self.reduce_tighter(level, kind)
+        self.operators.append(_Operator(token, level, kind))
+
+    def close_paren(self: _TreeBuilder) -> None:
+        """Apply every operator back to the matching '('."""
+        while self.operators[-1] is not None:
+            self.reduce()
+
+        self.operators.pop()
+        node, _ = self.operands.pop()
+        self.operands.append((node, 0))
+
+    def start(self: _TreeBuilder, token: Token, previous: str) -> bool:
+        """Handle a token where an operand was needed.
+
+        Returns:
+            Whether the token was a complete value.
+        """
+        if token.kind == NUMBER:
+            self.operands.append((token.value, 0))
+            return True
+
+        if token.kind in (CONSTANT, PLACEHOLDER) or token.text == "d%":
+            self.operands.append((token.text, 0))
+            return True
+
+        if token.kind == LEFT_PAREN:
+            self.operators.append(None)
+            return False
+
+        level: int = _PREFIX_LEVELS.get(token.text, _MINUS_LEVEL)
+        top: _Operator | None = self.operators[-1] if self.operators else None
+
+        if token.text == "-" and (
+            previous in _TIGHT_MINUS_AFTER
+            or (previous == "-" and top is not None and top.level == _TIGHT_MINUS_LEVEL)
+        ):
+            level = _TIGHT_MINUS_LEVEL
+
+        self.operators.append(_Operator(token, level, _PREFIX))
+        return False
+
+
+def build_tree(expression: str, tokens: list[Token]) -> Any:
+    """Build the parse tree for tokens that have passed the tokenizer.
+
+    The tokenizer has already checked that the tokens are in an order
+    that makes sense, so we only have to worry about precedence here.
+    """
+    builder: _TreeBuilder = _TreeBuilder(expression)
+    expect_operand: bool = True
+    previous: str = ""
+
+    for index, token in enumerate(tokens):
+        if expect_operand:
+            expect_operand = not builder.start(token, previous)
+        elif token.kind == RIGHT_PAREN:
+            builder.close_paren()
+        elif token.text in _POSTFIX_LEVELS and not (
+            token.text in _BINARY_LEVELS
+            and index + 1 < len(tokens)
+            and starts_operand(tokens[index + 1])
+        ):
+            builder.postfix(token)
+        else:
+            builder.binary(token)
+            expect_operand = True
+
+        previous = token.text
+
+    while builder.operators:
+        builder.reduce()
+
+    return builder.operands[-1][0]
+
+
+def is_leaf(node: Any) -> bool:
+    """Return whether the node is a leaf (a number or an atom)."""
+    return not isinstance(node, list)
+
+
+def is_placeholder(node: Any) -> bool:
+    """Return whether the node is a placeholder leaf, like "{bonus}"."""
+    return isinstance(node, str) and node[:1] == "{"
+
+
+def placeholder_value(
+    node: str, bindings: Mapping[str, int | float] | None
+) -> int | float:
+    """Return the value bound to a placeholder leaf.
+
+    Raises:
+        ValueError: No value was bound to the placeholder.
+        TypeError: The value bound to the placeholder is not a number.
+    """
+    name: str = node[1:-1]
+
+    if bindings is None or name not in bindings:
+        raise ValueError(f"No value was given for the placeholder {node}")
+
+    return _check_binding(name, bindings[name])
+
+
+def check_bindings(
+    bindings: Mapping[str, int | float] | None
+) -> Mapping[str, int | float]:
+    """Return the values to bind to placeholders, checking each of them.
+
+    Raises:
+        TypeError: A value is not a number.
+    """
+    if bindings is None:
+        return {}
+
+    for name, value in bindings.items():
+        _check_binding(name, value)
+
+    return bindings
+
+
+def _check_binding(name: str, value: int | float) -> int | float:
+    """Return the value bound to a placeholder, raising if not a number."""
+    # Booleans are ints too, but "Trued6" is never what anyone meant.
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise TypeError(
+            f"The placeholder {{{name}}} must be a number, not {type(value).__name__}"
+        )
+
+    return value
+
+
+def is_prefix(node: list[Any]) -> bool:
+    """Return whether the node is a prefix operator node."""
+    return len(node) == 2 and isinstance(node[0], str) and node[0] in PREFIX_OPERATORS
+
+
+def is_repeat(node: Any) -> bool:
+    """Return whether the node is a repeat, like `6#(4d6K3)`."""
+    return isinstance(node, list) and len(node) == 3 and node[1] == REPEAT_OPERATOR
+
+
+def node_operator(node: list[Any]) -> str:
+    """Return the operator of a prefix, postfix, or binary node."""
+    return str(node[0] if is_prefix(node) else node[1])
+
+
+def node_operands(node: list[Any]) -> list[Any]:
+    """Return the operands of a prefix, postfix, or binary node."""
+    if len(node) == 3:
+        return [node[0], node[2]]
+
+    return [node[1] if is_prefix(node) else node[0]]
+
+
+def iter_postorder(tree: Any) -> Iterator[Any]:
+    """Yield every node of the tree, operands before their operators.
+
+    Nodes are yielded from left to right, in the same order that the
+    grammar evaluates them, using a stack instead of recursion.
+    """
+    pending: list[tuple[Any, bool]] = [(tree, False)]
+
+    while pending:
+        node, expanded = pending.pop()
+
+        if expanded or is_leaf(node):
+            yield node
+            continue
+
+        pending.append((node, True))
+        pending.extend((operand, False) for operand in reversed(node_operands(node)))
@@ -0,0 +1,246 @@
+"""Single pass tokenizer and validator for dice strings.
+
+The pyparsing grammar tries every level of its operator table before it
+gives up on an input, so malformed input (long runs of operators, parens
+that are never closed, etc.) is some of the most expensive input we can
+be given. Instead, we first split the string into tokens and walk them
+once with a small state machine that knows which tokens are allowed to
+follow which. Anything that cannot be a valid expression is rejected
+right away, along with the position of the problem, and only well-formed
+input is handed over to the parser.
+
+States:
+    Operand: We need a number, a constant, a placeholder, '(' or a prefix
+        operator.
+    Operator: We just finished a value and need an operator or ')'.
+    Optional: We just saw keep/drop notation, whose amount is optional,
+        so either of the above is allowed.
+
+The repeat operator, as in `6#(4d6K3)`, is only allowed once at the very
+start of a dice string, right after the number of times to repeat it.
+"""
+from __future__ import annotations
+
+import re
+from typing import Pattern
+
+NUMBER: str = "number"
+CONSTANT: str = "constant"
+PLACEHOLDER: str = "placeholder"
+OPERATOR: str = "operator"
+LEFT_PAREN: str = "("
+RIGHT_PAREN: str = ")"
+REPEAT_OPERATOR: str = "#"
+
+PREFIX_OPERATORS: frozenset[str] = frozenset(["-", "sqrt", "d"])
+POSTFIX_OPERATORS: frozenset[str] = frozenset(["!", "d%"])
+OPTIONAL_OPERATORS: frozenset[str] = frozenset(["k", "K", "x", "X"])
+BINARY_OPERATORS: frozenset[str] = frozenset(
+    ["+", "-", "*", "/", "//", "%", "^", "**", "d", "<", ">", "=", "<=", ">="]
+) | {REPEAT_OPERATOR}
+
+# Like the grammar's keywords, the constants cannot have a letter, digit,
+# '_' or '$' on either side of them, so `de` and `sqrtpi` are rejected.
+_TOKEN_PATTERN: Pattern[str] = re.compile(
+    r"""\s*(?:
+        (?P<number>[+]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+        |(?P<constant>(?<![A-Za-z0-9_$])(?i:pi|e)(?![A-Za-z0-9_$]))
+        |(?P<placeholder>\{\s*[A-Za-z_]\w*\s*\})
+        |(?P<operator>(?i:sqrt|d%|d)|\*\*|//|<=|>=|[-+*/%^!<>=kKxX#])
+        |(?P<paren>[()])
+    )""",
+    re.VERBOSE,
+)
+
+OPERAND_STARTS: frozenset[str] = PREFIX_OPERATORS | {"d%"}
+
+_OPERAND_STATE: int = 0
+_OPERATOR_STATE: int = 1
+_OPTIONAL_STATE: int = 2
+
+
+class Token:
+    """A single token from a dice string.
+
+    kind: What type of token it is (number, constant, placeholder,
+        operator, or paren)
+    text: The token text, lowercased for case-insensitive tokens and
+        without spaces for placeholders
+    position: Where in the dice string the token started
+    value: The numeric value of number tokens
+    """
+
+    __slots__ = ("kind", "text", "position", "value")
+
+    def __init__(
+        self: Token,
+        kind: str,
+        text: str,
+        position: int,
+        value: int | float | None = None,
+    ) -> None:
+        """Initialize a Token object."""
+        self.kind: str = kind
+        self.text: str = text
+        self.position: int = position
+        self.value: int | float | None = value
+
+    def __repr__(self: Token) -> str:
+        """Return a string representation of the token."""
+        return f"Token({self.kind!r}, {self.text!r}, {self.position!r})"
+
+
+class ExpressionSyntaxError(SyntaxError):
+    """Raised when a dice string is not a well-formed expression.
+
+    problem: What was wrong with the dice string
+    position: The position in the dice string where the problem was found
+    """
+
+    def __init__(
+        self: ExpressionSyntaxError, message: str, expression: str, position: int
+    ) -> None:
+        """Initialize the error with where the problem was found."""
+        super().__init__(f"{message} at position {position}: {expression}")
+        self.problem: str = message
+        self.expression: str = expression
+        self.position: int = position
+
+        # Fill in the standard SyntaxError fields so tools can point at it.
+        self.text = expression
+        self.offset = position + 1
+
+
+def _make_token(match: re.Match[str], position: int) -> Token:
+    """Create a token from a successful match of the token pattern."""
+    kind: str = match.lastgroup or ""
+    text: str = match.group(kind)
+
+    if kind == NUMBER:
+        is_float: bool = any(c in text for c in ".eE")
+        return Token(NUMBER, text, position, float(text) if is_float else int(text))
+
+    if kind == "paren":
+        return Token(text, text, position)
+
+    if kind == PLACEHOLDER:
+        return Token(PLACEHOLDER, "{" + text[1:-1].strip() + "}", position)
+
+    if text.lower() in ("pi", "e", "sqrt", "d", "d%"):
+        text = text.lower()
+
+    return Token(kind, text, position)
+
+
+def tokenize(expression: str) -> list[Token]:
+    """Split a dice string into tokens, rejecting malformed input.
+
+    This is a single pass over the string: each token is checked against
+    the tokens allowed to follow the one before it, and parens are
+    balanced with a stack, so rejecting bad input takes linear time.
+    """
+    tokens: list[Token] = []
+    open_parens: list[int] = []
+    state: int = _OPERAND_STATE
+    position: int = 0
+    end: int = len(expression.rstrip())
+
+    while position < end:
+        match: re.Match[str] | None = _TOKEN_PATTERN.match(expression, position)
+
+        if match is None:
+            start: int = len(expression) - len(expression[position:].lstrip())
+            raise ExpressionSyntaxError("Unexpected character", expression, start)
+
+        token: Token = _make_token(match, match.start(match.lastgroup or 0))
+        position = match.end()
+
+        # Signs are only part of a number where a number is expected.
+        if token.kind == NUMBER and token.text[0] == "+":
+            if state == _OPERATOR_STATE:
+                token = Token(OPERATOR, "+", token.position)
+                position = token.position + 1
+
+        if token.text == REPEAT_OPERATOR and not _is_repeat_count(tokens):
+            raise ExpressionSyntaxError(
+                "'#' must follow the number of repeats at the start",
+                expression,
+                token.position,
+            )
+
+        state = _next_state(expression, token, state, open_parens)
+        tokens.append(token)
+
+    if state == _OPERAND_STATE:
+        raise ExpressionSyntaxError("Unexpected end of input", expression, end)
+
+    if open_parens:
+        raise ExpressionSyntaxError("Unclosed '('", expression, open_parens[-1])
+
+    return tokens
+
+
+def starts_operand(token: Token) -> bool:
+    """Return whether the token can be the start of an operand."""
+    return token.kind in (NUMBER, CONSTANT, PLACEHOLDER, LEFT_PAREN) or (
+        token.kind == OPERATOR and token.text in OPERAND_STARTS
+    )
+
+
+def _is_repeat_count(tokens: list[Token]) -> bool:
+    """Return whether the tokens so far are only the number of repeats."""
+    return len(tokens) == 1 and tokens[0].kind in (NUMBER, PLACEHOLDER)
+
+
+def _next_state(
+    expression: str, token: Token, state: int, open_parens: list[int]
+) -> int:
+    """Return the state after the given token, raising if it is not allowed."""
+    if state == _OPTIONAL_STATE:
+        state = _OPERAND_STATE if starts_operand(token) else _OPERATOR_STATE
+
+    if state == _OPERAND_STATE:
+        return _next_operand_state(expression, token, open_parens)
+
+    return _next_operator_state(expression, token, open_parens)
+
+
+def _next_operand_state(expression: str, token: Token, open_parens: list[int]) -> int:
+    """Return the state after a token where we needed an operand."""
+    if token.kind in (NUMBER, CONSTANT, PLACEHOLDER) or token.text == "d%":
+        return _OPERATOR_STATE
+
+    if token.kind == LEFT_PAREN:
+        open_parens.append(token.position)
+        return _OPERAND_STATE
+
+    if token.kind == OPERATOR and token.text in PREFIX_OPERATORS:
+        return _OPERAND_STATE
+
+    raise ExpressionSyntaxError(
+        f"Expected a value but found '{token.text}'", expression, token.position
+    )
+
+
+def _next_operator_state(expression: str, token: Token, open_parens: list[int]) -> int:
+    """Return the state after a token where we needed an operator."""
+    if token.kind == RIGHT_PAREN:
+        if not open_parens:
+            raise ExpressionSyntaxError("Unmatched ')'", expression, token.position)
+
+        open_parens.pop()
+        return _OPERATOR_STATE
+
+    if token.kind == OPERATOR:
+        if token.text in POSTFIX_OPERATORS:
+            return _OPERATOR_STATE
+
+        if token.text in OPTIONAL_OPERATORS:
+            return _OPTIONAL_STATE
+
+        if token.text in BINARY_OPERATORS:
+            return _OPERAND_STATE
+
+    raise ExpressionSyntaxError(
+        f"Expected an operator but found '{token.text}'", expression, token.position
+    )
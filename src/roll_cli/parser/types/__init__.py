@@ -3,6 +3,12 @@
 Types:
     - EvaluationResult:
 
+    - LogNumber:
+
+    - ProgramResults:
+
+    - RepeatResults:
+
     - RollOption:
 
     - RollResults:
@@ -10,12 +16,18 @@ Types:
 from typing import Tuple
 
 from .evaluationresults import EvaluationResults as EvaluationResults
+from .lognumber import LogNumber as LogNumber
+from .programresults import ProgramResults as ProgramResults
+from .repeatresults import RepeatResults as RepeatResults
 from .rolloption import RollOption as RollOption
 from .rollresults import RollResults as RollResults
 
 
 __all__: Tuple[str, ...] = (
     "EvaluationResults",
+    "LogNumber",
+    "ProgramResults",
+    "RepeatResults",
     "RollOption",
     "RollResults",
 )
@@ -26,9 +26,45 @@ from enum import Enum
 from math import ceil
 from math import factorial
 from math import sqrt
+from typing import TypeVar
 
+from .lognumber import approximate_factorial
+from .lognumber import LogNumber
+from .lognumber import power
 from .rollresults import RollResults
 
+T = TypeVar("T")
+
+
+def _concatenate(first: list[T], second: list[T]) -> list[T]:
+    """Return first followed by second, reusing one of the two lists.
+
+    Both lists are consumed: they belong to two results that are being
+    combined into one, and the result that gave up its list is never
+    used again, so whichever list is reused may end up shared with it.
+
+    When first is the longer list, second is appended to it, which only
+    costs the length of second. Otherwise first is put in front of
+    second, which still moves every item of second along by one memmove.
+    That is much cheaper than building a new list each time, but it is
+    not free, so a long chain that keeps adding to the front of the same
+    list is still quadratic, with a small constant.
+    """
+    if len(first) >= len(second):
+        first.extend(second)
+        return first
+
+    second[:0] = first
+    return second
+
+
+def total_string(total: int | float) -> str:
+    """Return a total as it is shown, without the .0 of whole floats."""
+    if isinstance(total, float) and not isinstance(total, LogNumber) and total % 1 == 0:
+        return f"{int(total)}"
+
+    return f"{total}"
+
 
 class Operators(Enum):
     """Helper operator names for handling operations.
@@ -83,14 +119,28 @@ class EvaluationResults:
 
     def sqrt(self: EvaluationResults) -> None:
         """Take the square root of the total value."""
-        new_total = sqrt(self.total)
+        new_total: int | float
+
+        if isinstance(self.total, LogNumber):
+            new_total = self.total**0.5
+        else:
+            new_total = sqrt(self.total)
+
         self.history.append(f"Square Root: {self.total}: {new_total}")
 
         self.total = new_total
 
     def factorial(self: EvaluationResults) -> None:
-        """Factorial the total value."""
-        new_total = factorial(ceil(self.total))
+        """Factorial the total value.
+
+        In the log-domain numeric mode, factorials that would be too big
+        are approximated instead of being calculated exactly.
+        """
+        new_total: int | float | None = approximate_factorial(self.total)
+
+        if new_total is None:
+            new_total = factorial(ceil(self.total))
+
         self.history.append(f"Factorial: {self.total}! = {new_total}")
 
         self.total = new_total
@@ -104,6 +154,9 @@ class EvaluationResults:
         otherwise we lose key pieces of information that would disallow us
         from being able to make modifications to rolls, i.e., keep notation,
         as well as being able to give a complete verbose output when finished.
+
+        An EvaluationResults given as x is consumed, since its history and
+        rolls may become ours, so it must not be used again afterwards.
         """
         right_hand_value: int | float | EvaluationResults
 
@@ -111,7 +164,7 @@ class EvaluationResults:
             right_hand_value = x
         elif isinstance(x, EvaluationResults):
             self._collect_rolls(x)
-            self.history.extend(x.history)
+            self.history = _concatenate(self.history, x.history)
             right_hand_value = x.total
         else:
             raise TypeError("The supplied type is not valid: " + type(x).__name__)
@@ -121,13 +174,11 @@ class EvaluationResults:
     def _collect_rolls(self: EvaluationResults, er: EvaluationResults) -> None:
         """Add all rolls together if both objects are EvaluationResults.
 
-        The way that we do this is by extending the other object's rolls
-        in place for efficiency's sake and then we set our object to that
-        one instead of the other way around so that we hopefully are going
-        to have the most recently roll as our last.
+        The other object's rolls come first so that we hopefully are going
+        to have the most recently roll as our last. The other object is
+        consumed, since its rolls may be reused, see _concatenate().
         """
-        er.rolls.extend(self.rolls)
-        self.rolls = er.rolls
+        self.rolls = _concatenate(er.rolls, self.rolls)
 
     def __str__(self: EvaluationResults) -> str:
         """Return a string representation of the eval results.
@@ -151,12 +202,7 @@ class EvaluationResults:
         """
         history_string: str = "\n".join([h for h in self.history]) + "\n"
 
-        total_string: str = f"{self.total}"
-
-        if isinstance(self.total, float) and self.total % 1 == 0:
-            total_string = f"{int(self.total)}"
-
-        return f"{history_string}{total_string}"
+        return f"{history_string}{total_string(self.total)}"
 
     def __int__(self: EvaluationResults) -> int:
         """Change the evaluation result total to an integer."""
@@ -378,7 +424,7 @@ class EvaluationResults:
         right_hand_value: int | float = self._process_right_hand_value(x)
         previous_total = self.total
 
-        self.total **= right_hand_value
+        self.total = power(self.total, right_hand_value)
         self.history.append(
             f"Exponentiating: {previous_total} ** {right_hand_value} = {self.total}"
         )
@@ -398,7 +444,7 @@ class EvaluationResults:
         right_hand_value: int | float = self._process_right_hand_value(x)
         previous_total = self.total
 
-        self.total = right_hand_value**self.total
+        self.total = power(right_hand_value, self.total)
         self.history.append(
             f"Exponentiating: {right_hand_value} ** {previous_total} = {self.total}"
         )
@@ -0,0 +1,371 @@
+"""Approximate numbers that are carried around as logarithms.
+
+Factorials and exponents grow so quickly that even small looking
+expressions like `(1d1000)!` or `20d20^20d20` produce integers that are
+thousands of digits long, and most of the time spent evaluating them is
+spent doing bigint arithmetic that nobody is ever going to read.
+
+When the log-domain numeric mode is turned on, any factorial or exponent
+whose result would be larger than the threshold (in bits) is instead
+stored as a LogNumber: a sign along with the base 10 logarithm of the
+magnitude. LogNumbers support the same math that the rest of the roller
+uses, and comparisons between them and regular numbers stay correct, so
+`(1d1000)! > 10^100` can still be answered without ever building the
+actual numbers.
+
+LogNumber subclasses float so that it can be used anywhere that a float
+total is expected. Its float value is infinity, which is what we would
+get if we tried to turn the number into a regular float.
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from math import ceil
+from math import floor
+from math import inf
+from math import isinf
+from math import lgamma
+from math import log
+from math import log10
+from typing import Iterator
+
+# Anything with a logarithm below this can go back to being a regular float.
+_FLOAT_LOG10_LIMIT: float = 300
+
+_LOG10_2: float = log10(2)
+
+_LOG_DOMAIN_THRESHOLD: ContextVar[float | None] = ContextVar(
+    "roll_cli_log_domain_threshold", default=None
+)
+
+
+class LogNumber(float):
+    """A number stored as its sign and the base 10 log of its magnitude."""
+
+    log10_magnitude: float
+    negative: bool
+
+    def __new__(
+        cls: type[LogNumber], log10_magnitude: float, negative: bool = False
+    ) -> LogNumber:
+        """Create a LogNumber from the log of its magnitude and its sign."""
+        number: LogNumber = super().__new__(cls, -inf if negative else inf)
+        number.log10_magnitude = log10_magnitude
+        number.negative = negative
+
+        return number
+
+    @classmethod
+    def factorial(cls: type[LogNumber], n: int | float) -> int | float:
+        """Return n! (with n rounded up) using the log gamma function."""
+        if isinstance(n, LogNumber):
+            raise ValueError(f"Cannot take the factorial of {n}, it is too large.")
+
+        return _from_log(lgamma(ceil(n) + 1) / log(10), False)
+
+    def __repr__(self: LogNumber) -> str:
+        """Return a string representation of the number."""
+        return f"LogNumber({self.log10_magnitude!r}, negative={self.negative!r})"
+
+    def __str__(self: LogNumber) -> str:
+        """Return the number in scientific notation."""
+        sign: str = "-" if self.negative else ""
+
+        if isinf(self.log10_magnitude):
+            return f"{sign}inf"
+
+        exponent: int = floor(self.log10_magnitude)
+        mantissa: float = 10 ** (self.log10_magnitude - exponent)
+
+        return f"{sign}{mantissa:.15g}e+{exponent}"
+
+    def __format__(self: LogNumber, format_spec: str) -> str:
+        """Format the number in scientific notation."""
+        return format(str(self), format_spec)
+
+    def __hash__(self: LogNumber) -> int:
+        """Return a hash of the number."""
+        return hash((self.negative, self.log10_magnitude))
+
+    def __bool__(self: LogNumber) -> bool:
+        """Return True, LogNumbers are never zero."""
+        return True
+
+    def __neg__(self: LogNumber) -> LogNumber:
+        """Negate the number."""
+        return LogNumber(self.log10_magnitude, not self.negative)
+
+    def __pos__(self: LogNumber) -> LogNumber:
+        """Return the number."""
+        return self
+
+    def __abs__(self: LogNumber) -> LogNumber:
+        """Return the magnitude of the number."""
+        return LogNumber(self.log10_magnitude)
+
+    def __eq__(self: LogNumber, other: object) -> bool:
+        """Return whether the number is equal to another."""
+        if not isinstance(other, (int, float)):
+            return NotImplemented
+
+        return _compare(self, other) == 0
+
+    def __ne__(self: LogNumber, other: object) -> bool:
+        """Return whether the number is not equal to another."""
+        if not isinstance(other, (int, float)):
+            return NotImplemented
+
+        return _compare(self, other) != 0
+
+    def __lt__(self: LogNumber, other: int | float) -> bool:
+        """Return whether the number is less than another."""
+        return _compare(self, other) < 0
+
+    def __le__(self: LogNumber, other: int | float) -> bool:
+        """Return whether the number is less than or equal to another."""
+        return _compare(self, other) <= 0
+
+    def __gt__(self: LogNumber, other: int | float) -> bool:
+        """Return whether the number is greater than another."""
+        return _compare(self, other) > 0
+
+    def __ge__(self: LogNumber, other: int | float) -> bool:
+        """Return whether the number is greater than or equal to another."""
+        return _compare(self, other) >= 0
+
+    def __add__(self: LogNumber, other: int | float) -> float:
+        """Add a number to this one."""
+        return _add(self, other)
+
+    def __radd__(self: LogNumber, other: int | float) -> float:
+        """Add this number to another."""
+        return _add(other, self)
+
+    def __sub__(self: LogNumber, other: int | float) -> float:
+        """Subtract a number from this one."""
+        return _add(self, -other)
+
+    def __rsub__(self: LogNumber, other: int | float) -> float:
+        """Subtract this number from another."""
+        return _add(other, -self)
+
+    def __mul__(self: LogNumber, other: int | float) -> float:
+        """Multiply this number by another."""
+        return _mul(self, other, 1)
+
+    def __rmul__(self: LogNumber, other: int | float) -> float:
+        """Multiply another number by this one."""
+        return _mul(self, other, 1)
+
+    def __truediv__(self: LogNumber, other: int | float) -> float:
+        """Divide this number by another."""
+        return _mul(self, other, -1)
+
+    def __rtruediv__(self: LogNumber, other: int | float) -> float:
+        """Divide another number by this one."""
+        return _mul(other, self, -1)
+
+    def __floordiv__(self: LogNumber, other: int | float) -> float:
+        """Divide this number by another and floor."""
+        return _floor(_mul(self, other, -1))
+
+    def __rfloordiv__(self: LogNumber, other: int | float) -> float:
+        """Divide another number by this one and floor."""
+        return _floor(_mul(other, self, -1))
+
+    def __mod__(self: LogNumber, other: int | float) -> float:
+        """Take the modulus of this number by another."""
+        raise ValueError("Cannot take the modulus of an approximate number.")
+
+    def __rmod__(self: LogNumber, other: int | float) -> float:
+        """Take the modulus of another number by this one.
+
+        The result takes the sign of this number, so when the signs differ
+        it is other + self, which is close enough to self to approximate.
+        """
+        if 0 <= other < self or self < other <= 0:
+            return other
+
+        return _add(other, self)
+
+    def __pow__(self: LogNumber, other: int | float) -> float:  # type: ignore[override]
+        """Raise this number to the power of another."""
+        return _pow(self, other)
+
+    def __rpow__(self: LogNumber, other: int | float) -> float:  # type: ignore[override]
+        """Raise another number to the power of this one."""
+        return _pow(other, self)
+
+
+def _parts(x: int | float) -> tuple[int, float]:
+    """Return the sign and base 10 log of the magnitude of a number."""
+    if isinstance(x, LogNumber):
+        return (-1 if x.negative else 1), x.log10_magnitude
+
+    if x == 0:
+        return 0, -inf
+
+    return (-1 if x < 0 else 1), log10(abs(x))
+
+
+def _from_log(log10_magnitude: float, negative: bool) -> int | float:
+    """Create a number from its log, only staying a LogNumber if needed."""
+    if log10_magnitude < _FLOAT_LOG10_LIMIT:
+        value: float = 10**log10_magnitude
+        return -value if negative else value
+
+    return LogNumber(log10_magnitude, negative)
+
+
+def _compare(x: int | float, y: int | float) -> int:
+    """Return -1, 0, or 1 when x is less than, equal to, or more than y."""
+    x_sign, x_log = _parts(x)
+    y_sign, y_log = _parts(y)
+
+    if x_sign != y_sign:
+        return -1 if x_sign < y_sign else 1
+
+    if x_log == y_log:
+        return 0
+
+    # For negative numbers, the larger magnitude is the smaller number.
+    return x_sign if x_log > y_log else -x_sign
+
+
+def _add(x: int | float, y: int | float) -> int | float:
+    """Add two numbers where at least one is a LogNumber."""
+    x_sign, x_log = _parts(x)
+    y_sign, y_log = _parts(y)
+
+    if y_sign == 0:
+        return x
+
+    if x_sign == 0:
+        return y
+
+    # Keep the larger magnitude on the left hand side.
+    if y_log > x_log:
+        x_sign, x_log, y_sign, y_log = y_sign, y_log, x_sign, x_log
+
+    ratio: float = 10 ** (y_log - x_log)
+
+    if x_sign == y_sign:
+        return _from_log(x_log + log10(1 + ratio), x_sign < 0)
+
+    if ratio == 1:
+        return 0
+
+    return _from_log(x_log + log10(1 - ratio), x_sign < 0)
+
+
+def _mul(x: int | float, y: int | float, direction: int) -> int | float:
+    """Multiply (direction 1) or divide (direction -1) x by y."""
+    x_sign, x_log = _parts(x)
+    y_sign, y_log = _parts(y)
+
+    if y_sign == 0 and direction < 0:
+        raise ZeroDivisionError("division by zero")
+
+    if x_sign == 0 or y_sign == 0:
+        return 0
+
+    return _from_log(x_log + direction * y_log, x_sign != y_sign)
+
+
+def _floor(x: int | float) -> int | float:
+    """Floor the number if it is small enough for it to matter."""
+    return x if isinstance(x, LogNumber) else floor(x)
+
+
+def _pow(base: int | float, exponent: int | float) -> int | float:
+    """Raise base to the power of exponent in the log domain."""
+    base_sign, base_log = _parts(base)
+
+    if base_sign == 0:
+        if exponent < 0:
+            raise ZeroDivisionError("0.0 cannot be raised to a negative power")
+
+        return 0 if exponent > 0 else 1
+
+    negative: bool = False
+
+    if base_sign < 0:
+        if isinstance(exponent, LogNumber) or exponent % 1 != 0:
+            raise ValueError("Cannot raise a negative number to a fractional power.")
+
+        negative = exponent % 2 == 1
+
+    if isinstance(exponent, LogNumber):
+        if base_log == 0:
+            return 1
+
+        # The log of the result is itself too large for a regular float.
+        if (base_log > 0) == exponent.negative:
+            return 0
+
+        return LogNumber(inf, negative)
+
+    return _from_log(base_log * exponent, negative)
+
+
+def log_domain_threshold() -> float | None:
+    """Return the threshold (in bits) for the log-domain numeric mode."""
+    return _LOG_DOMAIN_THRESHOLD.get()
+
+
+@contextmanager
+def use_log_domain(threshold: float | None) -> Iterator[None]:
+    """Carry values larger than threshold bits as LogNumbers in the block.
+
+    A threshold of None turns the numeric mode off.
+    """
+    token = _LOG_DOMAIN_THRESHOLD.set(threshold)
+
+    try:
+        yield
+    finally:
+        _LOG_DOMAIN_THRESHOLD.reset(token)
+
+
+def power_bits(base: int | float, exponent: int | float) -> float:
+    """Return the approximate bit length of base ** exponent."""
+    base_sign, base_log = _parts(base)
+
+    if base_sign == 0 or base_log <= 0 or exponent <= 0:
+        return 0
+
+    return float(base_log * exponent / _LOG10_2)
+
+
+def factorial_bits(n: int | float) -> float:
+    """Return the approximate bit length of n! (with n rounded up)."""
+    if isinstance(n, LogNumber):
+        return inf
+
+    return lgamma(ceil(n) + 1) / log(2) if n > 1 else 0
+
+
+def power(base: int | float, exponent: int | float) -> int | float:
+    """Raise base to exponent, in the log domain if the result is too big."""
+    threshold: float | None = log_domain_threshold()
+
+    if isinstance(base, LogNumber) or isinstance(exponent, LogNumber):
+        return _pow(base, exponent)
+
+    if threshold is not None and power_bits(base, exponent) > threshold:
+        return _pow(base, exponent)
+
+    return base**exponent
+
+
+def approximate_factorial(n: int | float) -> int | float | None:
+    """Return n! as a LogNumber if it is too big, otherwise None."""
+    threshold: float | None = log_domain_threshold()
+
+    if isinstance(n, LogNumber) or (
+        threshold is not None and factorial_bits(n) > threshold
+    ):
+        return LogNumber.factorial(n)
+
+    return None
@@ -0,0 +1,90 @@
+"""Results of every statement of a program of dice strings.
+
+See roll_cli.parser.program for what programs look like. The results are
+kept in the order of the statements, and the results of named statements
+can be looked up by their name as well as by their position.
+"""
+from __future__ import annotations
+
+from typing import Iterator
+
+from .evaluationresults import EvaluationResults
+
+
+class ProgramResults:
+    """Hold the result of every statement of a program.
+
+    names: The name of each statement, None for unnamed statements
+    results: The result of each statement
+    """
+
+    def __init__(
+        self: ProgramResults,
+        names: list[str | None],
+        results: list[int | float | EvaluationResults],
+    ) -> None:
+        """Initialize a ProgramResults object."""
+        self.names: list[str | None] = names
+        self.results: list[int | float | EvaluationResults] = results
+
+    def __getitem__(
+        self: ProgramResults, key: int | str
+    ) -> int | float | EvaluationResults:
+        """Return the result of a statement by its position or its name."""
+        if isinstance(key, str):
+            if key not in self.names:
+                raise KeyError(key)
+
+            key = self.names.index(key)
+
+        return self.results[key]
+
+    def __iter__(self: ProgramResults) -> Iterator[int | float | EvaluationResults]:
+        """Iterate over the results in the order of the statements."""
+        return iter(self.results)
+
+    def __len__(self: ProgramResults) -> int:
+        """Return the number of statements."""
+        return len(self.results)
+
+    def as_dict(self: ProgramResults) -> dict[str, int | float | EvaluationResults]:
+        """Return the results of the named statements by their names."""
+        return {
+            name: result
+            for name, result in zip(self.names, self.results)
+            if name is not None
+        }
+
+    def totals(self: ProgramResults) -> list[int | float]:
+        """Return the total of every statement."""
+        return [
+            result.total if isinstance(result, EvaluationResults) else result
+            for result in self.results
+        ]
+
+    def __str__(self: ProgramResults) -> str:
+        """Return every result on its own line, after its name if it has one.
+
+        Results that take more than a line, like verbose ones, start on
+        the line after their name instead.
+
+        e.g.
+        Roll: hit: 1d20 + 7; damage: 2d6 + 4; 3
+
+        hit: 19
+        damage: 11
+        3
+        """
+        lines: list[str] = []
+
+        for name, result in zip(self.names, self.results):
+            text: str = str(result)
+
+            if name is None:
+                lines.append(text)
+                continue
+
+            separator: str = "\n" if "\n" in text else " "
+            lines.append(f"{name}:{separator}{text}")
+
+        return "\n".join(lines)
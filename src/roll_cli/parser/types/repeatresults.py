@@ -0,0 +1,96 @@
+"""Results of rolling the same expression for several groups at once.
+
+A repeat like `6#(4d6K3)` evaluates its expression once for each of six
+groups, such as the six ability scores of a new character. The results
+are kept in the order of the groups, and each group keeps its own rolls
+and history so that verbose output can show every one of them.
+"""
+from __future__ import annotations
+
+from typing import Iterator
+
+from .evaluationresults import EvaluationResults
+from .evaluationresults import total_string
+
+
+class RepeatResults(EvaluationResults):
+    """Hold the result of every group of a repeat.
+
+    The total is the sum of every group and the rolls and history of the
+    groups are gathered together, so a RepeatResults can be used anywhere
+    that an EvaluationResults can. Indexing, iterating over, and taking
+    the length of a RepeatResults goes by its groups instead.
+
+    groups: The result of each group
+    """
+
+    def __init__(
+        self: RepeatResults, groups: list[int | float | EvaluationResults]
+    ) -> None:
+        """Initialize a RepeatResults object."""
+        super().__init__()
+        self.groups: list[int | float | EvaluationResults] = groups
+
+        for index, group in enumerate(groups, 1):
+            if not isinstance(group, EvaluationResults):
+                self.total += group
+                continue
+
+            self.total += group.total
+            self.rolls.extend(group.rolls)
+            self.history.append(f"Group {index}:")
+            self.history.extend(group.history)
+
+    def totals(self: RepeatResults) -> list[int | float]:
+        """Return the total of every group."""
+        return [
+            group.total if isinstance(group, EvaluationResults) else group
+            for group in self.groups
+        ]
+
+    def summary(self: RepeatResults) -> RepeatResults:
+        """Return the results with only the total of every group."""
+        return RepeatResults(list(self.totals()))
+
+    def __getitem__(self: RepeatResults, index: int) -> int | float | EvaluationResults:
+        """Return the result of a single group."""
+        return self.groups[index]
+
+    def __iter__(self: RepeatResults) -> Iterator[int | float | EvaluationResults]:
+        """Iterate over the result of every group in order."""
+        return iter(self.groups)
+
+    def __len__(self: RepeatResults) -> int:
+        """Return the number of groups."""
+        return len(self.groups)
+
+    def __eq__(self: RepeatResults, other: object) -> bool:
+        """Return whether the totals of the groups are equal to a list."""
+        if isinstance(other, list):
+            return self.totals() == other
+
+        return super().__eq__(other)
+
+    def __str__(self: RepeatResults) -> str:
+        """Return every group that has rolls, followed by all of their totals.
+
+        e.g.
+        Roll: 3#(4d6K3)
+
+        Group 1:
+        Rolled: 4d6: [6, 2, 5, 3]
+        Keeping highest: 3: [3, 5, 6]
+        14
+        Group 2:
+        ...
+        14, 9, 12
+        """
+        lines: list[str] = []
+
+        for index, group in enumerate(self.groups, 1):
+            if isinstance(group, EvaluationResults):
+                lines.append(f"Group {index}:")
+                lines.append(str(group))
+
+        lines.append(", ".join(total_string(total) for total in self.totals()))
+        return "\n".join(lines)
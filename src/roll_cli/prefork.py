@@ -0,0 +1,223 @@
+"""Pools of worker processes forked from a warm parent.
+
+Workers started with the spawn (or forkserver) start method begin as a
+fresh interpreter, so each one has to import the package and warm up
+its own parser before it can roll anything. Forked workers instead
+start as a copy of the parent, so when the parent has already warmed up
+the parser, every worker starts out ready to roll and shares the pages
+holding it with the parent until one of them writes to them.
+
+Reference counting and the garbage collector write to every object they
+visit though, which would slowly copy those shared pages into each
+worker. Freezing the heap with gc.freeze() right before forking moves
+everything that exists at that point out of the collector's reach, so
+at least the collector leaves them alone.
+
+Running this module prints a comparison of forked and spawned workers:
+
+    python -m roll_cli.prefork [WORKERS]
+"""
+from __future__ import annotations
+
+import gc
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.connection import Connection
+from time import perf_counter
+from typing import Any
+from typing import Iterator
+
+from .roll import roll
+
+# Expressions rolled to warm up the parser, covering the common operators.
+WARM_EXPRESSIONS: tuple[str, ...] = (
+    "1d20 + 5",
+    "4d6K3",
+    "4d6k1",
+    "2d8 - 1d6 * 2 / 3",
+    "d%",
+    "10d10x2",
+    "3! + sqrt(16) + 2^3 + 7 // 2 + 5 % 3",
+    "1d20 > 10",
+)
+
+
+def can_fork() -> bool:
+    """Return whether workers can be forked on this platform."""
+    return "fork" in multiprocessing.get_all_start_methods()
+
+
+def warm_up() -> None:
+    """Import and build everything that rolling needs in this process."""
+    for expression in WARM_EXPRESSIONS:
+        roll(expression)
+
+
+class _FrozenHeap:
+    """Context manager that freezes the heap for as long as it is open.
+
+    Objects created before the heap was frozen stay out of the garbage
+    collector's reach in forked children even after the parent unfreezes
+    its own heap again.
+    """
+
+    def __enter__(self: _FrozenHeap) -> None:
+        """Collect any garbage and then freeze everything that is left."""
+        gc.collect()
+        gc.freeze()
+
+    def __exit__(self: _FrozenHeap, *args: object) -> None:
+        """Give the parent's objects back to the garbage collector."""
+        gc.unfreeze()
+
+
+def fork_pool(jobs: int) -> ProcessPoolExecutor:
+    """Return a pool of jobs worker processes forked from a warm parent.
+
+    All of the workers are forked before this returns. Platforms that
+    cannot fork get an ordinary pool using their default start method.
+    """
+    if not can_fork():
+        return ProcessPoolExecutor(max_workers=jobs)
+
+    warm_up()
+
+    with _FrozenHeap():
+        pool: ProcessPoolExecutor = ProcessPoolExecutor(
+            max_workers=jobs, mp_context=multiprocessing.get_context("fork")
+        )
+
+        # Workers are only started once there is work for them, so give
+        # each one something to do now, while the heap is still frozen.
+        for future in [pool.submit(os.getpid) for _ in range(jobs)]:
+            future.result()
+
+    return pool
+
+
+def memory_usage() -> tuple[int | None, int | None]:
+    """Return the resident and private memory of this process in bytes.
+
+    Resident memory counts pages shared with other processes, while
+    private memory only counts the pages that belong to this process
+    alone. Both are None where /proc/self/smaps_rollup is not available.
+    """
+    fields: dict[str, int] = {}
+
+    try:
+        with open("/proc/self/smaps_rollup") as smaps:
+            for line in smaps:
+                name, _, value = line.partition(":")
+
+                if value.endswith("kB\n"):
+                    fields[name] = int(value.split()[0]) * 1024
+    except OSError:
+        return None, None
+
+    return (
+        fields.get("Rss"),
+        fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    )
+
+
+def _report(connection: Connection) -> None:
+    """Roll something in a new worker and send back its memory usage."""
+    roll("1d20")
+    connection.send(memory_usage())
+    connection.close()
+
+
+class WorkerStats:
+    """Measurements of a single worker process.
+
+    start_method: How the worker was started
+    startup: Seconds from starting the worker until it had rolled
+    rss: Resident memory of the worker in bytes, or None if unknown
+    private: Memory used only by the worker in bytes, or None if unknown
+    """
+
+    def __init__(
+        self: WorkerStats,
+        start_method: str,
+        startup: float,
+        rss: int | None,
+        private: int | None,
+    ) -> None:
+        """Initialize a WorkerStats object."""
+        self.start_method: str = start_method
+        self.startup: float = startup
+        self.rss: int | None = rss
+        self.private: int | None = private
+
+    def __repr__(self: WorkerStats) -> str:
+        """Return a string representation of the measurements."""
+        return (
+            f"WorkerStats(start_method={self.start_method!r}, "
+            f"startup={self.startup}, rss={self.rss}, private={self.private})"
+        )
+
+
+def _start_workers(start_method: str, workers: int) -> Iterator[WorkerStats]:
+    """Start workers one at a time, measuring each one."""
+    context: Any = multiprocessing.get_context(start_method)
+
+    for _ in range(workers):
+        receiver, sender = context.Pipe(duplex=False)
+
+        start: float = perf_counter()
+        process = context.Process(target=_report, args=(sender,))
+        process.start()
+        rss, private = receiver.recv()
+        startup: float = perf_counter() - start
+
+        process.join()
+        receiver.close()
+        sender.close()
+
+        yield WorkerStats(start_method, startup, rss, private)
+
+
+def measure_workers(start_method: str, workers: int = 4) -> list[WorkerStats]:
+    """Measure how long workers take to start and how much memory they use.
+
+    Workers are started one after another so that they do not slow each
+    other down. For forked workers, the parent is warmed up and its heap
+    frozen first, the same way that fork_pool() does it.
+    """
+    if start_method != "fork":
+        return list(_start_workers(start_method, workers))
+
+    warm_up()
+
+    with _FrozenHeap():
+        return list(_start_workers(start_method, workers))
+
+
+def _format_bytes(size: int | None) -> str:
+    """Return a size in bytes as MiB for printing."""
+    return "n/a" if size is None else f"{size / (1 << 20):.1f} MiB"
+
+
+def compare(workers: int = 4) -> str:
+    """Return a table comparing forked workers with spawned ones."""
+    methods: list[str] = [
+        method
+        for method in ("fork", "spawn")
+        if method in multiprocessing.get_all_start_methods()
+    ]
+    lines: list[str] = [f"{'method':8} {'startup':>10} {'rss':>12} {'private':>12}"]
+
+    for method in methods:
+        for stats in measure_workers(method, workers):
+            lines.append(
+                f"{method:8} {stats.startup * 1000:>7.1f} ms "
+                f"{_format_bytes(stats.rss):>12} {_format_bytes(stats.private):>12}"
+            )
+
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    print(compare(int(sys.argv[1]) if len(sys.argv) > 1 else 4))
@@ -0,0 +1,243 @@
+"""Break down where the time goes when rolling an expression.
+
+A RollProfiler uses the parser's hooks (see roll_cli.parser.hooks) to
+time parsing and every operator while it is active, grouping operators
+into categories such as dice, keep/drop, and arithmetic. Phases that
+happen outside of the parser, like validating the input and formatting
+the output, are timed with RollProfiler.phase(). Optionally, the whole
+thing is run under cProfile as well and its stats dumped to a file.
+
+Usage:
+    with RollProfiler() as profiler:
+        roll("4d6K3")
+
+    print(profiler.report())
+
+Parsing is only counted when the expression is actually parsed, since
+compiled expressions are cached by the parser. Tokenizing, which is
+what checks that the expression is well formed, is counted as part of
+validation rather than parsing.
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Any
+from typing import Callable
+from typing import Iterator
+from typing import TYPE_CHECKING
+
+from .parser import hooks
+from .parser.diceparser import DiceParser
+from .parser.types import EvaluationResults
+from .parser.types import RollOption
+from .roll import clean_expression
+from .roll import summarize
+
+if TYPE_CHECKING:
+    from cProfile import Profile
+
+# Category that the time spent on each operator is counted under.
+OPERATOR_CATEGORIES: dict[str, str] = {
+    "d": "dice",
+    "d%": "dice",
+    "k": "keep/drop",
+    "K": "keep/drop",
+    "x": "keep/drop",
+    "X": "keep/drop",
+    "+": "arithmetic",
+    "-": "arithmetic",
+    "*": "arithmetic",
+    "/": "arithmetic",
+    "//": "arithmetic",
+    "%": "arithmetic",
+    "^": "exponents",
+    "**": "exponents",
+    "!": "factorial/sqrt",
+    "sqrt": "factorial/sqrt",
+    "<": "comparisons",
+    ">": "comparisons",
+    "=": "comparisons",
+    "<=": "comparisons",
+    ">=": "comparisons",
+}
+
+# Every operator category, once each and in order.
+CATEGORIES: tuple[str, ...] = tuple(dict.fromkeys(OPERATOR_CATEGORIES.values()))
+
+# Phases in the order that they are reported in.
+PHASES: tuple[str, ...] = (
+    "validation",
+    "parsing",
+    *CATEGORIES,
+    "evaluation (other)",
+    "formatting",
+)
+
+
+class RollProfiler:
+    """Collect the wall time spent in each phase of rolling.
+
+    cprofile_path: File to dump cProfile stats to, None to not use cProfile
+    """
+
+    def __init__(self: RollProfiler, cprofile_path: str | None = None) -> None:
+        """Initialize a RollProfiler object."""
+        self.cprofile_path: str | None = cprofile_path
+        self.timings: dict[str, float] = {}
+        self.calls: dict[str, int] = {}
+        self.total: float = 0.0
+
+        self._evaluating: float = 0.0
+        self._tokenizing: float = 0.0
+        self._tokenized: float = 0.0
+        self._started: float = 0.0
+        self._profile: Profile | None = None
+        self._handlers: dict[str, Callable[..., Any]] = {
+            "on_tokenize_end": self._on_tokenize_end,
+            "on_parse_end": self._on_parse_end,
+            "on_operation": self._on_operation,
+            "on_evaluate_end": self._on_evaluate_end,
+        }
+
+    def add(self: RollProfiler, phase: str, seconds: float) -> None:
+        """Count a single call that took the given number of seconds."""
+        self.timings[phase] = self.timings.get(phase, 0.0) + seconds
+        self.calls[phase] = self.calls.get(phase, 0) + 1
+
+    @contextmanager
+    def phase(self: RollProfiler, phase: str) -> Iterator[None]:
+        """Time the body of a with statement as part of the phase."""
+        started: float = perf_counter()
+
+        try:
+            yield
+        finally:
+            self.add(phase, perf_counter() - started)
+
+    def __enter__(self: RollProfiler) -> RollProfiler:
+        """Start profiling."""
+        for event, handler in self._handlers.items():
+            hooks.register(event, handler)
+
+        if self.cprofile_path is not None:
+            from cProfile import Profile
+
+            self._profile = Profile()
+            self._profile.enable()
+
+        self._started = perf_counter()
+        return self
+
+    def __exit__(self: RollProfiler, *args: object) -> None:
+        """Stop profiling, and dump the cProfile stats if asked to."""
+        self.total += perf_counter() - self._started
+
+        if self._profile is not None and self.cprofile_path is not None:
+            self._profile.disable()
+            self._profile.dump_stats(self.cprofile_path)
+            self._profile = None
+
+        for event, handler in self._handlers.items():
+            hooks.unregister(event, handler)
+
+        # Whatever the parser spent outside of tokenizing, parsing, and the
+        # operators.
+        other: float = (
+            self._evaluating
+            - self._tokenized
+            - sum(self.timings.get(phase, 0.0) for phase in ("parsing", *CATEGORIES))
+        )
+        self.timings["evaluation (other)"] = max(other, 0.0) + self.timings.get(
+            "evaluation (other)", 0.0
+        )
+        self._evaluating = 0.0
+        self._tokenized = 0.0
+
+    def _on_tokenize_end(self: RollProfiler, dice_string: str, seconds: float) -> None:
+        # Tokenizing finishes validating the expression, so it adds to the
+        # time of the validation phase without being a call of its own.
+        self.timings["validation"] = self.timings.get("validation", 0.0) + seconds
+        self._tokenizing += seconds
+        self._tokenized += seconds
+
+    def _on_parse_end(self: RollProfiler, dice_string: str, seconds: float) -> None:
+        # The parse includes tokenizing, which was counted as validation.
+        self.add("parsing", max(seconds - self._tokenizing, 0.0))
+        self._tokenizing = 0.0
+
+    def _on_operation(
+        self: RollProfiler,
+        operator: str,
+        operands: list[Any],
+        result: Any,
+        seconds: float,
+    ) -> None:
+        self.add(OPERATOR_CATEGORIES.get(operator, "evaluation (other)"), seconds)
+
+    def _on_evaluate_end(
+        self: RollProfiler,
+        dice_string: str,
+        results: list[Any] | None,
+        error: Exception | None,
+        seconds: float,
+    ) -> None:
+        self._evaluating += seconds
+
+    def report(self: RollProfiler) -> str:
+        """Return a table of the time spent in each phase."""
+        lines: list[str] = [
+            f"{'phase':<20} {'calls':>7} {'time (ms)':>12} {'share':>7}"
+        ]
+        phases: list[str] = [phase for phase in PHASES if phase in self.timings]
+        phases.extend(phase for phase in self.timings if phase not in PHASES)
+
+        for phase in phases:
+            seconds: float = self.timings[phase]
+            share: float = seconds / self.total if self.total else 0.0
+            calls: str = str(self.calls[phase]) if phase in self.calls else ""
+
+            lines.append(
+                f"{phase:<20} {calls:>7} {seconds * 1000:>12.3f} {share:>7.1%}"
+            )
+
+        lines.append(f"{'total':<20} {'':>7} {self.total * 1000:>12.3f} {1:>7.1%}")
+
+        if self.cprofile_path is not None:
+            lines.append(f"cProfile stats written to {self.cprofile_path}")
+
+        return "\n".join(lines)
+
+
+def profile_roll(
+    expression: str = "",
+    verbose: bool = False,
+    roll_option: RollOption = RollOption.Normal,
+    cprofile_path: str | None = None,
+) -> tuple[str, RollProfiler]:
+    """Roll the expression the way the roll command does, profiling it.
+
+    The expression is validated once and then handed straight to a new
+    parser, the same as a fresh roll command would have, rather than to
+    roll(), which would validate it again.
+
+    Returns:
+        The output for the expression along with the profiler.
+    """
+    parser: DiceParser = DiceParser()
+
+    with RollProfiler(cprofile_path) as profiler:
+        with profiler.phase("validation"):
+            expression = clean_expression(expression)
+
+        result: int | float | EvaluationResults = parser.evaluate(
+            expression, roll_option
+        )
+
+        if not verbose:
+            result = summarize(result)
+
+        with profiler.phase("formatting"):
+            output: str = str(result)
+
+    return output, profiler
@@ -0,0 +1,203 @@
+"""Roll expressions interactively with a parser that stays warm.
+
+Every `roll` call starts a new interpreter, which takes far longer than
+the roll itself. The REPL instead keeps a single DiceParser alive for
+the whole session, so every expression is only ever parsed once and
+rolling it again just evaluates the compiled form.
+
+Input:
+    <expression>        Roll the expression
+    <enter>             Roll the previous expression again
+    @name               Roll a saved expression, which can also be used
+                        inside of other expressions, e.g. `@attack + 2`
+    :save name [expr]   Save the expression (or the previous one) as name
+    :delete name        Forget a saved expression
+    :list               Show every saved expression
+    :help               Show this help
+    :quit               Leave (as does Ctrl-D)
+
+Errors are reported as "error: <message>" and the session keeps going.
+"""
+from __future__ import annotations
+
+import re
+from typing import Callable
+
+from .parser.diceparser import DiceParser
+from .parser.types import EvaluationResults
+from .parser.types import RollOption
+from .roll import clean_expression
+from .roll import summarize
+
+PROMPT: str = "roll> "
+
+# Saved expressions are referred to as @name.
+_REFERENCE: re.Pattern[str] = re.compile(r"@(\w+)")
+_NAME: re.Pattern[str] = re.compile(r"\w+")
+
+HELP: str = """\
+<expression>        Roll the expression
+<enter>             Roll the previous expression again
+@name               Roll a saved expression, e.g. `@attack + 2`
+:save name [expr]   Save the expression (or the previous one) as name
+:delete name        Forget a saved expression
+:list               Show every saved expression
+:help               Show this help
+:quit               Leave (as does Ctrl-D)"""
+
+
+class QuitRepl(Exception):
+    """Raised by the :quit command to end the session."""
+
+
+class RollRepl:
+    """State of an interactive session.
+
+    verbose: Whether to show every roll along with the total
+    roll_option: Whether to roll normally, or always the minimum or maximum
+    """
+
+    def __init__(
+        self: RollRepl,
+        verbose: bool = False,
+        roll_option: RollOption = RollOption.Normal,
+    ) -> None:
+        """Initialize a RollRepl with a parser of its own."""
+        self.verbose: bool = verbose
+        self.roll_option: RollOption = roll_option
+        self.parser: DiceParser = DiceParser()
+        self.previous: str | None = None
+        self.saved: dict[str, str] = {}
+        self._commands: dict[str, Callable[[list[str]], str]] = {
+            "save": self._save,
+            "delete": self._delete,
+            "list": self._list,
+            "help": self._help,
+            "quit": self._quit,
+            "q": self._quit,
+        }
+
+    def handle(self: RollRepl, line: str) -> str:
+        """Handle a single line of input, returning what to print.
+
+        Raises:
+            QuitRepl: The line asked to end the session.
+        """
+        line = line.strip()
+
+        try:
+            if line.startswith(":"):
+                return self._command(line[1:].split(maxsplit=2))
+
+            if not line:
+                line = self.previous or ""
+
+            output: str = self.roll(line)
+        except QuitRepl:
+            raise
+        except Exception as err:
+            return f"error: {err}"
+
+        self.previous = line
+        return output
+
+    def roll(self: RollRepl, expression: str) -> str:
+        """Roll the expression with the session's parser."""
+        expression = clean_expression(self.expand(expression))
+        result: int | float | EvaluationResults = self.parser.evaluate(
+            expression, self.roll_option
+        )
+
+        return str(result if self.verbose else summarize(result))
+
+    def expand(self: RollRepl, expression: str) -> str:
+        """Replace every @name in the expression with its saved expression."""
+
+        def replace(match: re.Match[str]) -> str:
+            name: str = match.group(1)
+
+            if name not in self.saved:
+                raise ValueError(f"No saved expression named {name}.")
+
+            return f"({self.saved[name]})"
+
+        return _REFERENCE.sub(replace, expression)
+
+    def _command(self: RollRepl, words: list[str]) -> str:
+        if not words or words[0] not in self._commands:
+            raise ValueError(f"Unknown command: {':'.join(words[:1])}, try :help")
+
+        return self._commands[words[0]](words[1:])
+
+    def _save(self: RollRepl, arguments: list[str]) -> str:
+        if not arguments or not _NAME.fullmatch(arguments[0]):
+            raise ValueError("Usage: :save name [expression]")
+
+        expression: str | None = arguments[1] if len(arguments) > 1 else self.previous
+
+        if expression is None:
+            raise ValueError("There is no previous expression to save.")
+
+        # Saved expressions are expanded when they are saved, so that
+        # changing one later never changes the others, and are checked to
+        # parse so that mistakes show up now instead of when rolled.
+        expression = clean_expression(self.expand(expression))
+        self.parser.compile(expression)
+        self.saved[arguments[0]] = expression
+
+        return f"saved @{arguments[0]} = {expression}"
+
+    def _delete(self: RollRepl, arguments: list[str]) -> str:
+        if not arguments or arguments[0] not in self.saved:
+            raise ValueError("Usage: :delete name (of a saved expression)")
+
+        del self.saved[arguments[0]]
+        return f"deleted @{arguments[0]}"
+
+    def _list(self: RollRepl, arguments: list[str]) -> str:
+        if not self.saved:
+            return "no saved expressions"
+
+        return "\n".join(
+            f"@{name} = {expression}" for name, expression in self.saved.items()
+        )
+
+    def _help(self: RollRepl, arguments: list[str]) -> str:
+        return HELP
+
+    def _quit(self: RollRepl, arguments: list[str]) -> str:
+        raise QuitRepl()
+
+
+def _enable_line_editing() -> None:
+    """Give input() history and line editing when readline is available."""
+    try:
+        import readline  # noqa: F401
+    except ImportError:  # pragma: no cover
+        pass
+
+
+def run(
+    verbose: bool = False,
+    roll_option: RollOption = RollOption.Normal,
+    read: Callable[[str], str] = input,
+    write: Callable[[str], None] = print,
+) -> None:
+    """Run an interactive session until it is quit or the input ends."""
+    _enable_line_editing()
+    session: RollRepl = RollRepl(verbose, roll_option)
+
+    while True:
+        try:
+            line: str = read(PROMPT)
+        except EOFError:
+            write("")
+            return
+        except KeyboardInterrupt:
+            write("")
+            continue
+
+        try:
+            write(session.handle(line))
+        except QuitRepl:
+            return
@@ -8,26 +8,43 @@ Input -> Output
 1d20 -> 19
 1d8 + 3d6 + 5 -> 15
 d% -> 42
+3#4d6K3 -> 14, 9, 12
 <Nothing> -> 14 (Rolls a d20)
 etc.
 """
+from typing import List
+from typing import Optional
 from typing import Union
 
+from .parser.budget import EvaluationBudget
+from .parser.cost import CostEstimate
+from .parser.cost import CostLimits
 from .parser.diceparser import DiceParser
 from .parser.types import EvaluationResults
+from .parser.types import RepeatResults
 from .parser.types import RollOption
 
-_DICE_PARSER = DiceParser()
+_DICE_PARSER: Optional[DiceParser] = None
 
-GOOD_CHARS: str = "0123456789d-/*() %+.!^pPiIeEsSqQrRtTkKxX<>="
+GOOD_CHARS: str = "0123456789d-/*() %+.!^pPiIeEsSqQrRtTkKxX<>=#"
 
 
-def roll(
-    expression: str = "",
-    verbose: bool = False,
-    roll_option: RollOption = RollOption.Normal,
-) -> Union[int, float, EvaluationResults]:
-    """Evalute a string for dice and mathematical operations and calculate."""
+def _dice_parser() -> DiceParser:
+    """Return the shared parser, creating it the first time it is needed."""
+    global _DICE_PARSER
+
+    if _DICE_PARSER is None:
+        _DICE_PARSER = DiceParser()
+
+    return _DICE_PARSER
+
+
+def clean_expression(expression: str) -> str:
+    """Check the expression for bad characters and fill in the default.
+
+    This is the same check that roll() does first, for callers that want
+    to do it on its own, and a ValueError is raised for bad characters.
+    """
     input_had_bad_chars: bool = len(expression.strip(GOOD_CHARS)) > 0
 
     if input_had_bad_chars:
@@ -36,14 +53,85 @@ def roll(
     if expression.strip() == "":
         expression = "1d20"
 
-    result: Union[int, float, EvaluationResults] = _DICE_PARSER.evaluate(
-        expression, roll_option
+    return expression
+
+
+def summarize(
+    result: Union[int, float, EvaluationResults]
+) -> Union[int, float, EvaluationResults]:
+    """Return the total of a result, or the total of every group of a repeat.
+
+    This is what roll() gives back when it is not verbose, for callers
+    that evaluate with a parser of their own.
+    """
+    if isinstance(result, RepeatResults):
+        return result.summary()
+
+    return result.total if isinstance(result, EvaluationResults) else result
+
+
+def estimate_cost(expression: str = "") -> CostEstimate:
+    """Estimate the cost of evaluating a string without rolling anything."""
+    return _dice_parser().estimate_cost(clean_expression(expression))
+
+
+def roll(
+    expression: str = "",
+    verbose: bool = False,
+    roll_option: RollOption = RollOption.Normal,
+    limits: Optional[CostLimits] = None,
+    budget: Optional[EvaluationBudget] = None,
+    approximate_above: Optional[float] = None,
+) -> Union[int, float, EvaluationResults]:
+    """Evalute a string for dice and mathematical operations and calculate.
+
+    When limits are given, expressions that are estimated to go over
+    them are rejected with an ExpressionTooCostlyError before any dice
+    are rolled. When a budget is given, evaluation is stopped with a
+    BudgetExceededError as soon as it runs out.
+
+    When approximate_above is given, factorials and exponents with
+    results larger than that many bits are approximated as LogNumbers.
+    """
+    expression = clean_expression(expression)
+
+    result: Union[int, float, EvaluationResults] = _dice_parser().evaluate(
+        expression, roll_option, limits, budget, approximate_above
     )
 
     if verbose:
         return result
 
-    return result.total if isinstance(result, EvaluationResults) else result
+    return summarize(result)
+
+
+def roll_repeated(
+    expression: str = "",
+    count: int = 1,
+    verbose: bool = False,
+    roll_option: RollOption = RollOption.Normal,
+    limits: Optional[CostLimits] = None,
+    budget: Optional[EvaluationBudget] = None,
+    approximate_above: Optional[float] = None,
+) -> List[Union[int, float, EvaluationResults]]:
+    """Roll the same expression count times, only parsing it once.
+
+    This is much quicker than calling roll() count times since the
+    expression is compiled once and then only evaluated. The limits
+    apply to each roll on its own while the budget is shared by all.
+    """
+    expression = clean_expression(expression)
+
+    results: List[
+        Union[int, float, EvaluationResults]
+    ] = _dice_parser().evaluate_repeated(
+        expression, count, roll_option, limits, budget, approximate_above
+    )
+
+    if verbose:
+        return results
+
+    return [summarize(result) for result in results]
 
 
 if __name__ == "__main__":
@@ -0,0 +1,239 @@
+"""asyncio network server for rolling dice as a service.
+
+The server speaks line-delimited JSON over TCP. Each line sent to it is
+a request and gets exactly one line back:
+
+    {"id": 1, "expression": "4d6K3", "verbose": false, "roll_option": "Normal"}
+    {"id": 1, "expression": "4d6K3", "total": 14}
+
+Requests can also hold a batch of expressions, which are all rolled with
+the same options and answered together:
+
+    {"id": 2, "batch": ["1d20 + 5", "2d6 + 3"]}
+    {"id": 2, "results": [{"expression": "1d20 + 5", "total": 17}, ...]}
+
+Errors are answered with {"id": ..., "error": "..."} (per expression for
+batches), and the connection stays open. The one exception is a line
+longer than the stream's limit (64 KiB), which is answered with an
+error before the connection is closed, since there is no telling where
+the next request would start.
+
+The parser's metrics can be asked for as a dictionary, or as text in the
+Prometheus exposition format:
+
+    {"id": 3, "metrics": "json"}
+    {"id": 3, "metrics": {"evaluations": 2, ...}}
+
+Requests are pipelined: a client can send as many as it likes without
+waiting, and each one is answered as soon as it is done, so replies can
+come back out of order and should be matched up by their id.
+
+Rolls go through roll_async(), so small expressions are rolled right on
+the event loop while expressions that the cost model says are heavy are
+rolled in an executor instead, where they cannot hold up everyone
+else's rolls.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+from concurrent.futures import Executor
+from typing import Any
+
+from .aio import roll_async
+from .formats import result_record
+from .parser.metrics import active_metrics
+from .parser.metrics import enable_metrics
+from .parser.metrics import MetricsRegistry
+from .parser.types import RollOption
+
+# Number of requests from a single connection that can be in flight at once.
+MAX_PENDING: int = 64
+
+
+class RollService:
+    """Answer roll requests, offloading heavy expressions to an executor.
+
+    executor: Executor for heavy expressions, None for the loop's default
+    """
+
+    def __init__(self: RollService, executor: Executor | None = None) -> None:
+        """Initialize a RollService object."""
+        self.executor: Executor | None = executor
+
+    async def roll_expression(
+        self: RollService,
+        expression: str,
+        verbose: bool = False,
+        roll_option: RollOption = RollOption.Normal,
+    ) -> dict[str, Any]:
+        """Roll a single expression and return its record."""
+        try:
+            result = await roll_async(
+                expression, verbose, roll_option, executor=self.executor
+            )
+        except Exception as err:
+            return {"expression": expression, "error": str(err)}
+
+        return result_record(expression, result, verbose)
+
+    async def handle(self: RollService, request: Any) -> dict[str, Any]:
+        """Answer a single request."""
+        if not isinstance(request, dict):
+            return {"id": None, "error": "Requests must be JSON objects."}
+
+        reply: dict[str, Any] = {"id": request.get("id")}
+
+        if "metrics" in request:
+            reply.update(_metrics_reply(request["metrics"]))
+            return reply
+
+        problem: str | None = _request_problem(request)
+
+        if problem is not None:
+            reply["error"] = problem
+            return reply
+
+        verbose: bool = request.get("verbose", False)
+        roll_option: RollOption = RollOption[request.get("roll_option") or "Normal"]
+
+        if "batch" in request:
+            reply["results"] = await asyncio.gather(
+                *(
+                    self.roll_expression(expression, verbose, roll_option)
+                    for expression in request["batch"]
+                )
+            )
+            return reply
+
+        reply.update(
+            await self.roll_expression(
+                request.get("expression", ""), verbose, roll_option
+            )
+        )
+        return reply
+
+    async def handle_line(self: RollService, line: bytes) -> dict[str, Any]:
+        """Answer a single line sent to the server.
+
+        Nothing that goes wrong while answering is let out, since the
+        client is always owed a reply.
+        """
+        try:
+            request: Any = json.loads(line)
+        except ValueError as err:
+            return {"id": None, "error": f"Invalid request: {err}"}
+
+        try:
+            return await self.handle(request)
+        except Exception as err:
+            request_id: Any = request.get("id") if isinstance(request, dict) else None
+            return {"id": request_id, "error": f"Unable to answer the request: {err}"}
+
+    async def serve_connection(  # noqa: max-complexity: 11
+        self: RollService,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        """Answer every request sent over a single connection."""
+        pending: asyncio.Semaphore = asyncio.Semaphore(MAX_PENDING)
+        write_lock: asyncio.Lock = asyncio.Lock()
+        tasks: set[asyncio.Task[None]] = set()
+
+        async def send(reply: dict[str, Any]) -> None:
+            async with write_lock:
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+
+        async def answer(line: bytes) -> None:
+            try:
+                await send(await self.handle_line(line))
+            finally:
+                pending.release()
+
+        try:
+            while True:
+                # Stop reading once too many requests are waiting on replies.
+                await pending.acquire()
+
+                try:
+                    line: bytes = await reader.readline()
+                except ValueError as err:
+                    # The line went over the limit of the stream.
+                    await send({"id": None, "error": f"Invalid request: {err}"})
+                    break
+
+                if not line:
+                    break
+
+                task = asyncio.create_task(answer(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+            if tasks:
+                await asyncio.wait(tasks)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+def _request_problem(request: dict[str, Any]) -> str | None:
+    """Return what is wrong with the fields of a roll request, if anything."""
+    if "batch" in request and not (
+        isinstance(request["batch"], list)
+        and all(isinstance(expression, str) for expression in request["batch"])
+    ):
+        return "The batch must be a list of expressions."
+
+    if not isinstance(request.get("expression", ""), str):
+        return "The expression must be a string."
+
+    if not isinstance(request.get("verbose", False), bool):
+        return "Verbose must be true or false."
+
+    roll_option: Any = request.get("roll_option")
+
+    if roll_option and not (
+        isinstance(roll_option, str) and roll_option in RollOption.__members__
+    ):
+        return f"Unknown roll option: {roll_option}"
+
+    return None
+
+
+def _metrics_reply(metrics_format: Any) -> dict[str, Any]:
+    """Return the parser's metrics in the format that was asked for."""
+    metrics: MetricsRegistry | None = active_metrics()
+
+    if metrics is None:
+        return {"error": "Metrics are not enabled."}
+
+    if metrics_format == "prometheus":
+        return {"metrics": metrics.to_prometheus()}
+
+    return {"metrics": metrics.as_dict()}
+
+
+async def start_server(
+    host: str = "127.0.0.1",
+    port: int = 0,
+    executor: Executor | None = None,
+) -> asyncio.AbstractServer:
+    """Start serving roll requests on the host and port.
+
+    A port of 0 picks any free port, which can be found afterwards from
+    the sockets of the returned server.
+    """
+    service: RollService = RollService(executor)
+
+    return await asyncio.start_server(service.serve_connection, host, port)
+
+
+async def serve(host: str = "127.0.0.1", port: int = 8080) -> None:
+    """Serve roll requests on the host and port forever, with metrics."""
+    enable_metrics()
+    server: asyncio.AbstractServer = await start_server(host, port)
+
+    async with server:
+        await server.serve_forever()
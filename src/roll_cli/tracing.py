@@ -0,0 +1,191 @@
+"""Write traces of every roll to a local JSON Lines file.
+
+This is an example of building on the parser's hooks (see
+roll_cli.parser.hooks). Every evaluation becomes a trace made up of an
+"evaluate" span covering the whole evaluation, with a "parse" span (the
+first time that an expression is seen) and an "operation" span for
+every operator beneath it. The dice that were rolled and the keeps and
+drops applied to them are recorded as events on the evaluate span.
+
+Each span is written as a single JSON object on its own line:
+
+    {"trace_id": "...", "span_id": "...", "parent_id": "...",
+     "name": "operation", "start": 1700000000.123, "duration": 0.000004,
+     "attributes": {"operator": "K"}, "events": []}
+
+Usage:
+    with JsonSpanExporter("rolls.jsonl"):
+        roll("4d6K3")
+"""
+from __future__ import annotations
+
+import json
+import secrets
+import threading
+from time import time
+from typing import Any
+from typing import Callable
+from typing import TextIO
+
+from .formats import result_record
+from .parser import hooks
+from .parser.types import RollResults
+
+# Number of rolls recorded for each group of dice, so huge pools stay small.
+MAX_EVENT_ROLLS: int = 100
+
+
+def _span_id() -> str:
+    return secrets.token_hex(8)
+
+
+class JsonSpanExporter:
+    """Write a trace for every evaluation to a JSON Lines file.
+
+    path: File that spans are appended to
+    """
+
+    def __init__(self: JsonSpanExporter, path: str) -> None:
+        """Initialize an exporter, opening the file it writes to."""
+        self.path: str = path
+        self._file: TextIO = open(path, "a", encoding="utf-8")
+        self._lock: threading.Lock = threading.Lock()
+        self._pending: threading.local = threading.local()
+        self._handlers: dict[str, Callable[..., Any]] = {
+            "on_parse_end": self._on_parse_end,
+            "on_dice_rolled": self._on_dice_rolled,
+            "on_keep": self._on_keep,
+            "on_drop": self._on_drop,
+            "on_operation": self._on_operation,
+            "on_evaluate_end": self._on_evaluate_end,
+        }
+
+    def install(self: JsonSpanExporter) -> None:
+        """Start tracing every evaluation."""
+        for event, handler in self._handlers.items():
+            hooks.register(event, handler)
+
+    def uninstall(self: JsonSpanExporter) -> None:
+        """Stop tracing evaluations."""
+        for event, handler in self._handlers.items():
+            hooks.unregister(event, handler)
+
+    def close(self: JsonSpanExporter) -> None:
+        """Stop tracing and close the file."""
+        self.uninstall()
+        self._file.close()
+
+    def __enter__(self: JsonSpanExporter) -> JsonSpanExporter:
+        """Start tracing for the duration of a with statement."""
+        self.install()
+        return self
+
+    def __exit__(self: JsonSpanExporter, *args: object) -> None:
+        """Stop tracing and close the file at the end of a with statement."""
+        self.close()
+
+    def _spans(self: JsonSpanExporter) -> list[dict[str, Any]]:
+        """Return the spans of the evaluation running in this thread."""
+        if not hasattr(self._pending, "spans"):
+            self._pending.spans = []
+            self._pending.events = []
+
+        spans: list[dict[str, Any]] = self._pending.spans
+        return spans
+
+    def _events(self: JsonSpanExporter) -> list[dict[str, Any]]:
+        """Return the events of the evaluation running in this thread."""
+        self._spans()
+
+        events: list[dict[str, Any]] = self._pending.events
+        return events
+
+    def _add_span(
+        self: JsonSpanExporter,
+        name: str,
+        seconds: float,
+        attributes: dict[str, Any],
+    ) -> None:
+        self._spans().append(
+            {
+                "span_id": _span_id(),
+                "name": name,
+                "start": time() - seconds,
+                "duration": seconds,
+                "attributes": attributes,
+                "events": [],
+            }
+        )
+
+    def _add_event(
+        self: JsonSpanExporter, name: str, roll: RollResults, **attributes: Any
+    ) -> None:
+        attributes["dice"] = roll.dice
+        attributes["count"] = len(roll.rolls)
+        attributes["rolls"] = roll.rolls[:MAX_EVENT_ROLLS]
+        self._events().append({"name": name, "time": time(), **attributes})
+
+    def _on_parse_end(self: JsonSpanExporter, dice_string: str, seconds: float) -> None:
+        self._add_span("parse", seconds, {"expression": dice_string})
+
+    def _on_dice_rolled(self: JsonSpanExporter, roll: RollResults) -> None:
+        self._add_event("dice_rolled", roll)
+
+    def _on_keep(
+        self: JsonSpanExporter, operator: str, amount: Any, roll: RollResults
+    ) -> None:
+        self._add_event("keep", roll, operator=operator, amount=amount)
+
+    def _on_drop(
+        self: JsonSpanExporter, operator: str, amount: Any, roll: RollResults
+    ) -> None:
+        self._add_event("drop", roll, operator=operator, amount=amount)
+
+    def _on_operation(
+        self: JsonSpanExporter,
+        operator: str,
+        operands: list[Any],
+        result: Any,
+        seconds: float,
+    ) -> None:
+        self._add_span("operation", seconds, {"operator": operator})
+
+    def _on_evaluate_end(
+        self: JsonSpanExporter,
+        dice_string: str,
+        results: list[Any] | None,
+        error: Exception | None,
+        seconds: float,
+    ) -> None:
+        attributes: dict[str, Any] = {"expression": dice_string}
+
+        if error is not None:
+            attributes["error"] = f"{type(error).__name__}: {error}"
+        else:
+            attributes["totals"] = [
+                result_record(dice_string, result)["total"] for result in results or []
+            ]
+
+        root: dict[str, Any] = {
+            "span_id": _span_id(),
+            "name": "evaluate",
+            "start": time() - seconds,
+            "duration": seconds,
+            "attributes": attributes,
+            "events": self._events(),
+        }
+        spans: list[dict[str, Any]] = [root, *self._spans()]
+        trace_id: str = secrets.token_hex(16)
+
+        for span in spans:
+            span["trace_id"] = trace_id
+            span["parent_id"] = None if span is root else root["span_id"]
+
+        self._pending.spans = []
+        self._pending.events = []
+
+        lines: str = "".join(json.dumps(span, default=str) + "\n" for span in spans)
+
+        with self._lock:
+            self._file.write(lines)
+            self._file.flush()
@@ -0,0 +1,180 @@
+"""Test the async roll API."""
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from typing import List
+from typing import Tuple
+
+import pytest
+
+import roll_cli
+from roll_cli.aio import is_heavy
+from roll_cli.aio import roll_async
+from roll_cli.aio import roll_many_async
+from roll_cli.parser.metrics import disable_metrics
+from roll_cli.parser.metrics import enable_metrics
+from roll_cli.parser.types import EvaluationResults
+from roll_cli.parser.types import RollOption
+from roll_cli.roll import estimate_cost
+
+
+@pytest.mark.parametrize(
+    "expression,heavy",
+    [
+        ("1d20 + 5", False),
+        ("4d6K3", False),
+        ("10000d6", False),
+        ("10001d6", True),
+        ("2000000d100K50", True),
+        ("99999!", True),
+    ],
+)
+def test_is_heavy(expression: str, heavy: bool) -> None:
+    """Test which expressions are rolled off of the event loop."""
+    assert is_heavy(estimate_cost(expression)) is heavy
+
+
+def test_roll_async() -> None:
+    """Test that small and large expressions are both rolled."""
+
+    async def run() -> Tuple[Any, ...]:
+        return (
+            await roll_async("2d6 + 3", roll_option=RollOption.Maximum),
+            await roll_async("20000d6", roll_option=RollOption.Minimum),
+            await roll_async("3d6", verbose=True),
+        )
+
+    small, large, verbose = asyncio.run(run())
+
+    assert small == 15
+    assert large == 20000
+    assert isinstance(verbose, EvaluationResults)
+
+
+def test_small_expressions_are_rolled_inline() -> None:
+    """Test that small expressions never leave the event loop's thread."""
+    threads: List[int] = []
+
+    class RecordingExecutor(ThreadPoolExecutor):
+        def submit(self, *args, **kwargs):  # type: ignore[no-untyped-def]
+            threads.append(threading.get_ident())
+            return super().submit(*args, **kwargs)
+
+    async def run() -> None:
+        with RecordingExecutor() as executor:
+            await roll_async("1d20", executor=executor)
+            assert threads == []
+            await roll_async("20000d6", executor=executor)
+            assert len(threads) == 1
+
+    asyncio.run(run())
+
+
+def test_expressions_are_parsed_once() -> None:
+    """Test that estimating the cost first does not parse the expression again.
+
+    Each roll counts as one hit or miss, although its cost is estimated
+    before it is rolled.
+    """
+    registry = enable_metrics()
+
+    try:
+        for expression in ("3d7 + 2", "3d7 + 3", "3d7 + 2"):
+            asyncio.run(roll_async(expression))
+    finally:
+        disable_metrics()
+
+    assert registry.counters["parse_cache_misses"] == 2
+    assert registry.counters["parse_cache_hits"] == 1
+    assert registry.parse_seconds.count == 2
+
+
+def test_executor_threads_see_metrics() -> None:
+    """Test that heavy rolls in a thread still count towards the metrics."""
+    registry = enable_metrics()
+
+    try:
+        with ThreadPoolExecutor(1) as executor:
+            asyncio.run(roll_async("20000d6", executor=executor))
+    finally:
+        disable_metrics()
+
+    assert registry.counters["dice_drawn"] == 20000
+
+
+def test_process_executor() -> None:
+    """Test that heavy expressions can be rolled in worker processes."""
+
+    async def run() -> List[Any]:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            return await roll_many_async(
+                ["20000d6", "1d6"], roll_option=RollOption.Maximum, executor=executor
+            )
+
+    assert asyncio.run(run()) == [120000, 6]
+
+
+def test_roll_many_async() -> None:
+    """Test that results come back in order and errors are raised."""
+    expressions = ["1", "20000d1", "2 + 3", "4d1K3"]
+
+    assert asyncio.run(roll_many_async(expressions)) == [1, 20000, 5, 3]
+
+    with pytest.raises(ZeroDivisionError):
+        asyncio.run(roll_many_async(["1", "1/0"]))
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize(
+    "executor_type,acceptable_gap",
+    [
+        # Threads share the GIL, and sorting the pool for the keep holds
+        # it the whole time, so the loop does stall for a moment then.
+        (ThreadPoolExecutor, 0.5),
+        (ProcessPoolExecutor, 0.05),
+    ],
+)
+def test_event_loop_keeps_serving(executor_type: type, acceptable_gap: float) -> None:
+    """Test that the event loop keeps running while a large pool is rolled."""
+
+    async def tick(stop: asyncio.Event, ticks: List[float]) -> None:
+        loop = asyncio.get_running_loop()
+
+        while not stop.is_set():
+            ticks.append(loop.time())
+            await asyncio.sleep(0.001)
+
+    async def run() -> List[float]:
+        with executor_type(max_workers=1) as executor:
+            # Start the worker ahead of time so that it is not timed.
+            await roll_async("20000d1", executor=executor)
+
+            stop = asyncio.Event()
+            ticks: List[float] = []
+            ticker = asyncio.create_task(tick(stop, ticks))
+            await asyncio.sleep(0)
+
+            await roll_async("2000000d100K50", executor=executor)
+            stop.set()
+            await ticker
+
+        return ticks
+
+    ticks = asyncio.run(run())
+    gaps = [later - earlier for earlier, later in zip(ticks, ticks[1:])]
+
+    # The roll takes over a second, so a blocked loop would only get a
+    # couple of ticks in, with one huge gap between them.
+    assert len(ticks) > 20
+    assert max(gaps) < acceptable_gap
+
+
+def test_package_exports() -> None:
+    """Test that the async API can be used from the package itself."""
+    assert roll_cli.roll_async is roll_async
+    assert roll_cli.roll_many_async is roll_many_async
+
+    with pytest.raises(AttributeError):
+        roll_cli.roll_sync  # noqa: B018
@@ -0,0 +1,82 @@
+"""Test rolling many expressions in one process."""
+from io import BytesIO
+from typing import Any
+from typing import Iterator
+
+import pytest
+
+from roll_cli import batch
+from roll_cli.batch import CHUNKS_PER_JOB
+from roll_cli.batch import roll_line
+from roll_cli.batch import roll_lines
+from roll_cli.batch import roll_lines_parallel
+from roll_cli.batch import write_batch
+from roll_cli.formats import TextWriter
+from roll_cli.parser.types import RollOption
+
+
+def test_roll_line() -> None:
+    """Test that lines are stripped and errors are returned, not raised."""
+    assert roll_line(" 4d6 \n", roll_option=RollOption.Maximum) == (True, 24)
+    assert roll_line("1d6 + hello") == (False, "Input contained invalid characters.")
+
+
+def test_write_batch() -> None:
+    """Test that there is exactly one output line for every non-blank line."""
+    output = BytesIO()
+    errors = write_batch(["1", "2+", "3"], TextWriter(output))
+
+    assert errors == 1
+    assert output.getvalue().splitlines()[::2] == [b"1", b"3"]
+
+
+def test_blank_lines_skipped() -> None:
+    """Test that blank lines are skipped instead of rolled as 1d20."""
+    lines = ["1", "", "  \n", "2\n", "\n"]
+
+    assert [result for _, _, result in roll_lines(lines)] == [1, 2]
+    assert [result for _, _, result in roll_lines_parallel(lines, jobs=2)] == [1, 2]
+
+
+def test_blank_lines_have_no_output() -> None:
+    """Test that text output lines up with the non-blank input lines."""
+    lines = ["1", "", "2+", "   ", "3"]
+    output = BytesIO()
+
+    write_batch(lines, TextWriter(output))
+    written = output.getvalue().splitlines()
+
+    assert len(written) == 3
+    assert written[0] == b"1"
+    assert written[1].startswith(b"error: ")
+    assert written[2] == b"3"
+
+
+def test_unexpected_errors_stop_the_batch(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that only errors from bad expressions are reported per line."""
+
+    def fail(*args: Any) -> None:
+        raise MemoryError
+
+    monkeypatch.setattr(batch, "roll", fail)
+
+    with pytest.raises(MemoryError):
+        roll_line("1d6")
+
+
+def test_parallel_backpressure() -> None:
+    """Test that the input is only read a bounded amount ahead."""
+    read = 0
+
+    def lines() -> Iterator[str]:
+        nonlocal read
+
+        for _ in range(100000):
+            read += 1
+            yield "1"
+
+    results = roll_lines_parallel(lines(), jobs=2, chunk_size=100)
+    next(results)
+
+    assert read <= 2 * CHUNKS_PER_JOB * 100 + 1
+    assert [result for _, _, result in results] == [1] * (100000 - 1)
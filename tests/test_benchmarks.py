@@ -0,0 +1,295 @@
+"""Test the benchmark runner and its stored results."""
+from pathlib import Path
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import pytest
+
+from benchmarks import memory
+from benchmarks import pathological
+from benchmarks import results
+from benchmarks import startup
+from benchmarks import throughput
+from roll_cli.parser import DiceParser
+from roll_cli.parser.types import EvaluationResults
+
+
+def test_save_and_load(tmp_path: Path) -> None:
+    """Test that results are stored keyed by commit, latest last."""
+    path = tmp_path / "results" / "throughput.json"
+
+    assert results.load(path) == {}
+
+    results.save(path, "aaa", {"dice": 1.0})
+    results.save(path, "bbb", {"dice": 2.0})
+    results.save(path, "aaa", {"dice": 3.0})
+
+    stored = results.load(path)
+    assert list(stored) == ["bbb", "aaa"]
+    assert stored["aaa"]["results"] == {"dice": 3.0}
+    assert "python" in stored["aaa"]
+
+
+def test_baseline() -> None:
+    """Test that the latest other commit is used unless one is given."""
+    stored = {
+        "aaa111": {"results": {"dice": 1.0}},
+        "bbb222": {"results": {"dice": 2.0}},
+        "ccc333": {"results": {"dice": 3.0}},
+    }
+
+    assert results.baseline(stored, "ccc333") == ("bbb222", {"dice": 2.0})
+    assert results.baseline(stored, "ddd444") == ("ccc333", {"dice": 3.0})
+    assert results.baseline(stored, "ddd444", "aaa") == ("aaa111", {"dice": 1.0})
+    assert results.baseline({}, "aaa111") is None
+
+    with pytest.raises(KeyError):
+        results.baseline(stored, "ddd444", "eee")
+
+
+@pytest.mark.parametrize(
+    "current,higher_is_better,expected",
+    [
+        ({"a": 100.0, "b": 85.0}, True, {}),
+        ({"a": 79.0, "b": 100.0}, True, {"a": pytest.approx(0.21)}),
+        ({"a": 130.0, "b": 100.0}, False, {"a": pytest.approx(0.3)}),
+        ({"new": 1.0}, True, {}),
+    ],
+)
+def test_regressions(
+    current: Dict[str, float], higher_is_better: bool, expected: Dict[str, float]
+) -> None:
+    """Test that only changes for the worse beyond the tolerance count."""
+    previous = {"a": 100.0, "b": 100.0}
+
+    assert results.regressions(current, previous, 0.2, higher_is_better) == expected
+
+
+def test_noise_floor() -> None:
+    """Test that changes between tiny values are not counted."""
+    assert results.regressions({"a": 0.5}, {"a": 0.1}, 0.2, False, 1.0) == {}
+    assert results.regressions({"a": 5.0}, {"a": 0.1}, 0.2, False, 1.0) == {
+        "a": pytest.approx(49)
+    }
+
+
+def test_record_and_compare(
+    tmp_path: Path,
+    capsys: pytest.CaptureFixture[str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that regressions and missing baselines fail the run."""
+    path = tmp_path / "throughput.json"
+    monkeypatch.setattr(results, "current_commit", lambda: "first")
+
+    assert not results.record_and_compare(path, {"dice": 100.0}, "rolls/s")
+    assert "NO BASELINE" in capsys.readouterr().out
+    assert not path.exists()
+
+    assert not results.record_and_compare(path, {"dice": 100.0}, "rolls/s", store=True)
+
+    monkeypatch.setattr(results, "current_commit", lambda: "second")
+
+    assert not results.record_and_compare(path, {"dice": 50.0}, "rolls/s")
+    assert "REGRESSION: dice is 50.0% worse" in capsys.readouterr().out
+    assert results.record_and_compare(path, {"dice": 50.0}, "rolls/s", 0.6, "first")
+    assert list(results.load(path)) == ["first"]
+
+
+def test_dirty_results_are_not_stored(
+    tmp_path: Path,
+    capsys: pytest.CaptureFixture[str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that baselines are only stored for commits that can be checked out."""
+    path = tmp_path / "throughput.json"
+    monkeypatch.setattr(results, "current_commit", lambda: "first-dirty")
+
+    results.record_and_compare(path, {"dice": 100.0}, "rolls/s", store=True)
+
+    assert "NOT STORED" in capsys.readouterr().out
+    assert not path.exists()
+
+
+def test_throughput() -> None:
+    """Test that every benchmark runs and measures something."""
+    measured = throughput.run(number=1, repeat=1)
+
+    assert set(measured) == set(throughput.BENCHMARKS)
+    assert all(value > 0 for value in measured.values())
+
+
+def test_memory_measure() -> None:
+    """Test that memory use grows with the pool and nothing is retained."""
+    small_peak, small_retained = memory.measure("1000d6")
+    large_peak, large_retained = memory.measure("100000d6")
+
+    assert 0 < small_peak < large_peak
+    assert large_peak / 100_000 < 100
+    assert large_retained < 1000
+
+    verbose_peak, _ = memory.measure("1000d6", verbose=True)
+    assert verbose_peak > small_peak
+
+
+def test_memory_benchmarks() -> None:
+    """Test that every pool size is covered, and units are counted right."""
+    for size in memory.POOL_SIZES:
+        assert memory.BENCHMARKS[f"pool_{size}"] == (f"{size}d6", False, size)
+
+    expression, _, units = memory.BENCHMARKS["math_chain"]
+    assert expression.count("*") + expression.count("+") + 1 == units
+
+
+@pytest.mark.parametrize("family", sorted(pathological.FAMILIES))
+def test_pathological_families(family: str) -> None:
+    """Test that every family generates valid expressions that grow."""
+    generate = pathological.FAMILIES[family]
+
+    pathological.TARGETS["evaluate"](generate(10))
+    pathological.TARGETS["grammar"](generate(2))
+
+    assert len(generate(20)) > len(generate(10))
+
+
+@pytest.mark.parametrize(
+    "timings,exponent",
+    [
+        ([(100, 0.01), (200, 0.02), (400, 0.04)], 1.0),
+        ([(100, 0.01), (200, 0.04), (400, 0.16)], 2.0),
+        ([(100, 0.0001), (200, 0.01), (400, 0.02)], 1.0),
+        ([(100, 0.0001), (200, 0.0002)], None),
+        ([], None),
+    ],
+)
+def test_growth_exponent(
+    timings: List[Tuple[int, float]], exponent: Optional[float]
+) -> None:
+    """Test that growth is estimated from the timings that are long enough."""
+    if exponent is None:
+        assert pathological.growth_exponent(timings) is None
+    else:
+        assert pathological.growth_exponent(timings) == pytest.approx(exponent)
+
+
+def test_pathological_flags_super_linear() -> None:
+    """Test that only families growing faster than allowed are flagged."""
+    linear = pathological.FamilyResult("linear")
+    linear.timings = [(100, 0.01), (200, 0.021)]
+    quadratic = pathological.FamilyResult("quadratic")
+    quadratic.timings = [(100, 0.01), (200, 0.04)]
+
+    assert not linear.super_linear(1.3)
+    assert quadratic.super_linear(1.3)
+
+    lines = pathological.report([linear, quadratic], 1.3).splitlines()
+    assert lines[0] == "linear (exponent 1.07)"
+    assert lines[3] == "quadratic (exponent 2.00)  SUPER-LINEAR"
+
+
+def test_pathological_run_family() -> None:
+    """Test that a family is timed at every size until it fails."""
+    result = pathological.run_family(
+        "deep_parens", pathological.TARGETS["evaluate"], (5, 10), repeat=1
+    )
+
+    assert [size for size, _ in result.timings] == [5, 10]
+    assert result.error is None
+
+    result = pathological.run_family(
+        "deep_parens", pathological.TARGETS["grammar"], (2, 10), repeat=1
+    )
+
+    assert [size for size, _ in result.timings] == [2]
+    assert result.error is not None
+    assert result.error.startswith("size 10: RecursionError")
+
+
+def test_evaluation_is_linear_in_chain_length() -> None:
+    """Test that a long chain of operators does not copy its history."""
+    parser = DiceParser()
+    result = parser.evaluate(pathological.dice_chain(2000))
+    assert isinstance(result, EvaluationResults)
+    history = result.history
+
+    assert len(result.rolls) == 1999
+    assert history[0] == "Rolled: 1d2: " + str(result.rolls[0].rolls)
+
+    result = parser.evaluate(pathological.sum_chain(2000))
+    assert isinstance(result, EvaluationResults)
+    assert len(result.rolls) == 2000
+
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     roll_cli.parser.hooks
+import time:       300 |        420 |   roll_cli.parser
+import time:      1000 |       1420 | roll_cli
+import time:       500 |        500 | json
+import time:       400 |        400 | click
+"""
+
+
+def test_parse_importtime() -> None:
+    """Test that the importtime output is read into a tree of modules."""
+    imports = startup.parse_importtime(IMPORTTIME)
+
+    assert [(entry.module, entry.depth) for entry in imports] == [
+        ("roll_cli.parser.hooks", 2),
+        ("roll_cli.parser", 1),
+        ("roll_cli", 0),
+        ("json", 0),
+        ("click", 0),
+    ]
+    assert imports[2].self_us == 1000
+    assert imports[2].cumulative_us == 1420
+
+
+def test_import_tree() -> None:
+    """Test that only the watched packages are shown, missing ones too."""
+    tree = startup.import_tree(
+        startup.parse_importtime(IMPORTTIME), ("roll_cli", "pyparsing")
+    ).splitlines()
+
+    assert len(tree) == 5
+    assert tree[1].endswith("0.1        0.1      roll_cli.parser.hooks")
+    assert tree[3].endswith("1.4        1.0  roll_cli")
+    assert tree[4].endswith("pyparsing (not imported)")
+
+
+def test_percentile() -> None:
+    """Test the nearest rank percentiles used for p95."""
+    values = [float(value) for value in range(1, 21)]
+
+    assert startup.percentile(values, 0.95) == 19.0
+    assert startup.percentile(values, 0.5) == 10.0
+    assert startup.percentile([3.0], 0.95) == 3.0
+
+
+def test_over_budget() -> None:
+    """Test that only commands with a median over the budget fail."""
+    measured = {
+        "roll_1d20.median": 90.0,
+        "roll_1d20.p95": 200.0,
+        "help.median": 160.0,
+        "help.p95": 170.0,
+    }
+
+    assert startup.over_budget(measured, 150.0) == ["help"]
+    assert startup.over_budget(measured, 200.0) == []
+
+
+def test_startup_commands() -> None:
+    """Test that the commands start, and that the parser is not imported."""
+    for command in startup.COMMANDS.values():
+        assert len(startup.time_command(command, 1)) == 1
+
+    modules = [
+        entry.module for entry in startup.import_times(startup.COMMANDS["roll_1d20"])
+    ]
+
+    assert "roll_cli" in modules
+    assert "click" in modules
+    assert "pyparsing" not in modules
@@ -0,0 +1,83 @@
+"""Test that evaluation budgets stop evaluations part of the way through."""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from roll_cli import roll
+from roll_cli.parser import BudgetExceededError
+from roll_cli.parser import EvaluationBudget
+from roll_cli.parser.operations import BUDGET_CHUNK_SIZE
+from roll_cli.parser.types import RollOption
+
+
+def test_dice_budget() -> None:
+    """Test that we stop drawing dice once we are out of dice."""
+    with pytest.raises(BudgetExceededError) as err:
+        roll("100000d6", budget=EvaluationBudget(max_dice=10000))
+
+    assert err.value.reason == "dice"
+    assert err.value.dice_drawn <= 10000
+    assert len(err.value.partial_rolls) == err.value.dice_drawn
+    assert all(1 <= r <= 6 for r in err.value.partial_rolls)
+
+
+def test_dice_budget_nested() -> None:
+    """Test that dice drawn for dice counts are charged too."""
+    with pytest.raises(BudgetExceededError):
+        roll("(100d100)d(100d100)", budget=EvaluationBudget(max_dice=300))
+
+
+def test_dice_budget_roll_option() -> None:
+    """Test that minimum and maximum rolls are charged as well."""
+    with pytest.raises(BudgetExceededError):
+        roll(
+            "10000000d6",
+            roll_option=RollOption.Maximum,
+            budget=EvaluationBudget(max_dice=100),
+        )
+
+
+def test_time_budget() -> None:
+    """Test that we stop once we have run out of time."""
+    with pytest.raises(BudgetExceededError) as err:
+        roll("10000000d6", budget=EvaluationBudget(max_seconds=0.01))
+
+    assert err.value.reason == "time"
+    assert err.value.dice_drawn < 10000000
+    assert err.value.dice_drawn % BUDGET_CHUNK_SIZE == 0
+
+
+@pytest.mark.parametrize(
+    "equation",
+    [
+        ("100000!"),
+        ("10^100000000"),
+        ("(2d6)^100000000"),
+    ],
+)
+def test_bits_budget(equation: str) -> None:
+    """Test that huge numbers are refused before they are computed."""
+    with pytest.raises(BudgetExceededError) as err:
+        roll(equation, budget=EvaluationBudget(max_bits=4096))
+
+    assert err.value.reason == "bits"
+
+
+def test_within_budget() -> None:
+    """Test that evaluations inside of the budget are unaffected."""
+    budget = EvaluationBudget(max_seconds=10, max_dice=10000, max_bits=4096)
+
+    assert roll("10000d1 + 5! + 2^10", budget=budget) == 10000 + 120 + 1024
+    assert budget.dice_drawn == 10000
+
+
+def test_budget_is_per_thread() -> None:
+    """Test that a budget in one thread does not leak into another."""
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        limited = pool.submit(roll, "100000d6", budget=EvaluationBudget(max_dice=1))
+        unlimited = pool.submit(roll, "100000d1")
+
+        assert unlimited.result() == 100000
+
+        with pytest.raises(BudgetExceededError):
+            limited.result()
@@ -0,0 +1,72 @@
+"""Test the static cost model and admission limits."""
+from math import factorial
+
+import pytest
+
+from roll_cli import estimate_cost
+from roll_cli import roll
+from roll_cli.parser import CostLimits
+from roll_cli.parser import ExpressionTooCostlyError
+
+
+@pytest.mark.parametrize(
+    "equation,dice",
+    [
+        ("1d20", 1),
+        ("d20", 1),
+        ("d%", 1),
+        ("3d%", 3),
+        ("4d6K3", 4),
+        ("2.5d300", 3),
+        ("1d4 + 2d6 + 3d8", 6),
+        ("(2d2)d6", 6),
+        ("1 + 2 * 3", 0),
+    ],
+)
+def test_estimate_dice(equation: str, dice: int) -> None:
+    """Test that we count the dice that will be drawn."""
+    assert estimate_cost(equation).dice == dice
+
+
+@pytest.mark.parametrize(
+    "equation",
+    [
+        ("1000000000d6"),
+        ("99999!"),
+        ("10^10^10"),
+        ("(1000d1000)d6"),
+    ],
+)
+def test_costly_expressions_rejected(equation: str) -> None:
+    """Test that costly expressions are rejected before being evaluated."""
+    with pytest.raises(ExpressionTooCostlyError) as err:
+        roll(equation, limits=CostLimits())
+
+    assert err.value.violations
+
+
+@pytest.mark.parametrize(
+    "equation",
+    [
+        ("1d20"),
+        ("4d6K3 + 2"),
+        ("10!"),
+        ("2^64"),
+        ("(2d6)d(2d6)"),
+    ],
+)
+def test_cheap_expressions_allowed(equation: str) -> None:
+    """Test that everyday expressions are still evaluated with limits on."""
+    roll(equation, limits=CostLimits())
+
+
+def test_limits_can_be_disabled() -> None:
+    """Test that a limit of None turns that check off."""
+    limits = CostLimits(max_dice=None, max_memory=None)
+
+    assert limits.violations(estimate_cost("1000000000d6")) == []
+
+
+def test_factorial_bits() -> None:
+    """Test that the factorial estimate is close to the real size."""
+    assert estimate_cost("100!").max_bits >= factorial(100).bit_length() - 1
@@ -0,0 +1,289 @@
+"""Test the background roll daemon and its client."""
+import json
+import os
+import socket
+import stat
+import statistics
+import tempfile
+import threading
+import time
+from typing import Any
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+
+import pytest
+from click.testing import CliRunner
+
+from roll_cli import __main__
+from roll_cli import daemon
+from roll_cli.daemon import default_socket_path
+from roll_cli.daemon import handle_request
+from roll_cli.daemon import RollClient
+from roll_cli.daemon import RollServer
+from roll_cli.parser.metrics import disable_metrics
+from roll_cli.parser.metrics import enable_metrics
+from roll_cli.parser.types import RollOption
+
+pytestmark = pytest.mark.skipif(
+    not hasattr(socket, "AF_UNIX"), reason="Unix domain sockets are not available."
+)
+
+# Acceptable time for a single roll through the daemon, in seconds.
+ACCEPTABLE_ROUND_TRIP = 0.005
+
+
+@pytest.fixture
+def socket_path() -> Iterator[str]:
+    """Fixture for a running daemon, giving the path to its socket."""
+    # Socket paths are limited to around 100 characters, so keep it short.
+    directory = tempfile.mkdtemp(prefix="roll")
+    path = os.path.join(directory, "roll.sock")
+    server = RollServer(path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield path
+
+    server.shutdown()
+    server.server_close()
+    os.rmdir(directory)
+
+
+@pytest.mark.parametrize(
+    "request_,reply",
+    [
+        ({"expression": "2d6", "roll_option": "Maximum"}, {"output": "12"}),
+        ({"expression": "1/0"}, {"error": "division by zero"}),
+        ({"expression": "1+1", "verbose": True}, {"output": "Adding: 1 + 1 = 2\n2"}),
+    ],
+)
+def test_handle_request(request_: Dict[str, Any], reply: Dict[str, Any]) -> None:
+    """Test that requests are rolled and errors are sent back."""
+    assert handle_request(request_) == reply
+
+
+def test_client(socket_path: str) -> None:
+    """Test that many rolls can be sent over a single connection."""
+    with RollClient(socket_path) as client:
+        assert client.roll("4d6", roll_option=RollOption.Minimum) == "4"
+        assert client.roll("5!") == "120"
+
+        with pytest.raises(ValueError, match="invalid characters"):
+            client.roll("hello")
+
+        assert client.roll("1+1") == "2"
+
+
+def test_requests_must_be_objects(socket_path: str) -> None:
+    """Test that every line that is not a JSON object still gets a reply."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(socket_path)
+        connection.sendall(b'[1, 2]\n"x"\n3\n{"expression": "1+1"}\n')
+        reader = connection.makefile("rb")
+        replies = [json.loads(reader.readline()) for _ in range(4)]
+
+    error = {"error": "Invalid request: requests must be JSON objects."}
+    assert replies == [error, error, error, {"output": "2"}]
+
+
+def test_daemon_threads_see_metrics() -> None:
+    """Test that connections are handled with the metrics of the daemon."""
+    directory = tempfile.mkdtemp(prefix="roll")
+    path = os.path.join(directory, "roll.sock")
+    registry = enable_metrics()
+    server = RollServer(path)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+
+    try:
+        with RollClient(path) as client:
+            client.roll("3d6")
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+        os.rmdir(directory)
+        disable_metrics()
+
+    assert registry.counters["dice_drawn"] == 3
+
+
+def test_cli_uses_daemon(socket_path: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the command rolls through the daemon when opted in to."""
+    monkeypatch.setenv("ROLL_CLI_DAEMON", "1")
+    runner = CliRunner()
+    result = runner.invoke(__main__.main, ["--socket", socket_path, "-M", "3d8"])
+
+    assert result.exit_code == 0
+    assert result.output == "24\n"
+
+
+@pytest.mark.parametrize("setting", [None, "", "0"])
+def test_cli_daemon_is_opt_in(
+    monkeypatch: pytest.MonkeyPatch, setting: Optional[str]
+) -> None:
+    """Test that the daemon is not used unless it is asked for."""
+    if setting is None:
+        monkeypatch.delenv("ROLL_CLI_DAEMON", raising=False)
+    else:
+        monkeypatch.setenv("ROLL_CLI_DAEMON", setting)
+
+    monkeypatch.setattr(daemon, "RollClient", None)
+    runner = CliRunner()
+    result = runner.invoke(__main__.main, ["-M", "3d8"])
+
+    assert result.exit_code == 0
+    assert result.output == "24\n"
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        ["-n", "3", "1d20"],
+        ["--sum", "-n", "3", "1d20"],
+        ["-f", "json", "1d20"],
+        ["--profile", "1d20"],
+        ["--batch", "-"],
+    ],
+)
+def test_cli_client_never_rolls_here(socket_path: str, options: List[str]) -> None:
+    """Test that options the daemon cannot handle are rejected with --client."""
+    runner = CliRunner()
+    result = runner.invoke(
+        __main__.main, ["--client", "--socket", socket_path, *options], input="1d6\n"
+    )
+
+    assert result.exit_code == 2
+    assert "--client cannot be used with" in result.output
+
+
+@pytest.mark.parametrize("setting", ["1", None])
+def test_cli_socket_needs_daemon(
+    monkeypatch: pytest.MonkeyPatch, setting: Optional[str]
+) -> None:
+    """Test that --socket is only accepted when the daemon would be used."""
+    if setting is None:
+        monkeypatch.delenv("ROLL_CLI_DAEMON", raising=False)
+    else:
+        monkeypatch.setenv("ROLL_CLI_DAEMON", setting)
+
+    runner = CliRunner()
+    result = runner.invoke(__main__.main, ["--socket", "missing.sock", "-M", "1d20"])
+
+    if setting is None:
+        assert result.exit_code == 2
+        assert "--socket can only be used with" in result.output
+    else:
+        assert result.exit_code == 0
+        assert result.output == "20\n"
+
+
+def test_client_refuses_shared_socket(
+    socket_path: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that sockets other users could open are never talked to."""
+    os.chmod(socket_path, 0o666)
+
+    with pytest.raises(PermissionError):
+        RollClient(socket_path)
+
+    monkeypatch.setenv("ROLL_CLI_DAEMON", "1")
+    runner = CliRunner()
+    result = runner.invoke(__main__.main, ["--socket", socket_path, "-M", "3d8"])
+
+    assert result.exit_code == 0
+    assert result.output == "24\n"
+
+    result = runner.invoke(__main__.main, ["--client", "--socket", socket_path])
+
+    assert result.exit_code == 1
+    assert "Not a private socket" in result.output
+
+
+def test_socket_is_private(socket_path: str) -> None:
+    """Test that only the user that started the daemon can use its socket."""
+    assert stat.S_IMODE(os.stat(socket_path).st_mode) == 0o600
+
+
+def test_server_keeps_live_socket(socket_path: str) -> None:
+    """Test that a daemon does not replace the socket of one that is running."""
+    with pytest.raises(OSError, match="already listening"):
+        RollServer(socket_path)
+
+    with RollClient(socket_path) as client:
+        assert client.roll("1+1") == "2"
+
+
+def test_server_keeps_other_files() -> None:
+    """Test that a daemon does not remove files that are not sockets."""
+    directory = tempfile.mkdtemp(prefix="roll")
+    path = os.path.join(directory, "roll.sock")
+
+    with open(path, "w") as file:
+        file.write("keep me")
+
+    try:
+        with pytest.raises(FileExistsError):
+            RollServer(path)
+
+        with open(path) as file:
+            assert file.read() == "keep me"
+    finally:
+        os.unlink(path)
+        os.rmdir(directory)
+
+
+def test_server_replaces_stale_socket() -> None:
+    """Test that a socket nothing is listening on is replaced."""
+    directory = tempfile.mkdtemp(prefix="roll")
+    path = os.path.join(directory, "roll.sock")
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stale:
+        stale.bind(path)
+
+    server = RollServer(path)
+    server.server_close()
+
+    assert not os.path.exists(path)
+    os.rmdir(directory)
+
+
+def test_no_shared_default_socket(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that there is no default socket without a runtime directory."""
+    monkeypatch.setenv("XDG_RUNTIME_DIR", "/run/user/1000")
+
+    assert default_socket_path() == "/run/user/1000/roll-cli.sock"
+
+    monkeypatch.delenv("XDG_RUNTIME_DIR")
+
+    with pytest.raises(FileNotFoundError, match="--socket"):
+        default_socket_path()
+
+
+def test_cli_without_daemon() -> None:
+    """Test that --client fails when there is no daemon to talk to."""
+    runner = CliRunner()
+    missing = os.path.join(tempfile.gettempdir(), "roll-cli-missing.sock")
+    result = runner.invoke(__main__.main, ["--client", "--socket", missing, "1d4"])
+
+    assert result.exit_code == 1
+    assert "Unable to reach the roll daemon" in result.output
+
+
+@pytest.mark.benchmark
+def test_round_trip_time(socket_path: str) -> None:
+    """Test that a roll through the daemon only costs a socket round trip."""
+    times = []
+
+    with RollClient(socket_path) as client:
+        for _ in range(200):
+            start = time.perf_counter()
+            client.roll("1d20")
+            times.append(time.perf_counter() - start)
+
+    current_speed = statistics.median(times)
+
+    print(f"The current speed is: {current_speed}")
+    assert current_speed < ACCEPTABLE_ROUND_TRIP
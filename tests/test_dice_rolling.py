@@ -4,6 +4,7 @@ from typing import Union
 import pytest
 
 from roll_cli import roll
+from roll_cli import roll_repeated
 from roll_cli.parser.types import EvaluationResults
 from roll_cli.parser.types import RollOption
 
@@ -207,3 +208,21 @@ def test_keep_exceptions(equation: str, exception_msg: str) -> None:
     """Test the exception paths for the keep notation."""
     with pytest.raises(Exception, match=exception_msg):
         roll(equation)
+
+
+@pytest.mark.parametrize(
+    "equation,count",
+    [
+        ("4d6K3", 100),
+        ("d%", 50),
+        ("(1d4)d6x1 + 2", 100),
+    ],
+)
+def test_roll_repeated(equation: str, count: int) -> None:
+    """Test that repeated rolls are rolled independently of each other."""
+    rolls = roll_repeated(equation, count)
+    maximum = roll(equation, roll_option=RollOption.Maximum)
+
+    assert len(rolls) == count
+    assert all(r <= maximum for r in rolls)
+    assert len(set(rolls)) > 1
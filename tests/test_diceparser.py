@@ -55,4 +55,4 @@ def test_pyparsing_recursion_issues() -> None:
     of giving a boolean.
     """
     dp = DiceParser()
-    dp._parser.validate()
+    dp._grammar().validate()
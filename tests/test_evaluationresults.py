@@ -305,3 +305,24 @@ def test_len() -> None:
     assert len(er) == 0
     er.add_roll(rr)
     assert len(er) == 1
+
+
+@pytest.mark.parametrize("left_rolls,right_rolls", [(3, 1), (1, 3)])
+def test_combined_order(left_rolls: int, right_rolls: int) -> None:
+    """Test that rolls and history keep their order whichever list is longer."""
+    left = EvaluationResults()
+    right = EvaluationResults()
+
+    for number in range(left_rolls):
+        left.add_roll(RollResults("1d6", [number]))
+
+    for number in range(right_rolls):
+        right.add_roll(RollResults("1d8", [number]))
+
+    history = left.history + right.history
+    combined = left + right
+
+    assert [roll.dice for roll in combined.rolls] == (
+        ["1d8"] * right_rolls + ["1d6"] * left_rolls
+    )
+    assert combined.history[:-1] == history
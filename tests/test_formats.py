@@ -0,0 +1,150 @@
+"""Test the machine readable output formats."""
+import csv
+import json
+from io import BytesIO
+from io import StringIO
+
+import pytest
+from click.testing import CliRunner
+
+from roll_cli import __main__
+from roll_cli import roll
+from roll_cli.formats import BinaryWriter
+from roll_cli.formats import read_binary
+from roll_cli.formats import result_record
+from roll_cli.formats import ResultWriter
+from roll_cli.formats import WRITERS
+from roll_cli.parser.types import EvaluationResults
+from roll_cli.parser.types import RollOption
+
+
+@pytest.fixture
+def runner() -> CliRunner:
+    """Fixture for invoking command-line interfaces."""
+    return CliRunner()
+
+
+def test_result_record() -> None:
+    """Test that verbose results include every group of dice rolled."""
+    result = roll("4d6K3 + 1d4", True, RollOption.Maximum)
+
+    assert isinstance(result, EvaluationResults)
+    assert result_record("4d6K3 + 1d4", result, True) == {
+        "expression": "4d6K3 + 1d4",
+        "total": 22,
+        "rolls": [
+            {"dice": "1d4", "rolls": [4]},
+            {"dice": "4d6", "rolls": [6, 6, 6]},
+        ],
+        "history": result.history,
+    }
+
+
+def test_result_record_approximate() -> None:
+    """Test that approximated totals are written as strings."""
+    result = roll("1000!", approximate_above=1024)
+
+    assert result_record("1000!", result)["total"] == str(result)
+
+
+def _reject_constant(name: str) -> None:
+    """Fail on Infinity and NaN, which are not valid JSON."""
+    raise ValueError(f"{name} is not valid JSON")
+
+
+@pytest.mark.parametrize(
+    "expression,total",
+    [("1e308 * 10", "inf"), ("-1e308 * 10", "-inf"), ("1e308*10 - 1e308*10", "nan")],
+)
+def test_json_infinite_totals(runner: CliRunner, expression: str, total: str) -> None:
+    """Test that totals that JSON cannot hold are written as strings."""
+    result = runner.invoke(__main__.main, ["-f", "jsonl", "--", expression])
+    record = json.loads(result.output, parse_constant=_reject_constant)
+
+    assert record == {"expression": expression, "total": total}
+
+
+def test_writers_are_abstract() -> None:
+    """Test that writers have to implement write() and write_error()."""
+    with pytest.raises(TypeError):
+        ResultWriter(BytesIO())  # type: ignore[abstract]
+
+
+def test_jsonl(runner: CliRunner) -> None:
+    """Test that JSON Lines output has one object per roll."""
+    result = runner.invoke(__main__.main, ["-f", "jsonl", "-n", "3", "-M", "2d6"])
+    records = [json.loads(line) for line in result.output.splitlines()]
+
+    assert records == [{"expression": "2d6", "total": 12}] * 3
+
+
+@pytest.mark.parametrize("verbose", [False, True])
+def test_repeat_records(runner: CliRunner, verbose: bool) -> None:
+    """Test that repeats only include their rolls and history when verbose."""
+    options = ["-f", "jsonl", "-M", "2#1d4"]
+    result = runner.invoke(__main__.main, ["-v", *options] if verbose else options)
+    record = json.loads(result.output)
+
+    assert record["groups"] == [4, 4]
+    assert ("rolls" in record) is verbose
+    assert ("history" in record) is verbose
+
+
+def test_json(runner: CliRunner) -> None:
+    """Test that JSON output is a single array, errors included."""
+    result = runner.invoke(
+        __main__.main, ["-f", "json", "-v", "--batch"], input="1d1\n1+\n"
+    )
+    records = json.loads(result.output)
+
+    assert result.exit_code == 1
+    assert records[0]["rolls"] == [{"dice": "1d1", "rolls": [1]}]
+    assert records[1]["expression"] == "1+"
+    assert "error" in records[1]
+
+
+def test_csv(runner: CliRunner) -> None:
+    """Test that CSV output has a header and a row for each roll."""
+    result = runner.invoke(
+        __main__.main, ["-f", "csv", "-v", "-M", "--batch"], input="2d4+1d6\n1/0\n"
+    )
+    rows = list(csv.DictReader(StringIO(result.output)))
+
+    assert rows[0]["total"] == "14"
+    assert rows[0]["dice"] == "1d6 2d4"
+    assert rows[0]["rolls"] == "6;4 4"
+    assert rows[1]["error"] == "division by zero"
+
+
+def test_binary_round_trip() -> None:
+    """Test that binary records can be read back in."""
+    stream = BytesIO()
+    writer = BinaryWriter(stream)
+
+    writer.start()
+    writer.write("10d1", roll("10d1", True))
+    writer.write("5", 5)
+    writer.write("10^400", 10**400)
+    writer.write_error("1+", "Unexpected end of input")
+    writer.finish()
+
+    stream.seek(0)
+    records = list(read_binary(stream))
+
+    assert records[0] == {
+        "expression": "10d1",
+        "total": 10,
+        "rolls": [{"dice": "10d1", "rolls": [1.0] * 10}],
+    }
+    assert records[1] == {"expression": "5", "total": 5, "rolls": []}
+    assert records[2]["total"] == float("inf")
+    assert records[3] == {"expression": "1+", "error": "Unexpected end of input"}
+
+
+@pytest.mark.parametrize("output_format", list(WRITERS))
+def test_every_format(runner: CliRunner, output_format: str) -> None:
+    """Test that every format can be used from the command line."""
+    result = runner.invoke(__main__.main, ["-f", output_format, "-v", "4d6K3"])
+
+    assert result.exit_code == 0
+    assert result.stdout_bytes
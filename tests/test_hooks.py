@@ -0,0 +1,165 @@
+"""Test the parser's hooks and the JSON span exporter."""
+import json
+from contextvars import copy_context
+from pathlib import Path
+from threading import Thread
+from typing import Any
+from typing import Iterator
+from typing import List
+from typing import Tuple
+
+import pytest
+
+from roll_cli.parser import DiceParser
+from roll_cli.parser import hooks
+from roll_cli.parser.types import RollOption
+from roll_cli.parser.types import RollResults
+from roll_cli.tracing import JsonSpanExporter
+
+
+@pytest.fixture
+def events() -> Iterator[List[Tuple[Any, ...]]]:
+    """Record every event for the duration of a test."""
+    recorded: List[Tuple[Any, ...]] = []
+
+    for event in hooks.EVENTS:
+        hooks.register(event, lambda *args, event=event: recorded.append((event, args)))
+
+    yield recorded
+    hooks.clear()
+
+
+def test_disabled_by_default() -> None:
+    """Test that hooks are only enabled while callbacks are registered."""
+    assert not hooks.enabled()
+
+    def callback(*args: Any) -> None:
+        """Do nothing."""
+
+    assert hooks.register("on_keep", callback) is callback
+    assert hooks.enabled()
+
+    hooks.unregister("on_keep", callback)
+    assert not hooks.enabled()
+
+
+def test_unknown_event() -> None:
+    """Test that only known events can be registered for."""
+    with pytest.raises(ValueError, match="Unknown hook event: on_roll"):
+        hooks.register("on_roll", print)
+
+
+def test_events(events: List[Tuple[Any, ...]]) -> None:
+    """Test that every event is emitted in the order it happens."""
+    parser = DiceParser()
+    parser.evaluate("4d6K3 + 2", RollOption.Maximum)
+
+    names = [event for event, _ in events]
+    assert names == [
+        "on_parse_start",
+        "on_tokenize_end",
+        "on_parse_end",
+        "on_dice_rolled",
+        "on_operation",
+        "on_keep",
+        "on_operation",
+        "on_operation",
+        "on_evaluate_end",
+    ]
+
+    rolled = events[3][1][0]
+    assert isinstance(rolled, RollResults)
+    assert rolled.dice == "4d6"
+
+    assert events[5][1][:2] == ("K", 3)
+    assert [events[i][1][0] for i in (4, 6, 7)] == ["d", "K", "+"]
+
+    expression, results, error, seconds = events[-1][1]
+    assert (expression, error) == ("4d6K3 + 2", None)
+    assert results[0].total == 20
+    assert seconds > 0
+
+    # The compiled expression is cached, so parsing only happens once.
+    events.clear()
+    parser.evaluate("4d6K3 + 2")
+    assert "on_parse_start" not in [event for event, _ in events]
+
+
+def test_drop_and_error_events(events: List[Tuple[Any, ...]]) -> None:
+    """Test that drops and failed evaluations are emitted."""
+    parser = DiceParser()
+    parser.evaluate("4d6x")
+
+    with pytest.raises(ZeroDivisionError):
+        parser.evaluate("1/0")
+
+    assert ("on_drop", "x") in [(event, args[0]) for event, args in events]
+
+    expression, results, error, _ = events[-1][1]
+    assert expression == "1/0"
+    assert results is None
+    assert isinstance(error, ZeroDivisionError)
+
+
+def test_json_span_exporter(tmp_path: Path) -> None:
+    """Test that the exporter writes a trace for every evaluation."""
+    path = tmp_path / "spans.jsonl"
+    parser = DiceParser()
+
+    with JsonSpanExporter(str(path)):
+        parser.evaluate("2d20K1 + 5", RollOption.Maximum)
+
+        with pytest.raises(ZeroDivisionError):
+            parser.evaluate("1/0")
+
+    assert not hooks.enabled()
+
+    spans = [json.loads(line) for line in path.read_text().splitlines()]
+    traces = {span["trace_id"] for span in spans}
+    assert len(traces) == 2
+
+    first = [span for span in spans if span["trace_id"] == spans[0]["trace_id"]]
+    root = first[0]
+    assert root["name"] == "evaluate"
+    assert root["parent_id"] is None
+    assert root["attributes"] == {"expression": "2d20K1 + 5", "totals": [25.0]}
+    assert [event["name"] for event in root["events"]] == ["dice_rolled", "keep"]
+    assert root["events"][0]["rolls"] == [20, 20]
+
+    children = first[1:]
+    assert [span["name"] for span in children] == [
+        "parse",
+        "operation",
+        "operation",
+        "operation",
+    ]
+    assert all(span["parent_id"] == root["span_id"] for span in children)
+
+    failed = [span for span in spans if span["trace_id"] != root["trace_id"]][0]
+    assert failed["name"] == "evaluate"
+    assert failed["attributes"]["error"] == "ZeroDivisionError: division by zero"
+
+
+def test_hooks_are_per_context() -> None:
+    """Test that callbacks only apply to the context they were registered in."""
+    seen: List[bool] = []
+
+    def check() -> None:
+        """Record whether hooks are enabled."""
+        seen.append(hooks.enabled())
+
+    hooks.register("on_keep", print)
+
+    try:
+        context = copy_context()
+        thread = Thread(target=check)
+        thread.start()
+        thread.join()
+        context.run(check)
+    finally:
+        hooks.clear()
+
+    context.run(check)
+
+    assert seen == [False, True, True]
+    assert not hooks.enabled()
@@ -0,0 +1,134 @@
+"""Test the log-domain numeric mode and LogNumber arithmetic."""
+from math import factorial
+from math import log10
+from typing import Union
+
+import pytest
+
+from roll_cli import roll
+from roll_cli.parser import CostLimits
+from roll_cli.parser import DiceParser
+from roll_cli.parser import EvaluationBudget
+from roll_cli.parser.types import LogNumber
+
+
+def _log10(x: Union[int, float]) -> float:
+    """Return the log of a number, LogNumber or not."""
+    return x.log10_magnitude if isinstance(x, LogNumber) else log10(x)
+
+
+@pytest.mark.parametrize(
+    "equation,exact",
+    [
+        ("1000!", factorial(1000)),
+        ("2^5000", 2**5000),
+        ("3**3**7", 3**3**7),
+        ("1000! * 2", factorial(1000) * 2),
+        ("1000! / 10", factorial(1000) // 10),
+        ("1000! + 1000!", factorial(1000) * 2),
+        ("-(1000!)", -factorial(1000)),
+    ],
+)
+def test_approximation_is_close(equation: str, exact: int) -> None:
+    """Test that approximated values are close to the exact ones."""
+    result = roll(equation, approximate_above=1024)
+
+    assert isinstance(result, LogNumber)
+    assert result.negative == (exact < 0)
+    assert _log10(result) == pytest.approx(log10(abs(exact)), rel=1e-9)
+
+
+@pytest.mark.parametrize(
+    "equation,result",
+    [
+        ("1000! > 10^100", 1),
+        ("1000! < 10^100", 0),
+        ("1000! > 999!", 1),
+        ("-(1000!) < 5", 1),
+        ("2^2000 = 2^2000", 1),
+        ("10^10^10 > 10^10^9", 1),
+        ("1000! / 999!", 1000),
+        ("1000! - 1000!", 0),
+        ("7 % 2^5000", 7),
+    ],
+)
+def test_log_domain_math(equation: str, result: Union[int, float]) -> None:
+    """Test that math and comparisons stay correct in the log domain."""
+    assert roll(equation, approximate_above=1024) == pytest.approx(result)
+
+
+@pytest.mark.parametrize(
+    "equation,result",
+    [
+        ("5!", 120),
+        ("2^10", 1024),
+        ("100!", factorial(100)),
+    ],
+)
+def test_small_values_stay_exact(equation: str, result: int) -> None:
+    """Test that values under the threshold are calculated exactly."""
+    assert roll(equation, approximate_above=1024) == result
+
+
+def test_log_number_str() -> None:
+    """Test that LogNumbers are shown in scientific notation."""
+    assert str(LogNumber(1000.5)) == "3.16227766016838e+1000"
+    assert str(-LogNumber(1000)) == "-1e+1000"
+
+
+def test_huge_factorial_is_fast() -> None:
+    """Test that huge factorials are approximated instead of calculated."""
+    result = roll("99999999!", approximate_above=1024)
+
+    assert isinstance(result, LogNumber)
+
+
+def test_limits_downgrade() -> None:
+    """Test that limits downgrade expressions that are only too large."""
+    result = roll("99999!", limits=CostLimits(approximate=True))
+
+    assert isinstance(result, LogNumber)
+
+
+def test_budget_ignores_approximated_values() -> None:
+    """Test that approximated values are not charged against the budget."""
+    budget = EvaluationBudget(max_bits=4096)
+
+    assert isinstance(roll("100000!", budget=budget, approximate_above=1024), float)
+
+
+@pytest.mark.parametrize(
+    "equation,message",
+    [
+        ("1000! d 6", "Cannot roll"),
+        ("6 d (1000!)", "Cannot roll"),
+        ("-(1000!) d 6", "Cannot roll"),
+        ("(2^5000) % 7", "Cannot take the modulus"),
+        ("(1000!)!", "Cannot take the factorial"),
+    ],
+)
+def test_approximate_operands_rejected(equation: str, message: str) -> None:
+    """Test that operations that need an exact operand say so clearly."""
+    with pytest.raises(ValueError, match=message):
+        roll(equation, approximate_above=64)
+
+
+@pytest.mark.parametrize(
+    "equation,result",
+    [("-7 % 2^5000", 2**5000), ("7 % -(2^5000)", -(2**5000))],
+)
+def test_modulus_by_approximate_number(
+    equation: str, result: Union[int, float]
+) -> None:
+    """Test that the modulus by an approximate number is approximated."""
+    total = roll(equation, approximate_above=64)
+
+    assert isinstance(total, LogNumber)
+    assert total.negative == (result < 0)
+    assert _log10(total) == pytest.approx(log10(abs(result)), rel=1e-9)
+
+
+def test_approximate_dice_in_program() -> None:
+    """Test that approximate values bound in a program cannot be rolled."""
+    with pytest.raises(ValueError, match="Cannot roll"):
+        DiceParser().evaluate_program("x: 1000!; {x} d 6", approximate_above=64)
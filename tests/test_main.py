@@ -1,4 +1,7 @@
 """Test cases for the __main__ module."""
+from pathlib import Path
+from typing import List
+
 import pytest
 from click.testing import CliRunner
 
@@ -22,3 +25,157 @@ def test_main_output(runner: CliRunner) -> None:
     result = runner.invoke(__main__.main)
 
     assert int(result.output) in range(1, 21)
+
+
+def test_batch_stdin(runner: CliRunner) -> None:
+    """Test that every line from stdin gets a result on its own line."""
+    result = runner.invoke(__main__.main, ["--batch"], input="1+1\n2d1\n\n5!\n")
+
+    assert result.exit_code == 0
+    assert result.output == "2\n2\n120\n"
+
+
+def test_batch_file(runner: CliRunner, tmp_path: Path) -> None:
+    """Test that batches can be read from a file."""
+    batch = tmp_path / "batch.txt"
+    batch.write_text("\n".join(["1d1"] * 1000) + "\n")
+
+    result = runner.invoke(__main__.main, ["-M", "--batch", str(batch)])
+
+    assert result.exit_code == 0
+    assert result.output.splitlines() == ["1"] * 1000
+
+
+def test_batch_errors(runner: CliRunner) -> None:
+    """Test that a bad line is reported without stopping the batch."""
+    result = runner.invoke(__main__.main, ["--batch", "-"], input="1+\n1/0\n3\n")
+    lines = result.output.splitlines()
+
+    assert result.exit_code == 1
+    assert len(lines) == 3
+    assert lines[0].startswith("error: ")
+    assert lines[1] == "error: division by zero"
+    assert lines[2] == "3"
+
+
+def test_batch_with_expression(runner: CliRunner) -> None:
+    """Test that expressions and batches cannot be mixed."""
+    result = runner.invoke(__main__.main, ["--batch", "-", "--", "1d20"], input="")
+
+    assert result.exit_code == 2
+
+
+def test_jobs_without_batch(runner: CliRunner) -> None:
+    """Test that --jobs cannot be used without --batch."""
+    result = runner.invoke(__main__.main, ["-j", "2", "1d20"])
+
+    assert result.exit_code == 2
+    assert "--jobs can only be used with --batch" in result.output
+
+
+@pytest.mark.parametrize(
+    "options,message",
+    [
+        (["--sum", "-v", "-n", "3", "1d6"], "--sum only gives the total"),
+        (["-n", "3", "--batch", "-"], "--count and --sum cannot be used"),
+        (["--sum", "--batch", "-"], "--count and --sum cannot be used"),
+    ],
+)
+def test_ignored_options(runner: CliRunner, options: List[str], message: str) -> None:
+    """Test that options that would be ignored are rejected instead."""
+    result = runner.invoke(__main__.main, options, input="1d6\n")
+
+    assert result.exit_code == 2
+    assert message in result.output
+
+
+def test_batch_jobs(runner: CliRunner) -> None:
+    """Test that parallel batches keep their results in input order."""
+    lines = [str(i) for i in range(5000)]
+    lines[1234] = "1+"
+
+    result = runner.invoke(
+        __main__.main, ["-j", "3", "--batch"], input="\n".join(lines) + "\n"
+    )
+    output = result.output.splitlines()
+
+    assert result.exit_code == 1
+    assert output[:1234] == lines[:1234]
+    assert output[1234].startswith("error: ")
+    assert output[1235:] == lines[1235:]
+
+
+def test_count(runner: CliRunner) -> None:
+    """Test that --count rolls the expression that many times."""
+    result = runner.invoke(__main__.main, ["-n", "500", "4d6K3"])
+    rolls = [float(line) for line in result.output.splitlines()]
+
+    assert result.exit_code == 0
+    assert len(rolls) == 500
+    assert all(3 <= r <= 18 for r in rolls)
+    assert len(set(rolls)) > 1
+
+
+def test_count_sum(runner: CliRunner) -> None:
+    """Test that --sum adds up all of the rolls."""
+    result = runner.invoke(__main__.main, ["-M", "-n", "6", "--sum", "4d6K3"])
+
+    assert result.exit_code == 0
+    assert float(result.output) == 108
+
+
+def test_profile(runner: CliRunner, tmp_path: Path) -> None:
+    """Test that --profile reports where the time went on stderr."""
+    dump = tmp_path / "roll.prof"
+    result = runner.invoke(
+        __main__.main, ["-M", "--profile-dump", str(dump), "4d6K3 + 2"]
+    )
+
+    assert result.exit_code == 0
+    assert result.stdout == "20.0\n"
+
+    phases = [line.split()[0] for line in result.stderr.splitlines()[1:]]
+    assert phases[0] == "validation"
+    assert {"dice", "keep/drop", "arithmetic", "formatting"} <= set(phases)
+    assert dump.exists()
+
+
+@pytest.mark.parametrize("options", [["-n", "3"], ["--sum"], ["-f", "json"]])
+def test_profile_with_repeats(runner: CliRunner, options: List[str]) -> None:
+    """Test that --profile cannot be mixed with repeated or formatted output."""
+    result = runner.invoke(__main__.main, ["--profile", *options, "1d6"])
+
+    assert result.exit_code == 2
+    assert "--profile cannot be used" in result.output
+
+
+def test_repl(runner: CliRunner) -> None:
+    """Test that the REPL rolls every line, rerolling on an empty line."""
+    result = runner.invoke(
+        __main__.main, ["--repl", "-M"], input="2d6 + 1\n\n:save x 1d4\n@x\n"
+    )
+
+    assert result.exit_code == 0
+    assert result.output.split("roll> ")[1:] == [
+        "13\n",
+        "13\n",
+        "saved @x = 1d4\n",
+        "4\n",
+        "\n",
+    ]
+
+
+def test_repl_with_expression(runner: CliRunner) -> None:
+    """Test that expressions cannot be given along with --repl."""
+    result = runner.invoke(__main__.main, ["--repl", "1d20"])
+
+    assert result.exit_code == 2
+
+
+def test_repeat_verbose(runner: CliRunner) -> None:
+    """Test that verbose repeats show every group followed by the totals."""
+    result = runner.invoke(__main__.main, ["-M", "-v", "3#(4d6K3)"])
+
+    assert result.exit_code == 0
+    assert result.output.count("Keeping highest: 3: [6, 6, 6]") == 3
+    assert result.output.endswith("18, 18, 18\n")
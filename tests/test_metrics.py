@@ -0,0 +1,192 @@
+"""Test the metrics collected for the parser."""
+from math import inf
+from threading import Thread
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+
+import pytest
+
+from roll_cli.parser import DiceParser
+from roll_cli.parser.metrics import active_metrics
+from roll_cli.parser.metrics import disable_metrics
+from roll_cli.parser.metrics import enable_metrics
+from roll_cli.parser.metrics import Histogram
+from roll_cli.parser.metrics import MetricsRegistry
+from roll_cli.parser.types import RollOption
+
+
+@pytest.fixture
+def metrics() -> Iterator[MetricsRegistry]:
+    """Collect metrics for the duration of a test."""
+    registry = enable_metrics()
+    yield registry
+    disable_metrics()
+
+
+def test_disabled_by_default() -> None:
+    """Test that nothing is collected unless metrics are enabled."""
+    assert active_metrics() is None
+    assert DiceParser().evaluate("4d6K3") > 0
+
+
+def test_histogram() -> None:
+    """Test that observations land in the right buckets."""
+    histogram = Histogram((0.1, 1.0, inf))
+
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.cumulative_counts() == [2, 3, 4]
+    assert histogram.count == 4
+    assert histogram.sum == pytest.approx(2.65)
+
+
+@pytest.mark.parametrize(
+    "expressions,counters",
+    [
+        (["1 + 1"], {"evaluations": 1, "parse_cache_misses": 1, "dice_drawn": 0}),
+        (
+            ["4d6K3", "4d6K3", "4d6K3"],
+            {
+                "evaluations": 3,
+                "parse_cache_hits": 2,
+                "parse_cache_misses": 1,
+                "dice_drawn": 12,
+                "keep_operations": 3,
+            },
+        ),
+        (["10d10x2X1", "d%"], {"dice_drawn": 11, "drop_operations": 2}),
+        (["(2d4)d6k"], {"dice_drawn": 10, "keep_operations": 1}),
+    ],
+)
+def test_counters(
+    metrics: MetricsRegistry, expressions: List[str], counters: Dict[str, int]
+) -> None:
+    """Test that evaluating expressions counts what they did."""
+    parser = DiceParser()
+
+    for expression in expressions:
+        parser.evaluate(expression, RollOption.Maximum)
+
+    for counter, value in counters.items():
+        assert metrics.counters[counter] == value
+
+
+def test_errors(metrics: MetricsRegistry) -> None:
+    """Test that errors are counted by their type."""
+    parser = DiceParser()
+
+    for expression in ("1/0", "1/0", "1 +", "1d-4"):
+        with pytest.raises(Exception):
+            parser.evaluate(expression)
+
+    assert metrics.errors == {
+        "ZeroDivisionError": 2,
+        "ExpressionSyntaxError": 1,
+        "ValueError": 1,
+    }
+    assert metrics.counters["evaluations"] == 0
+
+
+def test_latency(metrics: MetricsRegistry) -> None:
+    """Test that the parse and evaluate phases are timed."""
+    parser = DiceParser()
+    parser.evaluate_repeated("2d6 + 3", 5)
+    parser.evaluate("2d6 + 3")
+
+    assert metrics.parse_seconds.count == 1
+    assert metrics.evaluate_seconds.count == 6
+    assert 0 < metrics.evaluate_seconds.sum < 1
+
+
+def test_as_dict(metrics: MetricsRegistry) -> None:
+    """Test that the metrics can be exported as a dictionary."""
+    DiceParser().evaluate("1d20")
+    exported = metrics.as_dict()
+
+    assert exported["evaluations"] == 1
+    assert exported["errors"] == {}
+    assert exported["parse_seconds"]["count"] == 1
+    assert exported["evaluate_seconds"]["buckets"]["+Inf"] == 1
+
+    metrics.reset()
+    assert metrics.as_dict()["evaluations"] == 0
+
+
+def test_to_prometheus(metrics: MetricsRegistry) -> None:
+    """Test that the metrics can be exported in the Prometheus format."""
+    parser = DiceParser()
+    parser.evaluate("3d6k1", RollOption.Minimum)
+
+    with pytest.raises(ZeroDivisionError):
+        parser.evaluate("1 // 0")
+
+    lines = metrics.to_prometheus().splitlines()
+
+    assert "# TYPE roll_cli_evaluations_total counter" in lines
+    assert "roll_cli_evaluations_total 1" in lines
+    assert "roll_cli_dice_drawn_total 3" in lines
+    assert "roll_cli_keep_operations_total 1" in lines
+    assert 'roll_cli_errors_total{type="ZeroDivisionError"} 1' in lines
+    assert "# TYPE roll_cli_parse_seconds histogram" in lines
+    assert 'roll_cli_parse_seconds_bucket{le="+Inf"} 2' in lines
+    assert "roll_cli_evaluate_seconds_count 1" in lines
+
+
+def test_compile_cache_is_bounded(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the oldest compiled expressions are dropped first."""
+    monkeypatch.setattr("roll_cli.parser.diceparser.COMPILE_CACHE_SIZE", 3)
+    parser = DiceParser()
+
+    for number in range(5):
+        assert parser.evaluate(f"{number} + 1") == number + 1
+
+    assert list(parser._compiled) == ["2 + 1", "3 + 1", "4 + 1"]
+
+
+def test_compile_cache_across_threads(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that threads sharing a parser can keep evicting from its cache."""
+    monkeypatch.setattr("roll_cli.parser.diceparser.COMPILE_CACHE_SIZE", 4)
+    parser = DiceParser()
+    errors: List[BaseException] = []
+
+    def evaluate(offset: int) -> None:
+        """Evaluate expressions that no other thread evaluates."""
+        try:
+            for number in range(200):
+                assert parser.evaluate(f"{offset} + {number}") == offset + number
+        except BaseException as err:
+            errors.append(err)
+
+    threads = [Thread(target=evaluate, args=(offset * 1000,)) for offset in range(8)]
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(parser._compiled) <= 4
+
+
+def test_metrics_are_shared_by_threads(metrics: MetricsRegistry) -> None:
+    """Test that rolls on any thread are counted once metrics are enabled."""
+    parser = DiceParser()
+    seen: List[Optional[MetricsRegistry]] = []
+
+    def evaluate() -> None:
+        """Roll on a plain thread and note the registry that it sees."""
+        seen.append(active_metrics())
+        parser.evaluate("1d6")
+
+    thread = Thread(target=evaluate)
+    thread.start()
+    thread.join()
+    parser.evaluate("1d6")
+
+    assert seen == [metrics]
+    assert metrics.counters["evaluations"] == 2
@@ -0,0 +1,63 @@
+"""Test the pools of worker processes forked from a warm parent."""
+import gc
+import multiprocessing
+import os
+
+import pytest
+
+from roll_cli.parser.types import RollOption
+from roll_cli.prefork import can_fork
+from roll_cli.prefork import fork_pool
+from roll_cli.prefork import measure_workers
+from roll_cli.prefork import memory_usage
+from roll_cli.roll import roll
+
+needs_fork = pytest.mark.skipif(not can_fork(), reason="Requires fork")
+
+
+@needs_fork
+def test_fork_pool() -> None:
+    """Test that every worker is forked up front and can roll."""
+    with fork_pool(3) as pool:
+        assert len(pool._processes) == 3
+        assert gc.get_freeze_count() == 0
+
+        futures = [
+            pool.submit(roll, "4d6K3", False, RollOption.Maximum) for _ in range(10)
+        ]
+        assert [future.result() for future in futures] == [18.0] * 10
+
+        pids = {pool.submit(os.getpid).result() for _ in range(10)}
+        assert os.getpid() not in pids
+
+
+def test_memory_usage() -> None:
+    """Test that memory usage is either unknown or sensible."""
+    rss, private = memory_usage()
+
+    if rss is None:
+        assert private is None
+    else:
+        assert private is not None
+        assert 0 < private <= rss
+
+
+@pytest.mark.benchmark
+@needs_fork
+def test_forked_workers_start_faster() -> None:
+    """Test that forked workers start faster and share more than spawned ones."""
+    if "spawn" not in multiprocessing.get_all_start_methods():
+        pytest.skip("Requires spawn")
+
+    forked = measure_workers("fork", 2)
+    spawned = measure_workers("spawn", 2)
+
+    assert max(stats.startup for stats in forked) < min(
+        stats.startup for stats in spawned
+    )
+
+    forked_private = [stats.private for stats in forked if stats.private is not None]
+    spawned_private = [stats.private for stats in spawned if stats.private is not None]
+
+    if forked_private and spawned_private:
+        assert max(forked_private) < min(spawned_private)
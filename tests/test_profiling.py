@@ -0,0 +1,105 @@
+"""Test the per-phase profiler."""
+import importlib
+import pstats
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from roll_cli import profiling
+from roll_cli.parser import hooks
+from roll_cli.parser.types import RollOption
+from roll_cli.profiling import profile_roll
+from roll_cli.profiling import RollProfiler
+from roll_cli.roll import clean_expression
+from roll_cli.roll import roll
+
+
+@pytest.mark.parametrize(
+    "expression,phases",
+    [
+        # Parsed expressions are cached, so this one must not be used elsewhere.
+        ("17 + 2 * 31", ["validation", "parsing", "arithmetic", "formatting"]),
+        ("8d6x2", ["dice", "keep/drop"]),
+        ("3! + sqrt(16) + 2^3", ["arithmetic", "exponents", "factorial/sqrt"]),
+        ("1d20 >= 10", ["dice", "comparisons"]),
+    ],
+)
+def test_profile_roll(expression: str, phases: List[str]) -> None:
+    """Test that the time for each phase and operator is counted."""
+    output, profiler = profile_roll(expression, roll_option=RollOption.Maximum)
+
+    assert output == str(roll(expression, roll_option=RollOption.Maximum))
+
+    for phase in phases:
+        assert phase in profiler.timings
+        assert profiler.calls[phase] >= 1
+
+    assert sum(profiler.timings.values()) <= profiler.total
+    assert not hooks.enabled()
+
+
+def test_context_manager() -> None:
+    """Test that the profiler can be wrapped around any code."""
+    with RollProfiler() as profiler:
+        with profiler.phase("setup"):
+            expressions = ["2d6", "2d6", "1d4 + 1"]
+
+        for expression in expressions:
+            roll(expression)
+
+    assert profiler.calls["dice"] == 3
+    assert profiler.calls["arithmetic"] == 1
+    assert profiler.calls["setup"] == 1
+
+    report = profiler.report().splitlines()
+    assert report[0].split() == ["phase", "calls", "time", "(ms)", "share"]
+    assert report[-1].startswith("total")
+    assert [line.split()[0] for line in report[1:-1]][-1] == "setup"
+
+
+def test_cprofile_dump(tmp_path: Path) -> None:
+    """Test that cProfile stats can be dumped along with the report."""
+    path = tmp_path / "roll.prof"
+    _, profiler = profile_roll("10d10K3", cprofile_path=str(path))
+
+    stats = pstats.Stats(str(path))
+    functions = {function for _, _, function in stats.stats}  # type: ignore
+
+    assert "roll_dice" in functions
+    assert profiler.report().endswith(f"cProfile stats written to {path}")
+
+
+def test_tokenizing_is_validation() -> None:
+    """Test that tokenizing is counted as validation instead of parsing."""
+    tokenized: List[float] = []
+    hooks.register("on_tokenize_end", lambda _, seconds: tokenized.append(seconds))
+
+    try:
+        _, profiler = profile_roll("23 + 3 * 7")
+    finally:
+        hooks.clear()
+
+    assert profiler.calls["validation"] == 1
+    assert profiler.calls["parsing"] == 1
+    assert profiler.timings["validation"] > sum(tokenized) > 0
+
+
+def test_expression_is_validated_once(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the expression is not cleaned again by roll()."""
+    cleaned: List[str] = []
+
+    def clean(expression: str) -> str:
+        """Record the expression and clean it as usual."""
+        cleaned.append(expression)
+        return clean_expression(expression)
+
+    monkeypatch.setattr(profiling, "clean_expression", clean)
+    monkeypatch.setattr(
+        importlib.import_module("roll_cli.roll"), "clean_expression", clean
+    )
+
+    output, _ = profile_roll("4d6K3", roll_option=RollOption.Maximum)
+
+    assert output == "18.0"
+    assert cleaned == ["4d6K3"]
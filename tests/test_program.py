@@ -0,0 +1,154 @@
+"""Test programs of several dice strings evaluated together."""
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import pytest
+
+from roll_cli.parser import CostLimits
+from roll_cli.parser import DiceParser
+from roll_cli.parser import ExpressionTooCostlyError
+from roll_cli.parser import hooks
+from roll_cli.parser.program import split_statements
+from roll_cli.parser.tokenizer import ExpressionSyntaxError
+from roll_cli.parser.types import ProgramResults
+from roll_cli.parser.types import RollOption
+
+
+@pytest.mark.parametrize(
+    "source,statements",
+    [
+        ("1d20", [(None, "1d20", 0)]),
+        ("hit: 1d20 + 7; 2d6", [("hit", " 1d20 + 7", 4), (None, " 2d6", 14)]),
+        ("  a :1; b: {a};", [("a", "1", 5), ("b", " {a}", 10)]),
+        ("1;;2", [(None, "1", 0), (None, "2", 3)]),
+    ],
+)
+def test_split_statements(
+    source: str, statements: List[Tuple[Optional[str], str, int]]
+) -> None:
+    """Test that programs are split into named statements and positions."""
+    assert split_statements(source) == statements
+
+
+@pytest.mark.parametrize(
+    "source,position",
+    [
+        ("", 0),
+        (" ; ", 3),
+        ("a: 1; a: 2", 6),
+        ("a: 1; b:", 8),
+        ("a: ; 1", 3),
+    ],
+)
+def test_malformed_programs(source: str, position: int) -> None:
+    """Test that empty programs, duplicates, and missing statements fail."""
+    with pytest.raises(ExpressionSyntaxError) as err:
+        split_statements(source)
+
+    assert err.value.position == position
+
+
+def test_evaluate_program() -> None:
+    """Test that named results are used by the statements after them."""
+    results = DiceParser().evaluate_program(
+        "nat: 1d20; hit: {nat} + {bonus} >= 15;"
+        " damage: (2d6 + 4) * (1 + ({nat} = 20)); {damage} * {hit}",
+        RollOption.Maximum,
+        bindings={"bonus": 7},
+    )
+
+    assert isinstance(results, ProgramResults)
+    assert results.names == ["nat", "hit", "damage", None]
+    assert results.totals() == [20, 1, 32, 32]
+    assert results["damage"] == 32
+    assert results[-1] == 32
+    assert list(results.as_dict()) == ["nat", "hit", "damage"]
+    assert len(results) == 4
+
+    with pytest.raises(KeyError):
+        results["miss"]
+
+
+def test_program_compiled_once() -> None:
+    """Test that the whole program is compiled once and then reused."""
+    parser = DiceParser()
+    source = "a: {n}d6; b: {a} * 2"
+
+    totals = [
+        parser.evaluate_program(source, RollOption.Minimum, bindings={"n": n}).totals()
+        for n in (1, 2, 3)
+    ]
+
+    assert totals == [[1, 2], [2, 4], [3, 6]]
+    assert list(parser._programs) == [source]
+    assert parser._compiled == {}
+
+
+def test_program_results_str() -> None:
+    """Test that every result is printed on its own line after its name."""
+    results = DiceParser().evaluate_program("a: 2; 3; b: 2d1", RollOption.Normal)
+
+    assert str(results).splitlines() == [
+        "a: 2",
+        "3",
+        "b:",
+        "Rolled: 2d1: [1, 1]",
+        "2",
+    ]
+
+
+def test_reference_to_later_statement() -> None:
+    """Test that statements can only use the results before them."""
+    with pytest.raises(ValueError, match="placeholder {b}"):
+        DiceParser().evaluate_program("a: {b} + 1; b: 2")
+
+
+def test_program_errors() -> None:
+    """Test that errors in any statement stop the program."""
+    parser = DiceParser()
+
+    with pytest.raises(ZeroDivisionError):
+        parser.evaluate_program("a: 2; b: {a} / 0; c: 3")
+
+    with pytest.raises(ExpressionSyntaxError) as err:
+        parser.evaluate_program("a: 2; 1 +")
+
+    assert err.value.position == 9
+    assert str(err.value) == "Unexpected end of input at position 9: a: 2; 1 +"
+
+
+def test_program_hooks() -> None:
+    """Test that a program is a single evaluation as far as hooks go."""
+    ended: List[Tuple[str, List[float]]] = []
+
+    def on_evaluate_end(source: str, results: ProgramResults, *args: object) -> None:
+        ended.append((source, results.totals()))
+
+    hooks.register("on_evaluate_end", on_evaluate_end)
+
+    try:
+        DiceParser().evaluate_program("a: 1d1; {a} + 1")
+    finally:
+        hooks.unregister("on_evaluate_end", on_evaluate_end)
+
+    assert ended == [("a: 1d1; {a} + 1", [1, 2])]
+
+
+def test_statement_named_like_binding() -> None:
+    """Test that statements cannot take the name of a binding."""
+    with pytest.raises(ExpressionSyntaxError) as err:
+        DiceParser().evaluate_program("a: 1; bonus: 3; {bonus}", bindings={"bonus": 7})
+
+    assert err.value.position == 6
+    assert err.value.problem == "'bonus' is already defined by a binding"
+
+
+def test_program_limits_name_statement() -> None:
+    """Test that cost limits point at the statement that went over them."""
+    with pytest.raises(ExpressionTooCostlyError) as err:
+        DiceParser().evaluate_program(
+            "a: 1d20; b: 100d6 + {a}", limits=CostLimits(max_dice=10)
+        )
+
+    assert err.value.expression == "100d6 + {a}"
@@ -0,0 +1,231 @@
+"""Test repeats like 6#(4d6K3), which roll an expression for several groups."""
+from typing import Any
+from typing import List
+
+import pytest
+
+from roll_cli.formats import result_record
+from roll_cli.parser import CostLimits
+from roll_cli.parser import DiceParser
+from roll_cli.parser import ExpressionTooCostlyError
+from roll_cli.parser import hooks
+from roll_cli.parser import operations
+from roll_cli.parser.metrics import disable_metrics
+from roll_cli.parser.metrics import enable_metrics
+from roll_cli.parser.tokenizer import ExpressionSyntaxError
+from roll_cli.parser.types import EvaluationResults
+from roll_cli.parser.types import RepeatResults
+from roll_cli.parser.types import RollOption
+from roll_cli.repl import RollRepl
+from roll_cli.roll import roll
+from roll_cli.roll import roll_repeated
+
+
+def _counting_draw(calls: List[int]) -> Any:
+    """Return a replacement for _draw that gives 1, 2, 3... and counts calls."""
+
+    def draw(num_dice: int, sides: int, budget: Any) -> List[int]:
+        """Record the number of dice and draw them in order."""
+        calls.append(num_dice)
+        return list(range(1, num_dice + 1))
+
+    return draw
+
+
+@pytest.mark.parametrize(
+    "dice_string,tree",
+    [
+        ("6#(4d6K3)", [6, "#", [[4, "d", 6], "K", 3]]),
+        ("6#4d6K3", [6, "#", [[4, "d", 6], "K", 3]]),
+        ("3 # 1d20 >= 10", [3, "#", [[1, "d", 20], ">=", 10]]),
+        ("{n}#d%", ["{n}", "#", "d%"]),
+    ],
+)
+def test_repeat_tree(dice_string: str, tree: Any) -> None:
+    """Test that a repeat is the root of the tree and binds loosest."""
+    assert DiceParser().parse_tree(dice_string) == tree
+
+
+@pytest.mark.parametrize(
+    "dice_string,position",
+    [("#1d6", 0), ("1 + 2#1d6", 5), ("(2#1d6)", 2), ("2#3#1d6", 3), ("-2#1d6", 2)],
+)
+def test_repeat_only_at_start(dice_string: str, position: int) -> None:
+    """Test that a repeat has to start the dice string with its count."""
+    with pytest.raises(ExpressionSyntaxError) as info:
+        DiceParser().compile(dice_string)
+
+    assert info.value.position == position
+
+
+def test_draws_every_group_at_once(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the dice of all groups are drawn in one bulk call."""
+    calls: List[int] = []
+    monkeypatch.setattr(operations, "_draw", _counting_draw(calls))
+
+    result = DiceParser().evaluate("3#(4d6K3)")
+
+    assert calls == [12]
+    assert isinstance(result, RepeatResults)
+    assert [
+        group.rolls[0].rolls for group in result if isinstance(group, EvaluationResults)
+    ] == [
+        [2, 3, 4],
+        [6, 7, 8],
+        [10, 11, 12],
+    ]
+    assert result == [9, 21, 33]
+    assert result.total == 63
+
+
+def test_groups_with_different_dice(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that dice depending on earlier rolls are rolled group by group."""
+    calls: List[int] = []
+    monkeypatch.setattr(operations, "_draw", _counting_draw(calls))
+
+    result = DiceParser().evaluate("2#(1d4)d6")
+
+    assert calls == [2, 1, 2]
+    assert result == [1, 3]
+
+
+@pytest.mark.parametrize("sides", [1, 6, 2**32, 2**64])
+def test_bulk_draw(sides: int) -> None:
+    """Test that dice drawn in bulk are whole numbers on the die."""
+    rolls = operations._draw(6000, sides, None)
+
+    assert len(rolls) == 6000
+    assert all(isinstance(roll, int) and 1 <= roll <= sides for roll in rolls)
+
+    if sides == 6:
+        assert set(rolls) == {1, 2, 3, 4, 5, 6}
+
+
+def test_dice_drawn_metric() -> None:
+    """Test that the bulk draw counts every die that was drawn."""
+    registry = enable_metrics()
+
+    try:
+        DiceParser().evaluate("6#(4d6K3)")
+    finally:
+        disable_metrics()
+
+    assert registry.counters["dice_drawn"] == 24
+    assert registry.counters["keep_operations"] == 6
+
+
+def test_repeat_with_hooks() -> None:
+    """Test that every group is still seen by hooks when they are enabled."""
+    rolled: List[Any] = []
+    hooks.register("on_dice_rolled", rolled.append)
+
+    try:
+        result = DiceParser().evaluate("4#2d6 + 1", RollOption.Maximum)
+    finally:
+        hooks.clear()
+
+    assert result == [13, 13, 13, 13]
+    assert len(rolled) == 4
+
+
+@pytest.mark.parametrize(
+    "dice_string,totals",
+    [
+        ("6#(4d6K3)", [18] * 6),
+        ("2#d%", [100, 100]),
+        ("3#d8 + 2", [10, 10, 10]),
+        ("2#3 * 2", [6, 6]),
+        ("3#2d6x1", [6, 6, 6]),
+        ("0#1d6", []),
+        ("2.0#1d4", [4, 4]),
+    ],
+)
+def test_repeat_totals(dice_string: str, totals: List[float]) -> None:
+    """Test that every group gets the total of its own expression."""
+    result = DiceParser().evaluate(dice_string, RollOption.Maximum)
+
+    assert isinstance(result, RepeatResults)
+    assert result.totals() == totals
+    assert len(result) == len(totals)
+
+
+def test_repeat_placeholder_count() -> None:
+    """Test that the number of repeats can be a placeholder."""
+    assert (
+        DiceParser().evaluate("{n}#1d6", RollOption.Minimum, bindings={"n": 5})
+        == [1] * 5
+    )
+
+
+@pytest.mark.parametrize("count", [-1, 2.5])
+def test_invalid_repeat_count(count: float) -> None:
+    """Test that repeats have to be a whole number of 0 or more."""
+    with pytest.raises(ValueError):
+        DiceParser().evaluate("{n}#1d6", bindings={"n": count})
+
+
+def test_verbose_lists_every_group() -> None:
+    """Test that verbose output shows the rolls of each group."""
+    result = roll("2#(4d6K3)", True, RollOption.Maximum)
+
+    assert str(result) == "\n".join(
+        [
+            "Group 1:",
+            "Rolled: 4d6: [6, 6, 6, 6]",
+            "Keeping highest: 3: [6, 6, 6]",
+            "18",
+            "Group 2:",
+            "Rolled: 4d6: [6, 6, 6, 6]",
+            "Keeping highest: 3: [6, 6, 6]",
+            "18",
+            "18, 18",
+        ]
+    )
+
+
+def test_summary() -> None:
+    """Test that non-verbose results only keep the total of each group."""
+    result = roll("3#(4d6K3)", False, RollOption.Minimum)
+
+    assert isinstance(result, RepeatResults)
+    assert str(result) == "3, 3, 3"
+    assert result.rolls == []
+    assert roll_repeated("2#1d4", 2, False, RollOption.Maximum) == [[4, 4], [4, 4]]
+
+
+def test_repeat_in_repl() -> None:
+    """Test that the REPL shows the total of every group."""
+    assert RollRepl(roll_option=RollOption.Maximum).handle("3#1d4") == "4, 4, 4"
+
+
+def test_repeat_record() -> None:
+    """Test that records of repeats list the total of every group."""
+    result = roll("2#1d4", True, RollOption.Maximum)
+    record = result_record("2#1d4", result, True)
+
+    assert record["total"] == 8
+    assert record["groups"] == [4, 4]
+    assert record["rolls"] == [
+        {"dice": "1d4", "rolls": [4]},
+        {"dice": "1d4", "rolls": [4]},
+    ]
+
+
+def test_repeat_is_evaluation_results() -> None:
+    """Test that repeats gather the rolls and history of every group."""
+    result = RepeatResults([EvaluationResults(2), 3])
+
+    assert result.total == 5
+    assert result[1] == 3
+    assert result.summary().groups == [2, 3]
+
+
+def test_repeat_cost() -> None:
+    """Test that a repeat costs its body for every group."""
+    parser = DiceParser()
+
+    assert parser.estimate_cost("6#(4d6K3)").dice == 24
+    assert parser.estimate_cost("{n}#1d6", {"n": 10}).dice == 10
+
+    with pytest.raises(ExpressionTooCostlyError):
+        parser.evaluate("2000#1000d6", limits=CostLimits())
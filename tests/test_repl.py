@@ -0,0 +1,130 @@
+"""Test the interactive roller."""
+from typing import List
+
+import pytest
+
+from roll_cli.parser.types import RollOption
+from roll_cli.repl import HELP
+from roll_cli.repl import QuitRepl
+from roll_cli.repl import RollRepl
+from roll_cli.repl import run
+
+
+@pytest.fixture
+def session() -> RollRepl:
+    """A session that always rolls the maximum."""
+    return RollRepl(roll_option=RollOption.Maximum)
+
+
+def test_roll(session: RollRepl) -> None:
+    """Test that expressions are rolled, with a d20 for nothing at all."""
+    assert session.handle("4d6K3 + 1") == "19.0"
+    assert session.handle("  2 * 3  ") == "6"
+    assert RollRepl().handle("") in {str(value) for value in range(1, 21)}
+
+
+def test_reroll_previous(session: RollRepl) -> None:
+    """Test that an empty line rolls the previous expression again."""
+    session.handle("3d4")
+
+    assert session.handle("") == "12"
+    assert session.previous == "3d4"
+
+
+def test_parser_stays_warm(session: RollRepl) -> None:
+    """Test that every expression is compiled once for the whole session."""
+    for _ in range(3):
+        session.handle("2d8 + 1")
+        session.handle("")
+
+    assert list(session.parser._compiled) == ["2d8 + 1"]
+
+
+def test_verbose() -> None:
+    """Test that verbose sessions show the rolls."""
+    session = RollRepl(verbose=True, roll_option=RollOption.Minimum)
+
+    assert session.handle("2d6").splitlines() == ["Rolled: 2d6: [1, 1]", "2"]
+
+
+def test_saved_expressions(session: RollRepl) -> None:
+    """Test that expressions can be saved, used, listed, and deleted."""
+    assert session.handle(":list") == "no saved expressions"
+    assert session.handle(":save attack 1d20 + 7") == "saved @attack = 1d20 + 7"
+    assert session.handle("@attack") == "27"
+    assert session.handle("@attack * 2") == "54"
+    assert session.handle("") == "54"
+
+    session.handle("2d6")
+    assert session.handle(":save damage") == "saved @damage = 2d6"
+    assert session.handle(":save both @attack + @damage") == (
+        "saved @both = (1d20 + 7) + (2d6)"
+    )
+    assert session.handle(":list").splitlines() == [
+        "@attack = 1d20 + 7",
+        "@damage = 2d6",
+        "@both = (1d20 + 7) + (2d6)",
+    ]
+
+    assert session.handle(":delete attack") == "deleted @attack"
+    assert session.handle("@attack") == "error: No saved expression named attack."
+    assert session.handle("@both") == "39"
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        "1/0",
+        "1 +",
+        "1d20 & 3",
+        ":save",
+        ":save bad-name 1d6",
+        ":save name 1 +",
+        ":delete missing",
+        ":unknown",
+        ":",
+    ],
+)
+def test_errors(session: RollRepl, line: str) -> None:
+    """Test that mistakes are reported without ending the session."""
+    session.handle("1d6")
+
+    assert session.handle(line).startswith("error: ")
+    assert session.previous == "1d6"
+    assert session.saved == {}
+
+
+def test_save_without_previous(session: RollRepl) -> None:
+    """Test that there has to be something to save."""
+    assert session.handle(":save name") == (
+        "error: There is no previous expression to save."
+    )
+
+
+def test_help_and_quit(session: RollRepl) -> None:
+    """Test the help and quit commands."""
+    assert session.handle(":help") == HELP
+
+    for line in (":quit", ":q"):
+        with pytest.raises(QuitRepl):
+            session.handle(line)
+
+
+def test_run() -> None:
+    """Test that a session runs until the input ends or it is quit."""
+    lines = iter(["1 + 1", "", ":save two", "@two * 2"])
+    written: List[str] = []
+
+    def read(prompt: str) -> str:
+        try:
+            return next(lines)
+        except StopIteration:
+            raise EOFError() from None
+
+    run(read=read, write=written.append)
+    assert written == ["2", "2", "saved @two = 1 + 1", "4", ""]
+
+    lines = iter(["3", ":quit", "4"])
+    written.clear()
+    run(read=read, write=written.append)
+    assert written == ["3"]
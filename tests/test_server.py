@@ -0,0 +1,263 @@
+"""Test the asyncio roll server, including a small load test."""
+import asyncio
+import json
+import statistics
+import time
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Tuple
+
+import pytest
+
+from roll_cli.parser.metrics import disable_metrics
+from roll_cli.parser.metrics import enable_metrics
+from roll_cli.server import MAX_PENDING
+from roll_cli.server import RollService
+from roll_cli.server import start_server
+
+# Acceptable 99th percentile latency under load, in seconds.
+ACCEPTABLE_P99 = 0.05
+
+
+async def _connect(server: asyncio.AbstractServer) -> Any:
+    """Open a connection to the server."""
+    port = server.sockets[0].getsockname()[1]  # type: ignore[attr-defined]
+    return await asyncio.open_connection("127.0.0.1", port)
+
+
+async def _request(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter, request: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Send a single request and wait for its reply."""
+    writer.write(json.dumps(request).encode() + b"\n")
+    await writer.drain()
+    reply: Dict[str, Any] = json.loads(await reader.readline())
+    return reply
+
+
+@pytest.mark.parametrize(
+    "request_,reply",
+    [
+        (
+            {"id": 1, "expression": "2d6", "roll_option": "Maximum"},
+            {"id": 1, "expression": "2d6", "total": 12},
+        ),
+        (
+            {"id": 2, "batch": ["1+1", "1/0"]},
+            {
+                "id": 2,
+                "results": [
+                    {"expression": "1+1", "total": 2},
+                    {"expression": "1/0", "error": "division by zero"},
+                ],
+            },
+        ),
+        (
+            {"id": 3, "expression": "1d4", "roll_option": "Most"},
+            {"id": 3, "error": "Unknown roll option: Most"},
+        ),
+        ([1, 2], {"id": None, "error": "Requests must be JSON objects."}),
+        (
+            {"id": 4, "batch": 5},
+            {"id": 4, "error": "The batch must be a list of expressions."},
+        ),
+        (
+            {"id": 5, "batch": ["1d4", 2]},
+            {"id": 5, "error": "The batch must be a list of expressions."},
+        ),
+        (
+            {"id": 6, "expression": ["1d4"]},
+            {"id": 6, "error": "The expression must be a string."},
+        ),
+        (
+            {"id": 7, "expression": "1d4", "verbose": "yes"},
+            {"id": 7, "error": "Verbose must be true or false."},
+        ),
+        (
+            {"id": 8, "expression": "1d4", "roll_option": ["x"]},
+            {"id": 8, "error": "Unknown roll option: ['x']"},
+        ),
+    ],
+)
+def test_handle(request_: Any, reply: Dict[str, Any]) -> None:
+    """Test that requests are answered, and errors are sent back."""
+    assert asyncio.run(RollService().handle(request_)) == reply
+
+
+def test_metrics() -> None:
+    """Test that the parser's metrics can be asked for."""
+    service = RollService()
+
+    assert asyncio.run(service.handle({"id": 1, "metrics": "json"})) == {
+        "id": 1,
+        "error": "Metrics are not enabled.",
+    }
+
+    enable_metrics()
+
+    try:
+        asyncio.run(service.handle({"id": 2, "batch": ["1d6", "1/0"]}))
+        reply = asyncio.run(service.handle({"id": 3, "metrics": "json"}))
+        text = asyncio.run(service.handle({"id": 4, "metrics": "prometheus"}))
+    finally:
+        disable_metrics()
+
+    assert reply["metrics"]["evaluations"] == 1
+    assert reply["metrics"]["errors"] == {"ZeroDivisionError": 1}
+    assert "roll_cli_dice_drawn_total 1" in text["metrics"].splitlines()
+
+
+def test_pipelined_requests() -> None:
+    """Test that many requests can be sent before reading any replies."""
+
+    async def run() -> List[Dict[str, Any]]:
+        server = await start_server()
+
+        async with server:
+            reader, writer = await _connect(server)
+
+            for i in range(100):
+                writer.write(json.dumps({"id": i, "expression": "1d1"}).encode())
+                writer.write(b"\n")
+
+            writer.write(b"not json\n")
+            await writer.drain()
+
+            replies = [json.loads(await reader.readline()) for _ in range(101)]
+            writer.close()
+
+        return replies
+
+    replies = asyncio.run(run())
+
+    assert sorted(r["id"] for r in replies if "total" in r) == list(range(100))
+    assert sum("Invalid request" in r.get("error", "") for r in replies) == 1
+
+
+def test_every_request_is_answered(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that requests that fail unexpectedly still get a reply each."""
+
+    async def fail(self: RollService, request: Any) -> Dict[str, Any]:
+        raise RuntimeError("Unexpected")
+
+    monkeypatch.setattr(RollService, "handle", fail)
+
+    async def run() -> List[Dict[str, Any]]:
+        server = await start_server()
+
+        async with server:
+            reader, writer = await _connect(server)
+
+            # More than the number of requests that can be pending at once.
+            for i in range(MAX_PENDING * 2):
+                writer.write(json.dumps({"id": i}).encode() + b"\n")
+
+            await writer.drain()
+            replies = [
+                json.loads(await reader.readline()) for _ in range(MAX_PENDING * 2)
+            ]
+            writer.close()
+
+        return replies
+
+    replies = asyncio.run(run())
+
+    assert sorted(reply["id"] for reply in replies) == list(range(MAX_PENDING * 2))
+    assert all(
+        reply["error"] == "Unable to answer the request: Unexpected"
+        for reply in replies
+    )
+
+
+def test_line_too_long() -> None:
+    """Test that a line over the limit is answered before hanging up."""
+
+    async def run() -> Tuple[Dict[str, Any], bytes]:
+        server = await start_server()
+
+        async with server:
+            reader, writer = await _connect(server)
+            writer.write(b'{"expression": "' + b"1" * 100_000 + b'"}\n')
+            writer.write(b'{"expression": "1"}\n')
+            await writer.drain()
+            reply = json.loads(await reader.readline())
+            rest = await reader.read()
+            writer.close()
+
+        return reply, rest
+
+    reply, rest = asyncio.run(run())
+
+    assert reply["id"] is None
+    assert reply["error"].startswith("Invalid request")
+    assert rest == b""
+
+
+@pytest.mark.benchmark
+def test_heavy_expressions_are_offloaded() -> None:
+    """Test that a heavy roll does not hold up the small rolls behind it."""
+
+    async def run() -> float:
+        server = await start_server()
+
+        async with server:
+            reader, writer = await _connect(server)
+            writer.write(
+                json.dumps({"id": "heavy", "expression": "2000000d6"}).encode()
+            )
+            writer.write(b"\n")
+
+            start = time.perf_counter()
+            reply = await _request(reader, writer, {"id": "light", "expression": "1"})
+            elapsed = time.perf_counter() - start
+
+            assert reply["id"] == "light"
+            assert (await reader.readline()).startswith(b'{"id": "heavy"')
+            writer.close()
+
+        return elapsed
+
+    assert asyncio.run(run()) < 0.5
+
+
+@pytest.mark.benchmark
+def test_load() -> None:
+    """Load test the server with many concurrent clients."""
+    clients = 20
+    requests_per_client = 100
+    expressions = ["1d20 + 5", "4d6K3", "2d8 + 1d6 + 3", "d%", "10d10x2"]
+
+    async def client(server: asyncio.AbstractServer) -> List[float]:
+        reader, writer = await _connect(server)
+        latencies: List[float] = []
+
+        # Each client keeps a single request in flight, like a game server
+        # waiting on the roll before it can carry on.
+        for i in range(requests_per_client):
+            request = {"id": i, "expression": expressions[i % len(expressions)]}
+            start = time.perf_counter()
+            reply = await _request(reader, writer, request)
+            latencies.append(time.perf_counter() - start)
+            assert "total" in reply
+
+        writer.close()
+        return latencies
+
+    async def run() -> List[float]:
+        server = await start_server()
+
+        async with server:
+            results = await asyncio.gather(*(client(server) for _ in range(clients)))
+
+        return [latency for latencies in results for latency in latencies]
+
+    start = time.perf_counter()
+    latencies = sorted(asyncio.run(run()))
+    elapsed = time.perf_counter() - start
+
+    p50 = statistics.median(latencies)
+    p99 = latencies[int(len(latencies) * 0.99)]
+
+    print(f"{len(latencies) / elapsed:.0f} requests/s, p50: {p50}, p99: {p99}")
+    assert p99 < ACCEPTABLE_P99
@@ -13,14 +13,25 @@ on my desktop, it may not run as well on Termux on an older phone.
 Further reading:
 - https://therenegadecoder.com/code/how-to-performance-test-python-code/
 """
+import statistics
+import subprocess  # noqa: S404
+import sys
+import time
 import timeit
+from typing import List
 
 import pytest
 
+from benchmarks.startup import import_times
+from roll_cli.parser.tokenizer import tokenize
+
 
 # The acceptable speed is set to 1/10th of a second.
 ACCEPTABLE_SPEED_AVERAGE = 0.1
 
+# Target wall time for a full `roll 1d20`, interpreter startup included.
+ACCEPTABLE_STARTUP_TIME = 0.5
+
 
 def test_basic_roll_time() -> None:
     """Test how long it takes on average to do a simple roll."""
@@ -35,11 +46,6 @@ def test_basic_roll_time() -> None:
     assert current_speed < ACCEPTABLE_SPEED_AVERAGE
 
 
-@pytest.mark.skip(
-    reason="""This is failing because of recursion depth, not speed.
-    This issue likely will be addressed once the recursion check
-    issues are addressed."""
-)
 def test_inception_parens() -> None:
     """Test where we are performant even with multiple parens.
 
@@ -54,10 +60,134 @@ def test_inception_parens() -> None:
 
     result = timeit.timeit(
         "roll('((((((((((((((((1 + 1))))))))))))))))')",
-        "gc.enable();from roll import roll",
+        "gc.enable();from src.roll_cli import roll",
         number=iterations,
     )
     current_speed: float = result / iterations
 
     print(f"The current speed is: {current_speed}")
     assert current_speed < ACCEPTABLE_SPEED_AVERAGE
+
+
+def _rejection_time(equation: str) -> float:
+    """Return the best time taken to reject the equation out of a few runs."""
+    iterations: int = 10
+
+    result = min(
+        timeit.repeat(
+            "try:\n    tokenize(equation)\nexcept SyntaxError:\n    pass",
+            globals={"tokenize": tokenize, "equation": equation},
+            number=iterations,
+            repeat=5,
+        )
+    )
+    return result / iterations
+
+
+@pytest.mark.parametrize(
+    "prefix,repeated,suffix",
+    [
+        ("1", "+", ""),
+        ("", "(", "1"),
+        ("", "1+", ""),
+        ("1", "*-", ")"),
+        ("", "1d", ""),
+    ],
+)
+def test_adversarial_rejection_time(prefix: str, repeated: str, suffix: str) -> None:
+    """Test that malformed input is rejected in time linear in its length.
+
+    Before validation was added, pyparsing would backtrack through every
+    level of the grammar for these, taking over half a second for only a
+    few hundred characters of some of them. Comparing against a tenth of
+    the input keeps the test independent of the speed of the machine, as
+    quadratic time would make the longer one a hundred times slower.
+    """
+    short = _rejection_time(prefix + repeated * 1000 + suffix)
+    long = _rejection_time(prefix + repeated * 10000 + suffix)
+
+    print(f"The current speed is: {long} ({short} for a tenth of the input)")
+    assert long < short * 30
+
+
+@pytest.mark.parametrize(
+    "statement",
+    [
+        ("import roll_cli"),
+        ("import roll_cli.parser.types"),
+        ("from roll_cli.__main__ import main"),
+        ("from roll_cli import roll; roll('4d6K3 + 2')"),
+    ],
+)
+def test_grammar_is_not_imported(statement: str) -> None:
+    """Test that importing and rolling does not import pyparsing.
+
+    The grammar is only needed by DiceParser.parse(), so nothing that
+    the roll command does should pay for importing or building it.
+    """
+    imports = import_times([sys.executable, "-c", statement])
+
+    assert "pyparsing" not in {entry.module for entry in imports}
+
+
+@pytest.mark.benchmark
+def test_startup_time() -> None:
+    """Test that `roll 1d20` starts, rolls, and exits quickly."""
+    statement: str = "from roll_cli.__main__ import main; main(['1d20'])"
+    times: List[float] = []
+
+    for _ in range(5):
+        start: float = time.perf_counter()
+        subprocess.run(  # noqa: S603
+            [sys.executable, "-c", statement], capture_output=True, check=False
+        )
+        times.append(time.perf_counter() - start)
+
+    import_time: float = next(
+        entry.cumulative_us / 1_000_000
+        for entry in import_times([sys.executable, "-c", statement])
+        if entry.module == "roll_cli"
+    )
+    current_speed: float = statistics.median(times)
+
+    print(f"The current speed is: {current_speed} ({import_time} importing)")
+    assert current_speed < ACCEPTABLE_STARTUP_TIME
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize(
+    "equation",
+    [
+        ("4d6K3"),
+        ("1d20 + 5"),
+        ("((2d8 + 3) * 2) + 1d6!"),
+    ],
+)
+def test_repeated_roll_time(equation: str) -> None:
+    """Test that rolling repeatedly is quicker than calling roll() in a loop."""
+    iterations: int = 10000
+
+    # The parser caches compiled expressions, so the gap between the two is
+    # only the per call overhead now, and the best of a few runs is needed
+    # to keep noise from deciding the result.
+    repeated = min(
+        timeit.repeat(
+            "roll_repeated(equation, iterations)",
+            "from src.roll_cli import roll_repeated",
+            globals={"equation": equation, "iterations": iterations},
+            number=1,
+            repeat=5,
+        )
+    )
+    looped = min(
+        timeit.repeat(
+            "for _ in range(iterations): roll(equation)",
+            "from src.roll_cli import roll",
+            globals={"equation": equation, "iterations": iterations},
+            number=1,
+            repeat=5,
+        )
+    )
+
+    print(f"Repeated: {repeated / iterations}, looped: {looped / iterations}")
+    assert repeated < looped
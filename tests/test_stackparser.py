@@ -0,0 +1,126 @@
+"""Test the non-recursive parser against the pyparsing grammar."""
+import random
+
+import pytest
+
+from roll_cli import roll
+from roll_cli.parser import DiceParser
+from roll_cli.parser.stackparser import build_tree
+from roll_cli.parser.stackparser import iter_postorder
+from roll_cli.parser.tokenizer import ExpressionSyntaxError
+from roll_cli.parser.tokenizer import tokenize
+from roll_cli.parser.types import RollOption
+
+
+def _tree(equation: str) -> object:
+    """Return the parse tree of the equation."""
+    return build_tree(equation, tokenize(equation))
+
+
+@pytest.mark.parametrize(
+    "equation,tree",
+    [
+        ("1+2*3", [1, "+", [2, "*", 3]]),
+        ("1-2-3", [[1, "-", 2], "-", 3]),
+        ("2^3^2", [2, "^", [3, "^", 2]]),
+        ("-2^2", ["-", [2, "^", 2]]),
+        ("2^-2", [2, "^", ["-", 2]]),
+        ("4d6K3", [[4, "d", 6], "K", 3]),
+        ("4d6k", [[4, "d", 6], "k"]),
+        ("d20", ["d", 20]),
+        ("2d%", [2, "d%"]),
+        ("d%", "d%"),
+        ("((1+1))", [1, "+", 1]),
+        ("sqrt(4)!", [["sqrt", 4], "!"]),
+        ("3!!", [[3, "!"], "!"]),
+        ("1d%d%", [[1, "d%"], "d%"]),
+        ("1<2<3", [1, "<", [2, "<", 3]]),
+    ],
+)
+def test_tree_shape(equation: str, tree: object) -> None:
+    """Test that operators are grouped by precedence and associativity."""
+    assert _tree(equation) == tree
+
+
+@pytest.mark.parametrize(
+    "equation",
+    [
+        ("-d20"),
+        ("sqrtd20"),
+        ("2^d6"),
+    ],
+)
+def test_operand_not_allowed(equation: str) -> None:
+    """Test that operators refuse operands the grammar would refuse."""
+    with pytest.raises(ExpressionSyntaxError):
+        _tree(equation)
+
+
+def test_matches_grammar() -> None:
+    """Test that random expressions evaluate the same as with the grammar."""
+    pieces = [
+        *["1", "2", "3", "4.5", "(", ")", "pi", "e"],
+        *["-", "+", "*", "/", "//", "^", "!", "!!", "<", ">", "=", "<="],
+        *["d", "d%", "k", "K", "x", "X", "sqrt"],
+    ]
+    generator = random.Random(30)  # noqa: S311
+    parser = DiceParser()
+    checked: int = 0
+
+    for _ in range(3000):
+        equation = "".join(
+            generator.choice(pieces) for _ in range(generator.randint(1, 7))
+        )
+
+        try:
+            expected = parser.parse(equation, RollOption.Maximum)[0]
+        except Exception:
+            continue
+
+        actual = parser.evaluate(equation, RollOption.Maximum)
+
+        assert float(actual) == pytest.approx(float(expected), nan_ok=True), equation
+        checked += 1
+
+    assert checked > 100
+
+
+@pytest.mark.parametrize(
+    "equation,result",
+    [
+        ("3!!", 720),
+        ("2+3!!", 722),
+        ("3!!*2", 1440),
+        ("(3!)!", 720),
+        ("1d%d%", 10000),
+        ("d%d%d%", 1000000),
+    ],
+)
+def test_repeated_postfix(equation: str, result: int) -> None:
+    """Test that every postfix operator is applied in turn, with either parser."""
+    parser = DiceParser()
+
+    assert parser.evaluate(equation, RollOption.Maximum) == result
+    assert parser.parse(equation, RollOption.Maximum)[0] == result
+
+
+@pytest.mark.parametrize(
+    "equation,result",
+    [
+        ("(" * 5000 + "1+1" + ")" * 5000, 2),
+        ("1" + "+(1" * 5000 + ")" * 5000, 5001),
+        ("-" * 5000 + "1", 1),
+        ("2" + "^1" * 5000, 2),
+    ],
+)
+def test_deep_nesting(equation: str, result: int) -> None:
+    """Test that deeply nested expressions do not hit the recursion limit."""
+    assert roll(equation) == result
+
+
+def test_postorder_is_left_to_right() -> None:
+    """Test that operands are visited left to right, before their operator."""
+    nodes = list(iter_postorder(_tree("1+2*3")))
+
+    assert nodes[:3] == [1, 2, 3]
+    assert nodes[-1] == [1, "+", [2, "*", 3]]
@@ -0,0 +1,148 @@
+"""Test dice strings with placeholders that are bound when evaluated."""
+from typing import Dict
+from typing import List
+
+import pytest
+
+from roll_cli.parser import CostLimits
+from roll_cli.parser import DiceParser
+from roll_cli.parser import ExpressionTooCostlyError
+from roll_cli.parser.tokenizer import ExpressionSyntaxError
+from roll_cli.parser.tokenizer import tokenize
+from roll_cli.parser.types import RollOption
+
+
+@pytest.mark.parametrize(
+    "template,texts",
+    [
+        ("1d20+{bonus}", ["1", "d", "20", "+", "{bonus}"]),
+        ("{ n }d6K{k}", ["{n}", "d", "6", "K", "{k}"]),
+        ("d{_sides2}", ["d", "{_sides2}"]),
+        ("({a})!", ["(", "{a}", ")", "!"]),
+    ],
+)
+def test_tokenize_placeholders(template: str, texts: List[str]) -> None:
+    """Test that placeholders are tokens of their own, without spaces."""
+    assert [token.text for token in tokenize(template)] == texts
+
+
+@pytest.mark.parametrize("template", ["{}", "{1n}", "{a b}", "{a", "1 {a}"])
+def test_malformed_placeholders(template: str) -> None:
+    """Test that placeholders have to be a single valid name."""
+    with pytest.raises(ExpressionSyntaxError):
+        tokenize(template)
+
+
+@pytest.mark.parametrize(
+    "template,bindings,total",
+    [
+        ("1d20+{attack_bonus}", {"attack_bonus": 7}, 27),
+        ("{n}d6K{k}", {"n": 4, "k": 3}, 18),
+        ("{n}d{sides}x{drop}", {"n": 5, "sides": 8, "drop": 2}, 24),
+        ("d{sides}", {"sides": 12}, 12),
+        ("{n}d%", {"n": 2}, 200),
+        ("{a} * ({b} + {a})", {"a": 2, "b": 3}, 10),
+        ("{x} ^ -{y}", {"x": 2, "y": 1}, 0.5),
+        ("{n}d6 > {dc}", {"n": 3, "dc": 17}, True),
+        ("{unused}", {"unused": 1, "extra": 2}, 1),
+    ],
+)
+def test_evaluate_template(
+    template: str, bindings: Dict[str, float], total: float
+) -> None:
+    """Test that placeholders work anywhere that numbers can go."""
+    result = DiceParser().evaluate(template, RollOption.Maximum, bindings=bindings)
+
+    assert result == total
+
+
+def test_template_compiled_once() -> None:
+    """Test that every binding of a template reuses the compiled program."""
+    parser = DiceParser()
+
+    totals = [
+        parser.evaluate(
+            "{n}d6K{k} + {bonus}",
+            RollOption.Minimum,
+            bindings={"n": n, "k": 2, "bonus": n},
+        )
+        for n in range(2, 6)
+    ]
+
+    assert totals == [4, 5, 6, 7]
+    assert list(parser._compiled) == ["{n}d6K{k} + {bonus}"]
+
+
+def test_evaluate_repeated_template() -> None:
+    """Test that templates can be evaluated repeatedly with one binding."""
+    results = DiceParser().evaluate_repeated(
+        "{n}d1 + {bonus}", 3, RollOption.Normal, bindings={"n": 2, "bonus": 1}
+    )
+
+    assert results == [3, 3, 3]
+
+
+def test_verbose_template() -> None:
+    """Test that the history shows the values that were bound."""
+    result = DiceParser().evaluate(
+        "{n}d4 + {bonus}", RollOption.Maximum, bindings={"n": 2, "bonus": 3}
+    )
+
+    assert str(result).splitlines() == [
+        "Rolled: 2d4: [4, 4]",
+        "Adding: 8 + 3 = 11",
+        "11",
+    ]
+
+
+def test_missing_binding() -> None:
+    """Test that every placeholder has to be given a value."""
+    parser = DiceParser()
+
+    with pytest.raises(ValueError, match="placeholder {bonus}"):
+        parser.evaluate("1d20 + {bonus}")
+
+    with pytest.raises(ValueError, match="placeholder {k}"):
+        parser.evaluate("{n}d6K{k}", bindings={"n": 4})
+
+
+def test_binding_must_be_a_number() -> None:
+    """Test that only numbers can be bound to placeholders."""
+    with pytest.raises(TypeError, match="must be a number, not str"):
+        DiceParser().evaluate("{n}d6", bindings={"n": "4"})  # type: ignore[dict-item]
+
+
+def test_template_cost() -> None:
+    """Test that the cost of a template depends on what it is bound to."""
+    parser = DiceParser()
+
+    assert parser.estimate_cost("{n}d6K{k}", {"n": 4, "k": 3}).dice == 4
+    assert parser.estimate_cost("{n}d6K{k}", {"n": 400, "k": 3}).dice == 400
+
+    parser.evaluate("{n}d6", limits=CostLimits(max_dice=10), bindings={"n": 10})
+
+    with pytest.raises(ExpressionTooCostlyError):
+        parser.evaluate("{n}d6", limits=CostLimits(max_dice=10), bindings={"n": 11})
+
+
+def test_bindings_named_like_arguments() -> None:
+    """Test that placeholders can share names with evaluate()'s arguments."""
+    result = DiceParser().evaluate(
+        "{count}d20K1 + {limits}",
+        RollOption.Maximum,
+        bindings={"count": 2, "limits": 7},
+    )
+
+    assert result == 27
+
+
+@pytest.mark.parametrize("value", [True, None, "1"])
+def test_binding_types_checked_up_front(value: object) -> None:
+    """Test that bindings are checked even when nothing uses them."""
+    parser = DiceParser()
+
+    with pytest.raises(TypeError, match="{n} must be a number"):
+        parser.evaluate("1d20", bindings={"n": value})  # type: ignore[dict-item]
+
+    with pytest.raises(TypeError):
+        parser.estimate_cost("1d20", {"n": value})  # type: ignore[dict-item]
@@ -0,0 +1,120 @@
+"""Test the tokenizer that validates dice strings before parsing."""
+import random
+from typing import List
+from typing import Set
+
+import pytest
+from pyparsing import ParseException
+from pyparsing import ParserElement
+
+from roll_cli.parser import DiceParser
+from roll_cli.parser.tokenizer import ExpressionSyntaxError
+from roll_cli.parser.tokenizer import tokenize
+
+
+@pytest.mark.parametrize(
+    "equation,texts",
+    [
+        ("1d20", ["1", "d", "20"]),
+        ("D%", ["d%"]),
+        ("4d6K3 + 2", ["4", "d", "6", "K", "3", "+", "2"]),
+        ("1 - -5", ["1", "-", "-", "5"]),
+        ("1+ +1", ["1", "+", "+1"]),
+        ("1++1", ["1", "+", "+1"]),
+        ("SQRT(PI)", ["sqrt", "(", "pi", ")"]),
+        ("2**3//4", ["2", "**", "3", "//", "4"]),
+        ("1<=2>=3", ["1", "<=", "2", ">=", "3"]),
+        ("2e3", ["2e3"]),
+        ("10d10x", ["10", "d", "10", "x"]),
+    ],
+)
+def test_tokenize(equation: str, texts: List[str]) -> None:
+    """Test that dice strings are split into the expected tokens."""
+    assert [token.text for token in tokenize(equation)] == texts
+
+
+@pytest.mark.parametrize(
+    "equation,position",
+    [
+        ("", 0),
+        ("2 +", 3),
+        ("+ 6", 0),
+        ("1 2", 2),
+        ("2 + (2 + 3", 4),
+        ("(6**)2", 4),
+        ("1 + 2)", 5),
+        ("1 + hello", 4),
+        ("1+++++++", 2),
+        ("2(3)", 1),
+    ],
+)
+def test_rejected_position(equation: str, position: int) -> None:
+    """Test that malformed input is rejected at the right position."""
+    with pytest.raises(ExpressionSyntaxError) as err:
+        tokenize(equation)
+
+    assert err.value.position == position
+
+
+def test_parser_rejects_before_parsing(capsys: pytest.CaptureFixture[str]) -> None:
+    """Test that the parser raises the error without printing anything."""
+    with pytest.raises(SyntaxError, match="position 5"):
+        DiceParser().evaluate("1 + (")
+
+    assert capsys.readouterr().out == ""
+
+
+def _without_actions(element: ParserElement, seen: Set[int]) -> None:
+    """Remove the parse actions of a grammar so that it only matches."""
+    if id(element) in seen:
+        return
+
+    seen.add(id(element))
+    element.parseAction = []
+
+    for child in element.recurse():
+        _without_actions(child, seen)
+
+
+def test_agrees_with_grammar() -> None:
+    """Test that the parser accepts exactly what the grammar accepts."""
+    pieces = [
+        *["1", "2", "3.5", ".5", "6.", "+1", "2e3", " ", "(", ")"],
+        *["-", "+", "*", "/", "//", "%", "^", "**", "!", "<", ">", "=", "<="],
+        *[">=", "d", "D", "d%", "k", "K", "x", "X", "sqrt", "pi", "e", "PI", "E"],
+    ]
+    generator = random.Random(26)  # noqa: S311
+    grammar = DiceParser._create_parser()
+    _without_actions(grammar, set())
+    parser = DiceParser()
+
+    for _ in range(3000):
+        equation = "".join(
+            generator.choice(pieces) for _ in range(generator.randint(1, 8))
+        )
+
+        try:
+            grammar.parseString(equation, parseAll=True)
+        except ParseException:
+            accepted = False
+        else:
+            accepted = True
+
+        try:
+            parser.parse_tree(equation)
+        except SyntaxError:
+            assert not accepted, equation
+        else:
+            assert accepted, equation
+
+
+@pytest.mark.parametrize(
+    "equation,position",
+    [("sqrte", 4), ("de", 1), ("sqrtpi", 4), ("e//dpi", 4), ("4dsqrtpi", 6)],
+)
+def test_constants_are_keywords(equation: str, position: int) -> None:
+    """Test that pi and e are only constants when they stand on their own."""
+    with pytest.raises(ExpressionSyntaxError) as err:
+        tokenize(equation)
+
+    assert err.value.position == position